@@ -0,0 +1,19 @@
+# Generated by Django 4.2 on 2026-10-17 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("applications", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="creditapplication",
+            index=models.Index(
+                fields=["status", "approved_at"], name="application_status_approved"
+            ),
+        ),
+    ]
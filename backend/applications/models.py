@@ -60,6 +60,9 @@ class CreditApplication(models.Model):
         verbose_name = _("Solicitud de Crédito")
         verbose_name_plural = _("Solicitudes de Crédito")
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'approved_at'], name='application_status_approved'),
+        ]
     
     def __str__(self):
         return f"Solicitud #{self.id} - {self.user.username}"
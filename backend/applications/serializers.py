@@ -43,7 +43,7 @@ class CreditApplicationMinimalSerializer(serializers.ModelSerializer):
     class Meta:
         model = CreditApplication
         fields = [
-            'id', 'reference_number', 'status', 'status_display',
+            'id', 'status', 'status_display',
             'created_at', 'amount'
         ]
     
@@ -1,5 +1,6 @@
 from django.utils import timezone
 from django.db import transaction
+from payments.services import generate_payment_schedule
 from .models import CreditApplication, ApplicationStatus, ApplicationDocument, ApplicationNote
 
 def create_application(user, product, financing_plan, amount, term_months, monthly_payment, down_payment=None):
@@ -114,6 +115,10 @@ def update_application_status(application, new_status, notes, user):
             
         application.save()
         
+        # Generar el cronograma de cuotas al aprobar (no se duplica si ya existe)
+        if new_status == 'approved':
+            generate_payment_schedule(application)
+        
         # Crear registro en el historial de estados
         ApplicationStatus.objects.create(
             application=application,
@@ -250,29 +255,34 @@ def process_application_status_change(application, new_status, notes, user, reje
     Returns:
         tuple: (application, status_record) La solicitud actualizada y el registro de estado
     """
-    # Actualizar el estado de la solicitud
-    old_status = application.status
-    application.status = new_status
-    
-    # Establecer campos de auditoría según el estado
-    now = timezone.now()
-    if new_status == 'submitted':
-        application.submitted_at = now
-    elif new_status == 'approved':
-        application.approved_at = now
-    elif new_status == 'rejected':
-        application.rejected_at = now
-        application.rejection_reason = rejection_reason
-    
-    application.save()
-    
-    # Crear registro en historial
-    status_record = ApplicationStatus.objects.create(
-        application=application,
-        status=new_status,
-        notes=notes,
-        changed_by=user
-    )
+    with transaction.atomic():
+        # Actualizar el estado de la solicitud
+        old_status = application.status
+        application.status = new_status
+        
+        # Establecer campos de auditoría según el estado
+        now = timezone.now()
+        if new_status == 'submitted':
+            application.submitted_at = now
+        elif new_status == 'approved':
+            application.approved_at = now
+        elif new_status == 'rejected':
+            application.rejected_at = now
+            application.rejection_reason = rejection_reason
+        
+        application.save()
+        
+        # Generar el cronograma de cuotas al aprobar (no se duplica si ya existe)
+        if new_status == 'approved':
+            generate_payment_schedule(application)
+        
+        # Crear registro en historial
+        status_record = ApplicationStatus.objects.create(
+            application=application,
+            status=new_status,
+            notes=notes,
+            changed_by=user
+        )
     
     return application, status_record
 
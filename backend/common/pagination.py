@@ -1,4 +1,4 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 from rest_framework.response import Response
 
 class StandardResultsSetPagination(PageNumberPagination):
@@ -33,4 +33,30 @@ class LargeResultsSetPagination(PageNumberPagination):
             'total_pages': self.page.paginator.num_pages,
             'current_page': self.page.number,
             'results': data
-        }) 
\ No newline at end of file
+        })
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Cursor pagination over -created_at for large, append-only tables.
+    
+    Pages are fetched with an indexed range condition instead of an OFFSET and no
+    COUNT(*) is issued, so deep pages cost the same as the first one.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+
+class PaymentQueueCursorPagination(CursorPagination):
+    """Cursor pagination for the payment verification queue (oldest first)"""
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('payment_date', 'id')
+
+class PointsSummaryCursorPagination(CursorPagination):
+    """Cursor pagination for points summaries (highest balance first)"""
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = ('-current_points', 'id')
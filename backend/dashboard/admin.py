@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import DashboardSavedView
+from .models import DashboardSavedView, DailyMetric, DailyRollup
 
 class DashboardSavedViewAdmin(admin.ModelAdmin):
     list_display = ('name', 'view_type', 'user', 'created_at', 'updated_at')
@@ -8,3 +8,15 @@ class DashboardSavedViewAdmin(admin.ModelAdmin):
     readonly_fields = ('created_at', 'updated_at')
 
 admin.site.register(DashboardSavedView, DashboardSavedViewAdmin)
+
+class DailyMetricAdmin(admin.ModelAdmin):
+    list_display = ('date', 'metric', 'status', 'kind', 'plan_id', 'category_id', 'count', 'amount')
+    list_filter = ('metric', 'date')
+    date_hierarchy = 'date'
+
+class DailyRollupAdmin(admin.ModelAdmin):
+    list_display = ('date', 'refreshed_at')
+    date_hierarchy = 'date'
+
+admin.site.register(DailyMetric, DailyMetricAdmin)
+admin.site.register(DailyRollup, DailyRollupAdmin)
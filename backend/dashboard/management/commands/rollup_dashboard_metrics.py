@@ -0,0 +1,54 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from dashboard.rollups import METRICS, get_unrolled_range, refresh_daily_metrics
+
+
+class Command(BaseCommand):
+    """Consolida las métricas diarias del dashboard en DailyMetric"""
+    help = 'Consolida las métricas diarias de días cerrados (por defecto, los pendientes hasta ayer)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat,
+                            help='Consolidar solo este día (YYYY-MM-DD)')
+        parser.add_argument('--since', type=date.fromisoformat,
+                            help='Reconsolidar desde este día hasta ayer (YYYY-MM-DD)')
+        parser.add_argument('--metrics', nargs='+', choices=METRICS, default=list(METRICS),
+                            help='Métricas a consolidar')
+        parser.add_argument('--chunk-days', type=int, default=31,
+                            help='Días por lote')
+
+    def handle(self, *args, **options):
+        yesterday = timezone.localdate() - timedelta(days=1)
+
+        if options['date']:
+            date_from = date_to = options['date']
+        elif options['since']:
+            date_from, date_to = options['since'], yesterday
+        else:
+            pending = get_unrolled_range()
+            if pending is None:
+                self.stdout.write('No hay datos para consolidar')
+                return
+            date_from, date_to = pending
+
+        if date_to > yesterday:
+            raise CommandError('Solo se pueden consolidar días cerrados (hasta ayer)')
+        if date_from > date_to:
+            raise CommandError('El rango de fechas es inválido')
+
+        chunk = max(options['chunk_days'], 1)
+        total_rows = 0
+        start = date_from
+        while start <= date_to:
+            end = min(start + timedelta(days=chunk - 1), date_to)
+            rows = refresh_daily_metrics(start, end, metrics=options['metrics'])
+            total_rows += rows
+            self.stdout.write(f'{start} .. {end}: {rows} filas')
+            start = end + timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Consolidados {(date_to - date_from).days + 1} días ({total_rows} filas)'
+        ))
@@ -0,0 +1,122 @@
+# Generated by Django 4.2 on 2026-10-17 21:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dashboard", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyMetric",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(verbose_name="Date")),
+                (
+                    "metric",
+                    models.CharField(
+                        choices=[
+                            ("applications", "Applications Created"),
+                            ("approvals", "Applications Approved"),
+                            ("payments", "Payments"),
+                            ("new_users", "New Users"),
+                            ("points", "Points Issued"),
+                        ],
+                        max_length=20,
+                        verbose_name="Metric",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        blank=True,
+                        help_text="Application or payment status",
+                        max_length=30,
+                        verbose_name="Status",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        blank=True,
+                        help_text="Payment type, point transaction type or user kind",
+                        max_length=30,
+                        verbose_name="Kind",
+                    ),
+                ),
+                (
+                    "plan_id",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Financing Plan ID"
+                    ),
+                ),
+                (
+                    "category_id",
+                    models.PositiveIntegerField(default=0, verbose_name="Category ID"),
+                ),
+                ("count", models.PositiveIntegerField(default=0, verbose_name="Count")),
+                (
+                    "amount",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        help_text="Money for applications and payments, points for points",
+                        max_digits=14,
+                        verbose_name="Amount",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Daily Metric",
+                "verbose_name_plural": "Daily Metrics",
+                "ordering": ["date", "metric"],
+            },
+        ),
+        migrations.CreateModel(
+            name="DailyRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(unique=True, verbose_name="Date")),
+                (
+                    "refreshed_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Refreshed At"),
+                ),
+            ],
+            options={
+                "verbose_name": "Daily Rollup",
+                "verbose_name_plural": "Daily Rollups",
+                "ordering": ["-date"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="dailymetric",
+            index=models.Index(
+                fields=["metric", "date"], name="daily_metric_metric_date"
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="dailymetric",
+            unique_together={
+                ("date", "metric", "status", "kind", "plan_id", "category_id")
+            },
+        ),
+    ]
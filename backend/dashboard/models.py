@@ -22,3 +22,56 @@ class DashboardSavedView(models.Model):
     
     def __str__(self):
         return f"{self.name} ({self.user.username})"
+
+
+class DailyMetric(models.Model):
+    """Pre-aggregated daily fact row for the admin dashboard"""
+    METRIC_CHOICES = (
+        ('applications', _('Applications Created')),
+        ('approvals', _('Applications Approved')),
+        ('payments', _('Payments')),
+        ('new_users', _('New Users')),
+        ('points', _('Points Issued')),
+    )
+    
+    date = models.DateField(_("Date"))
+    metric = models.CharField(_("Metric"), max_length=20, choices=METRIC_CHOICES)
+    
+    # Dimensions (blank / 0 when they do not apply to the metric)
+    status = models.CharField(_("Status"), max_length=30, blank=True,
+                            help_text=_("Application or payment status"))
+    kind = models.CharField(_("Kind"), max_length=30, blank=True,
+                          help_text=_("Payment type, point transaction type or user kind"))
+    plan_id = models.PositiveIntegerField(_("Financing Plan ID"), default=0)
+    category_id = models.PositiveIntegerField(_("Category ID"), default=0)
+    
+    # Measures
+    count = models.PositiveIntegerField(_("Count"), default=0)
+    amount = models.DecimalField(_("Amount"), max_digits=14, decimal_places=2, default=0,
+                               help_text=_("Money for applications and payments, points for points"))
+    
+    class Meta:
+        verbose_name = _("Daily Metric")
+        verbose_name_plural = _("Daily Metrics")
+        ordering = ['date', 'metric']
+        unique_together = [['date', 'metric', 'status', 'kind', 'plan_id', 'category_id']]
+        indexes = [
+            models.Index(fields=['metric', 'date'], name='daily_metric_metric_date'),
+        ]
+    
+    def __str__(self):
+        return f"{self.date} {self.metric}: {self.count}"
+
+
+class DailyRollup(models.Model):
+    """Marks a closed day whose metrics are stored in DailyMetric"""
+    date = models.DateField(_("Date"), unique=True)
+    refreshed_at = models.DateTimeField(_("Refreshed At"), auto_now=True)
+    
+    class Meta:
+        verbose_name = _("Daily Rollup")
+        verbose_name_plural = _("Daily Rollups")
+        ordering = ['-date']
+    
+    def __str__(self):
+        return f"Rollup {self.date}"
@@ -0,0 +1,343 @@
+from collections import namedtuple
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, Sum, Value, When, CharField
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from applications.models import CreditApplication
+from payments.models import Payment
+from points_system.archive import get_archive_watermark
+from points_system.models import PointTransaction
+from .models import DailyMetric, DailyRollup
+
+User = get_user_model()
+
+# Fuente de cada métrica: modelo, campo de fecha, si es DateTimeField, filtro,
+# dimensiones (campo de DailyMetric -> expresión), campo sumado en amount y
+# campos del modelo de los que depende (para ignorar guardados parciales ajenos)
+MetricSource = namedtuple(
+    'MetricSource', 'model date_field is_datetime filter dimensions amount_field tracked_fields'
+)
+
+METRIC_SOURCES = {
+    'applications': MetricSource(
+        CreditApplication, 'created_at', True, None,
+        {'status': F('status'), 'plan_id': F('financing_plan_id'), 'category_id': F('product__category_id')},
+        'amount',
+        {'created_at', 'status', 'financing_plan', 'product', 'amount'},
+    ),
+    'approvals': MetricSource(
+        CreditApplication, 'approved_at', True, Q(status='approved'),
+        {'plan_id': F('financing_plan_id'), 'category_id': F('product__category_id')},
+        'amount',
+        {'approved_at', 'status', 'financing_plan', 'product', 'amount'},
+    ),
+    'payments': MetricSource(
+        Payment, 'payment_date', False, None,
+        {'status': F('status'), 'kind': F('payment_type')},
+        'amount',
+        {'payment_date', 'status', 'payment_type', 'amount'},
+    ),
+    'new_users': MetricSource(
+        User, 'date_joined', True, None,
+        {'kind': Case(
+            When(is_staff=True, then=Value('staff')),
+            default=Value('customer'),
+            output_field=CharField(),
+        )},
+        None,
+        {'date_joined', 'is_staff'},
+    ),
+    'points': MetricSource(
+        PointTransaction, 'created_at', True, None,
+        {'kind': F('transaction_type')},
+        'points_amount',
+        {'created_at', 'transaction_type', 'points_amount'},
+    ),
+}
+
+METRICS = tuple(METRIC_SOURCES)
+
+# Métricas cuyas filas de origen se archivan por mes (ver points_system.archive)
+ARCHIVED_METRICS = {'points'}
+
+
+def _day_start(day):
+    """Medianoche (hora local) del día indicado"""
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+
+def _day_runs(days):
+    """Agrupa una lista ordenada de días en tramos contiguos [(primero, último), ...]"""
+    runs = []
+    for day in days:
+        if runs and runs[-1][1] + timedelta(days=1) == day:
+            runs[-1][1] = day
+        else:
+            runs.append([day, day])
+    return [tuple(run) for run in runs]
+
+
+def _range_filter(source, first, last):
+    """Filtro de la fuente para los días [first, last]; un extremo None queda abierto"""
+    lookups = {}
+    if source.is_datetime:
+        if first is not None:
+            lookups[f'{source.date_field}__gte'] = _day_start(first)
+        if last is not None:
+            lookups[f'{source.date_field}__lt'] = _day_start(last + timedelta(days=1))
+    else:
+        if first is not None:
+            lookups[f'{source.date_field}__gte'] = first
+        if last is not None:
+            lookups[f'{source.date_field}__lte'] = last
+    return Q(**lookups)
+
+
+def _compute_runs(runs, metrics):
+    """
+    Calcula las métricas diarias de varios tramos de días desde las tablas originales.
+
+    Se ejecuta una consulta agrupada por métrica que cubre todos los tramos a la vez.
+    """
+    rows = []
+    for metric in metrics:
+        source = METRIC_SOURCES[metric]
+        queryset = source.model.objects.all()
+        if source.filter is not None:
+            queryset = queryset.filter(source.filter)
+
+        days = Q()
+        for first, last in runs:
+            days |= _range_filter(source, first, last)
+        queryset = queryset.filter(days, **{f'{source.date_field}__isnull': False})
+
+        if source.is_datetime:
+            day = TruncDate(source.date_field, tzinfo=timezone.get_current_timezone())
+        else:
+            day = F(source.date_field)
+
+        measures = {'total': Count('pk')}
+        if source.amount_field:
+            measures['total_amount'] = Sum(source.amount_field)
+
+        # Alias con prefijo para no chocar con los campos del modelo de origen
+        dimensions = {f'dim_{name}': expression for name, expression in source.dimensions.items()}
+        grouped = queryset.values(day=day, **dimensions).annotate(**measures).order_by()
+
+        for item in grouped:
+            rows.append(DailyMetric(
+                date=item['day'],
+                metric=metric,
+                status=item.get('dim_status') or '',
+                kind=item.get('dim_kind') or '',
+                plan_id=item.get('dim_plan_id') or 0,
+                category_id=item.get('dim_category_id') or 0,
+                count=item['total'],
+                amount=Decimal(item.get('total_amount') or 0).quantize(Decimal('0.01')),
+            ))
+    return rows
+
+
+def compute_metrics(date_from, date_to, metrics=METRICS):
+    """
+    Calcula las métricas diarias desde las tablas originales.
+
+    Se ejecuta una consulta agrupada por métrica para todo el rango, sin importar
+    cuántos días abarque.
+
+    Args:
+        date_from: Primer día (inclusive)
+        date_to: Último día (inclusive)
+        metrics: Métricas a calcular
+
+    Returns:
+        list: Instancias de DailyMetric sin guardar
+    """
+    return _compute_runs([(date_from, date_to)], metrics)
+
+
+def _metric_key(row):
+    """Clave única de una fila de DailyMetric (ver unique_together)"""
+    return (row.date, row.metric, row.status, row.kind, row.plan_id, row.category_id)
+
+
+def get_archived_until():
+    """
+    Primer día con transacciones de puntos sin archivar, o None si no hay archivo.
+
+    Los días anteriores ya no tienen filas de PointTransaction, así que sus filas
+    de ARCHIVED_METRICS quedan congeladas tal como se consolidaron.
+    """
+    watermark = get_archive_watermark()
+    return timezone.localtime(watermark).date() if watermark else None
+
+
+def refresh_daily_metrics(date_from, date_to=None, metrics=METRICS):
+    """
+    Recalcula y guarda las métricas de días cerrados.
+
+    Es idempotente y segura ante ejecuciones simultáneas del mismo día (por
+    ejemplo, dos commits que disparan la señal a la vez): las filas se escriben
+    con un upsert sobre la clave única y luego se eliminan las combinaciones que
+    ya no tienen datos, en lugar de borrar e insertar todo el rango. Los días
+    posteriores a ayer se ignoran porque el día en curso siempre se lee de las
+    tablas originales, y las métricas de puntos de los días archivados no se
+    tocan (ver get_archived_until).
+
+    Args:
+        date_from: Primer día (inclusive)
+        date_to: Último día (inclusive, por defecto igual a date_from)
+        metrics: Métricas a recalcular
+
+    Returns:
+        int: Número de filas escritas
+    """
+    date_to = min(date_to or date_from, timezone.localdate() - timedelta(days=1))
+    if date_to < date_from:
+        return 0
+
+    archived_until = get_archived_until() if ARCHIVED_METRICS & set(metrics) else None
+
+    def frozen(metric, day):
+        return archived_until is not None and metric in ARCHIVED_METRICS and day < archived_until
+
+    rows = [row for row in compute_metrics(date_from, date_to, metrics) if not frozen(row.metric, row.date)]
+    keys = {_metric_key(row) for row in rows}
+    days = [date_from + timedelta(days=offset) for offset in range((date_to - date_from).days + 1)]
+
+    with transaction.atomic():
+        DailyMetric.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['date', 'metric', 'status', 'kind', 'plan_id', 'category_id'],
+            update_fields=['count', 'amount'],
+        )
+        existing = DailyMetric.objects.filter(
+            date__range=(date_from, date_to), metric__in=metrics
+        ).values_list('pk', 'date', 'metric', 'status', 'kind', 'plan_id', 'category_id')
+        stale = [
+            pk for pk, *key in existing
+            if tuple(key) not in keys and not frozen(key[1], key[0])
+        ]
+        if stale:
+            DailyMetric.objects.filter(pk__in=stale).delete()
+        # Un día se marca consolidado solo cuando se calcularon todas sus métricas
+        if set(metrics) == set(METRICS):
+            DailyRollup.objects.bulk_create(
+                [DailyRollup(date=day, refreshed_at=timezone.now()) for day in days],
+                update_conflicts=True, unique_fields=['date'], update_fields=['refreshed_at'],
+            )
+    return len(rows)
+
+
+def get_daily_metrics(metric, date_from, date_to=None):
+    """
+    Obtiene las filas diarias de una métrica en un rango de fechas.
+
+    Los días cerrados se leen de DailyMetric; el día en curso y cualquier día cerrado
+    aún no consolidado se calculan desde las tablas originales, solo para esos días.
+
+    Args:
+        metric: Nombre de la métrica (ver METRICS)
+        date_from: Primer día (inclusive)
+        date_to: Último día (inclusive, por defecto hoy)
+
+    Returns:
+        list: Instancias de DailyMetric (guardadas o calculadas) ordenadas por fecha
+    """
+    today = timezone.localdate()
+    date_to = min(date_to or today, today)
+
+    rollups = DailyRollup.objects.filter(date__range=(date_from, date_to))
+    rolled_days = set(rollups.values_list('date', flat=True))
+    rows = list(DailyMetric.objects.filter(
+        metric=metric, date__in=rollups.values('date')
+    )) if rolled_days else []
+
+    pending_days = [
+        date_from + timedelta(days=offset)
+        for offset in range((date_to - date_from).days + 1)
+        if date_from + timedelta(days=offset) not in rolled_days
+    ]
+    if pending_days:
+        rows.extend(_compute_runs(_day_runs(pending_days), [metric]))
+
+    rows.sort(key=lambda row: row.date)
+    return rows
+
+
+def get_metric_totals(metric, dimensions):
+    """
+    Totales históricos de una métrica agrupados por una o más dimensiones.
+
+    Los días consolidados se suman en la base sobre DailyMetric; los días sin
+    consolidar (el día en curso, los anteriores a la primera consolidación y los
+    huecos) se agregan desde las tablas originales en una sola consulta.
+
+    Args:
+        metric: Nombre de la métrica (ver METRICS)
+        dimensions: Campos de DailyMetric por los que agrupar, p. ej. ['status']
+
+    Returns:
+        dict: tupla de valores de las dimensiones -> {'count', 'amount'}
+    """
+    rolled_days = list(DailyRollup.objects.order_by('date').values_list('date', flat=True))
+    totals = {}
+
+    def add(key, count, amount):
+        entry = totals.setdefault(key, {'count': 0, 'amount': Decimal('0.00')})
+        entry['count'] += count
+        entry['amount'] += amount
+
+    if rolled_days:
+        stored = DailyMetric.objects.filter(
+            metric=metric, date__in=DailyRollup.objects.values('date')
+        ).values(*dimensions).annotate(total=Sum('count'), total_amount=Sum('amount')).order_by()
+        for item in stored:
+            add(tuple(item[name] for name in dimensions), item['total'], item['total_amount'] or 0)
+
+    # Tramos sin consolidar: antes del primer día, huecos intermedios y después del último
+    runs = []
+    previous = None
+    for day in rolled_days:
+        if previous is None:
+            runs.append((None, day - timedelta(days=1)))
+        elif day - previous > timedelta(days=1):
+            runs.append((previous + timedelta(days=1), day - timedelta(days=1)))
+        previous = day
+    runs.append((previous + timedelta(days=1) if previous else None, None))
+
+    for row in _compute_runs(runs, [metric]):
+        add(tuple(getattr(row, name) for name in dimensions), row.count, row.amount)
+    return totals
+
+
+def get_unrolled_range():
+    """
+    Rango de días cerrados pendientes de consolidar para el comando incremental:
+    desde el día siguiente al último consolidado (o el primer dato existente)
+    hasta ayer. Ayer se incluye siempre para recoger cambios tardíos.
+
+    Returns:
+        tuple: (date_from, date_to) o None si no hay datos
+    """
+    yesterday = timezone.localdate() - timedelta(days=1)
+    last = DailyRollup.objects.order_by('-date').values_list('date', flat=True).first()
+    if last is not None:
+        return min(last + timedelta(days=1), yesterday), yesterday
+
+    first_days = []
+    for source in METRIC_SOURCES.values():
+        first = source.model.objects.order_by(source.date_field).values_list(
+            source.date_field, flat=True
+        ).filter(**{f'{source.date_field}__isnull': False}).first()
+        if first is not None:
+            first_days.append(timezone.localtime(first).date() if source.is_datetime else first)
+    if not first_days:
+        return None
+    return min(min(first_days), yesterday), yesterday
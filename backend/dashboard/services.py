@@ -1,16 +1,28 @@
-from datetime import datetime, timedelta
+from datetime import timedelta
+from decimal import Decimal
 from django.db.models import Count, Sum, Avg, Q, F, ExpressionWrapper, fields
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 from applications.models import CreditApplication
+from financing.models import FinancingPlan
 from payments.models import PaymentSchedule, Payment
-from points_system.models import UserPointsSummary, PointTransaction
+from points_system.models import PointTransaction
+from points_system.services import get_points_distribution
 from products.models import Product, Category
 from accounts.models import User
-from django.db.models.functions import TruncMonth, TruncDay, TruncWeek, Cast, ExtractYear, ExtractMonth
+from .rollups import get_daily_metrics, get_metric_totals
+from django.db.models.functions import TruncMonth, Cast
 
 User = get_user_model()
 
+def _tier_range(bucket):
+    """Rango legible de un nivel de puntos, p. ej. '80-99', '100+' o '<40'"""
+    if bucket['max_points'] is None:
+        return f"{bucket['min_points']}+"
+    if bucket['min_points'] is None:
+        return f"<{bucket['max_points'] + 1}"
+    return f"{bucket['min_points']}-{bucket['max_points']}"
+
 class DashboardAnalytics:
     """Service for generating dashboard analytics"""
     
@@ -98,15 +110,16 @@ class DashboardAnalytics:
         if date_to:
             queryset = queryset.filter(payment_date__lte=date_to)
         
-        total_payments = queryset.count()
-        verified_payments = queryset.filter(status='verified').count()
-        rejected_payments = queryset.filter(status='rejected').count()
-        pending_payments = queryset.filter(status='pending').count()
-        
-        # Total amounts
-        total_amount = queryset.filter(status='verified').aggregate(
-            total=Sum('amount')
-        )['total'] or 0
+        verified = Q(status='verified')
+        counts = queryset.aggregate(
+            total=Count('pk'),
+            verified=Count('pk', filter=verified),
+            rejected=Count('pk', filter=Q(status='rejected')),
+            pending=Count('pk', filter=Q(status='pending')),
+            total_amount=Sum('amount', filter=verified),
+        )
+        total_payments = counts['total']
+        verified_payments = counts['verified']
         
         # Payments by type
         payments_by_type = queryset.filter(status='verified').values(
@@ -117,42 +130,83 @@ class DashboardAnalytics:
         ).order_by('-total')
         
         # Late payments (for verified payments linked to scheduled payments)
-        late_payments_count = 0
-        on_time_payments_count = 0
-        
-        for payment in queryset.filter(status='verified', scheduled_payment__isnull=False):
-            scheduled_payment = payment.scheduled_payment
-            if payment.payment_date > scheduled_payment.due_date:
-                late_payments_count += 1
-            else:
-                on_time_payments_count += 1
+        timeliness = cls.get_payment_timeliness(queryset)
         
         # Verification rate
         verification_rate = (verified_payments / total_payments) if total_payments > 0 else 0
         
-        # On-time payment rate
-        total_linked_payments = late_payments_count + on_time_payments_count
-        on_time_rate = (on_time_payments_count / total_linked_payments) if total_linked_payments > 0 else 0
-        
         return {
             'total_payments': total_payments,
             'verified_payments': verified_payments,
-            'rejected_payments': rejected_payments,
-            'pending_payments': pending_payments,
-            'total_amount': total_amount,
+            'rejected_payments': counts['rejected'],
+            'pending_payments': counts['pending'],
+            'total_amount': counts['total_amount'] or 0,
             'verification_rate': verification_rate,
-            'on_time_payments': on_time_payments_count,
-            'late_payments': late_payments_count,
-            'on_time_rate': on_time_rate,
-            'payments_by_type': list(payments_by_type)
+            'on_time_payments': timeliness['on_time'],
+            'late_payments': timeliness['late'],
+            'on_time_rate': timeliness['on_time_rate'],
+            'payments_by_type': list(payments_by_type),
+            'timeliness_by_month': timeliness['by_month'],
+            'timeliness_by_plan': timeliness['by_plan']
         }
     
+    @classmethod
+    def get_payment_timeliness(cls, queryset=None):
+        """
+        On-time vs late verified payments, compared against the due date of the
+        scheduled installment they settle.
+        
+        A single grouped query by month and financing plan is run; the totals and
+        both breakdowns are folded from its rows.
+        
+        Args:
+            queryset: Payment queryset to analyse (defaults to all payments)
+        """
+        queryset = Payment.objects.all() if queryset is None else queryset
+        late = Q(payment_date__gt=F('scheduled_payment__due_date'))
+        
+        rows = queryset.filter(
+            status='verified', scheduled_payment__isnull=False
+        ).values(
+            month=TruncMonth('payment_date'),
+            plan_id=F('application__financing_plan_id'),
+            plan_name=F('application__financing_plan__name'),
+        ).annotate(
+            on_time=Count('pk', filter=~late),
+            late=Count('pk', filter=late),
+        ).order_by('month', 'plan_id')
+        
+        def with_rate(entry):
+            linked = entry['on_time'] + entry['late']
+            entry['on_time_rate'] = (entry['on_time'] / linked) if linked > 0 else 0
+            return entry
+        
+        by_month = {}
+        by_plan = {}
+        for row in rows:
+            month = row['month'].strftime('%Y-%m')
+            month_entry = by_month.setdefault(month, {'month': month, 'on_time': 0, 'late': 0})
+            plan_entry = by_plan.setdefault(row['plan_id'], {
+                'plan_id': row['plan_id'], 'plan_name': row['plan_name'], 'on_time': 0, 'late': 0
+            })
+            for entry in (month_entry, plan_entry):
+                entry['on_time'] += row['on_time']
+                entry['late'] += row['late']
+        
+        totals = with_rate({
+            'on_time': sum(entry['on_time'] for entry in by_month.values()),
+            'late': sum(entry['late'] for entry in by_month.values()),
+        })
+        totals['by_month'] = [with_rate(entry) for entry in by_month.values()]
+        totals['by_plan'] = [with_rate(entry) for entry in by_plan.values()]
+        return totals
+    
     @classmethod
     def get_points_statistics(cls):
         """Get points system statistics"""
-        # Get points distribution
-        points_profiles = UserPointsSummary.objects.all()
-        total_profiles = points_profiles.count()
+        # Get points distribution (all tiers, total and average in one query)
+        distribution = get_points_distribution()
+        total_profiles = distribution['total']
         
         if total_profiles == 0:
             return {
@@ -162,35 +216,6 @@ class DashboardAnalytics:
                 'transaction_types': []
             }
         
-        # Average points
-        average_points = points_profiles.aggregate(
-            avg=Avg('current_points')
-        )['avg'] or 0
-        
-        # Points distribution
-        excellent_points = points_profiles.filter(
-            current_points__gte=100
-        ).count()
-        
-        good_points = points_profiles.filter(
-            current_points__gte=80,
-            current_points__lt=100
-        ).count()
-        
-        regular_points = points_profiles.filter(
-            current_points__gte=60,
-            current_points__lt=80
-        ).count()
-        
-        poor_points = points_profiles.filter(
-            current_points__gte=40,
-            current_points__lt=60
-        ).count()
-        
-        critical_points = points_profiles.filter(
-            current_points__lt=40
-        ).count()
-        
         # Points transactions by type
         transactions_by_type = PointTransaction.objects.values(
             'transaction_type'
@@ -201,13 +226,14 @@ class DashboardAnalytics:
         
         return {
             'total_profiles': total_profiles,
-            'average_points': average_points,
+            'average_points': distribution['average_points'],
             'points_distribution': [
-                {'name': 'Excellent (100+)', 'count': excellent_points, 'percentage': excellent_points / total_profiles},
-                {'name': 'Good (80-99)', 'count': good_points, 'percentage': good_points / total_profiles},
-                {'name': 'Regular (60-79)', 'count': regular_points, 'percentage': regular_points / total_profiles},
-                {'name': 'Poor (40-59)', 'count': poor_points, 'percentage': poor_points / total_profiles},
-                {'name': 'Critical (<40)', 'count': critical_points, 'percentage': critical_points / total_profiles}
+                {
+                    'name': f"{cls.POINTS_TIER_NAMES[bucket['key']]} ({_tier_range(bucket)})",
+                    'count': bucket['count'],
+                    'percentage': bucket['percentage']
+                }
+                for bucket in distribution['buckets']
             ],
             'transaction_types': list(transactions_by_type)
         }
@@ -254,33 +280,84 @@ class DashboardAnalytics:
             'products_by_availability': list(products_by_availability)
         }
     
+    # Nombres de los niveles de puntos en las estadísticas
+    POINTS_TIER_NAMES = {
+        'excellent': 'Excellent',
+        'good': 'Good',
+        'average': 'Regular',
+        'poor': 'Poor',
+        'bad': 'Critical',
+    }
+    
+    # Estados de solicitud que aún esperan una decisión
+    PENDING_APPLICATION_STATUSES = ['submitted', 'in_review', 'additional_info_required']
+    
+    @classmethod
+    def get_user_counts(cls, since=None):
+        """
+        User counts computed with a single conditional aggregate.
+        
+        Args:
+            since: Datetime from which users count as new (defaults to 30 days ago)
+        """
+        since = since or timezone.now() - timedelta(days=30)
+        customer = Q(is_staff=False)
+        return User.objects.aggregate(
+            total=Count('pk'),
+            active=Count('pk', filter=Q(is_active=True)),
+            new=Count('pk', filter=Q(date_joined__gte=since)),
+            customers=Count('pk', filter=customer),
+            new_customers=Count('pk', filter=customer & Q(date_joined__gte=since)),
+        )
+    
+    @classmethod
+    def get_application_counts(cls):
+        """Credit application counts computed with a single conditional aggregate"""
+        return CreditApplication.objects.aggregate(
+            total=Count('pk'),
+            pending=Count('pk', filter=Q(status__in=cls.PENDING_APPLICATION_STATUSES)),
+            approved=Count('pk', filter=Q(status='approved')),
+            rejected=Count('pk', filter=Q(status='rejected')),
+        )
+    
+    @classmethod
+    def get_payment_counts(cls):
+        """Payment counts and verified amount computed with a single conditional aggregate"""
+        verified = Q(status='verified')
+        counts = Payment.objects.aggregate(
+            total=Count('pk'),
+            pending=Count('pk', filter=Q(status='pending')),
+            verified=Count('pk', filter=verified),
+            rejected=Count('pk', filter=Q(status='rejected')),
+            verified_amount=Sum('amount', filter=verified),
+        )
+        counts['verified_amount'] = counts['verified_amount'] or 0
+        return counts
+    
+    @classmethod
+    def get_product_counts(cls):
+        """Product counts computed with a single conditional aggregate"""
+        return Product.objects.aggregate(
+            total=Count('pk'),
+            active=Count('pk', filter=Q(is_active=True)),
+            in_stock=Count('pk', filter=Q(availability='in_stock')),
+        )
+    
     @classmethod
     def get_dashboard_summary(cls):
-        """Get a summary of key metrics for the dashboard"""
-        # Key user metrics
-        total_users = User.objects.count()
-        active_users = User.objects.filter(is_active=True).count()
-        
-        # Key application metrics
-        total_applications = CreditApplication.objects.count()
-        approved_applications = CreditApplication.objects.filter(status='approved').count()
-        
-        # Key payment metrics
-        verified_payments = Payment.objects.filter(status='verified').count()
-        total_payment_amount = Payment.objects.filter(status='verified').aggregate(
-            total=Sum('amount')
-        )['total'] or 0
-        
-        # Key product metrics
-        total_products = Product.objects.count()
-        in_stock_products = Product.objects.filter(availability='in_stock').count()
+        """Get a summary of key metrics for the dashboard (one query per table)"""
+        users = cls.get_user_counts()
+        applications = cls.get_application_counts()
+        payments = cls.get_payment_counts()
+        products = cls.get_product_counts()
         
         # Recent activity
-        recent_applications = CreditApplication.objects.order_by('-created_at')[:5]
+        recent_applications = CreditApplication.objects.select_related(
+            'user', 'product'
+        ).order_by('-created_at')[:5]
         recent_applications_data = [
             {
                 'id': app.id,
-                'reference_number': app.reference_number,
                 'product_name': app.product.name,
                 'user': app.user.get_full_name() or app.user.username,
                 'status': app.get_status_display(),
@@ -303,23 +380,25 @@ class DashboardAnalytics:
         
         return {
             'user_metrics': {
-                'total_users': total_users,
-                'active_users': active_users,
-                'activity_rate': (active_users / total_users) if total_users > 0 else 0
+                'total_users': users['total'],
+                'active_users': users['active'],
+                'activity_rate': (users['active'] / users['total']) if users['total'] > 0 else 0
             },
             'application_metrics': {
-                'total_applications': total_applications,
-                'approved_applications': approved_applications,
-                'approval_rate': (approved_applications / total_applications) if total_applications > 0 else 0
+                'total_applications': applications['total'],
+                'approved_applications': applications['approved'],
+                'approval_rate': (
+                    applications['approved'] / applications['total']
+                ) if applications['total'] > 0 else 0
             },
             'payment_metrics': {
-                'verified_payments': verified_payments,
-                'total_payment_amount': total_payment_amount
+                'verified_payments': payments['verified'],
+                'total_payment_amount': payments['verified_amount']
             },
             'product_metrics': {
-                'total_products': total_products,
-                'in_stock_products': in_stock_products,
-                'in_stock_rate': (in_stock_products / total_products) if total_products > 0 else 0
+                'total_products': products['total'],
+                'in_stock_products': products['in_stock'],
+                'in_stock_rate': (products['in_stock'] / products['total']) if products['total'] > 0 else 0
             },
             'recent_activity': {
                 'applications': recent_applications_data,
@@ -331,131 +410,104 @@ def get_dashboard_stats():
     """
     Obtiene estadísticas generales para el dashboard administrativo.
     
+    Usa una sola consulta de agregación condicional por tabla.
+    
     Returns:
         dict: Estadísticas para el dashboard
     """
-    now = timezone.now()
-    month_ago = now - timedelta(days=30)
-    
-    # Estadísticas de usuarios
-    total_users = User.objects.count()
-    new_users_month = User.objects.filter(date_joined__gte=month_ago).count()
-    
-    # Estadísticas de productos
-    total_products = Product.objects.count()
-    active_products = Product.objects.filter(is_active=True).count()
-    
-    # Estadísticas de solicitudes
-    total_applications = CreditApplication.objects.count()
-    pending_applications = CreditApplication.objects.filter(
-        status__in=['submitted', 'in_review', 'additional_info_required']
-    ).count()
-    approved_applications = CreditApplication.objects.filter(status='approved').count()
-    
-    # Estadísticas de pagos
-    total_payments = Payment.objects.count()
-    pending_payments = Payment.objects.filter(status='pending').count()
-    verified_payments = Payment.objects.filter(status='verified').count()
-    total_amount = Payment.objects.filter(status='verified').aggregate(
-        total=Sum('amount')
-    )['total'] or 0
+    users = DashboardAnalytics.get_user_counts()
+    products = DashboardAnalytics.get_product_counts()
+    applications = DashboardAnalytics.get_application_counts()
+    payments = DashboardAnalytics.get_payment_counts()
     
     return {
         'users': {
-            'total': total_users,
-            'new_month': new_users_month
+            'total': users['total'],
+            'new_month': users['new']
         },
         'products': {
-            'total': total_products,
-            'active': active_products
+            'total': products['total'],
+            'active': products['active']
         },
         'applications': {
-            'total': total_applications,
-            'pending': pending_applications,
-            'approved': approved_applications
+            'total': applications['total'],
+            'pending': applications['pending'],
+            'approved': applications['approved']
         },
         'payments': {
-            'total': total_payments,
-            'pending': pending_payments,
-            'verified': verified_payments,
-            'total_amount': float(total_amount)
+            'total': payments['total'],
+            'pending': payments['pending'],
+            'verified': payments['verified'],
+            'total_amount': float(payments['verified_amount'])
         }
     }
 
+# Períodos de ventas: (días hacia atrás, granularidad del bucket)
+SALES_PERIODS = {
+    'week': (7, 'day'),
+    'month': (30, 'day'),
+    'quarter': (90, 'week'),
+    'year': (365, 'month'),
+}
+
+def _bucket_start(day, granularity):
+    """Inicio del bucket (día, lunes de la semana o primer día del mes) que contiene la fecha"""
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+def _next_bucket(day, granularity):
+    """Inicio del bucket siguiente"""
+    if granularity == 'week':
+        return day + timedelta(days=7)
+    if granularity == 'month':
+        return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return day + timedelta(days=1)
+
 def get_sales_stats(period='month'):
     """
     Obtiene estadísticas de ventas por período.
     
+    Los días cerrados se leen de las métricas diarias consolidadas (DailyMetric) y
+    solo el día en curso se agrega desde las solicitudes; los buckets sin ventas se
+    completan con cero, por lo que el costo depende del número de días y no del
+    tamaño de la tabla de solicitudes.
+    
     Args:
-        period: Período de tiempo ('week', 'month', 'year')
+        period: Período de tiempo ('week', 'month', 'quarter', 'year')
         
     Returns:
-        dict: Estadísticas de ventas
+        list: Un elemento por bucket con fecha de inicio, cantidad y monto. Los montos
+        se acumulan como Decimal y se entregan como float, igual que el resto de
+        estadísticas de la API
     """
-    now = timezone.now()
+    days, granularity = SALES_PERIODS.get(period, SALES_PERIODS['month'])
     
-    if period == 'week':
-        start_date = now - timedelta(days=7)
-        group_by = 'day'
-    elif period == 'month':
-        start_date = now - timedelta(days=30)
-        group_by = 'day'
-    elif period == 'year':
-        start_date = now - timedelta(days=365)
-        group_by = 'month'
-    else:
-        start_date = now - timedelta(days=30)
-        group_by = 'day'
+    today = timezone.localdate()
+    first_bucket = _bucket_start(today - timedelta(days=days), granularity)
     
-    # Obtener datos de solicitudes aprobadas
-    approved_applications = CreditApplication.objects.filter(
-        status='approved',
-        approved_at__gte=start_date
-    )
+    # Días cerrados desde la tabla consolidada; hoy desde las solicitudes
+    sales_data = {}
+    for row in get_daily_metrics('approvals', first_bucket, today):
+        bucket = sales_data.setdefault(
+            _bucket_start(row.date, granularity), {'count': 0, 'amount': Decimal('0.00')}
+        )
+        bucket['count'] += row.count
+        bucket['amount'] += row.amount
     
-    # Agrupar por período
-    if group_by == 'day':
-        sales_data = {}
-        for app in approved_applications:
-            day = app.approved_at.date()
-            if day not in sales_data:
-                sales_data[day] = {
-                    'count': 0,
-                    'amount': 0
-                }
-            sales_data[day]['count'] += 1
-            sales_data[day]['amount'] += float(app.amount)
-        
-        # Convertir a lista para la respuesta
-        result = [
-            {
-                'date': day.isoformat(),
-                'count': data['count'],
-                'amount': data['amount']
-            }
-            for day, data in sorted(sales_data.items())
-        ]
-    else:  # month
-        sales_data = {}
-        for app in approved_applications:
-            month = datetime(app.approved_at.year, app.approved_at.month, 1).date()
-            if month not in sales_data:
-                sales_data[month] = {
-                    'count': 0,
-                    'amount': 0
-                }
-            sales_data[month]['count'] += 1
-            sales_data[month]['amount'] += float(app.amount)
-        
-        # Convertir a lista para la respuesta
-        result = [
-            {
-                'date': month.isoformat(),
-                'count': data['count'],
-                'amount': data['amount']
-            }
-            for month, data in sorted(sales_data.items())
-        ]
+    # Completar los buckets sin ventas
+    result = []
+    bucket = first_bucket
+    while bucket <= today:
+        data = sales_data.get(bucket)
+        result.append({
+            'date': bucket.isoformat(),
+            'count': data['count'] if data else 0,
+            'amount': float(data['amount']) if data else 0
+        })
+        bucket = _next_bucket(bucket, granularity)
     
     return result
 
@@ -498,56 +550,6 @@ def get_product_stats():
         ]
     }
 
-def get_user_stats():
-    """
-    Obtiene estadísticas de usuarios.
-    
-    Returns:
-        dict: Estadísticas de usuarios
-    """
-    # Usuarios con más solicitudes
-    top_applicants = User.objects.annotate(
-        applications_count=Count('credit_applications')
-    ).order_by('-applications_count')[:10]
-    
-    # Usuarios con más pagos
-    top_payers = User.objects.annotate(
-        payments_count=Count('payments'),
-        payments_amount=Sum('payments__amount')
-    ).order_by('-payments_amount')[:10]
-    
-    # Distribución de puntos
-    points_distribution = {
-        'excellent': UserPointsSummary.objects.filter(current_points__gte=100).count(),
-        'good': UserPointsSummary.objects.filter(current_points__gte=80, current_points__lt=100).count(),
-        'average': UserPointsSummary.objects.filter(current_points__gte=60, current_points__lt=80).count(),
-        'poor': UserPointsSummary.objects.filter(current_points__gte=40, current_points__lt=60).count(),
-        'bad': UserPointsSummary.objects.filter(current_points__lt=40).count()
-    }
-    
-    return {
-        'top_applicants': [
-            {
-                'id': user.id,
-                'username': user.username,
-                'email': user.email,
-                'applications_count': user.applications_count
-            }
-            for user in top_applicants
-        ],
-        'top_payers': [
-            {
-                'id': user.id,
-                'username': user.username,
-                'email': user.email,
-                'payments_count': user.payments_count,
-                'payments_amount': float(user.payments_amount or 0)
-            }
-            for user in top_payers
-        ],
-        'points_distribution': points_distribution
-    }
-
 def get_application_stats():
     """
     Obtiene estadísticas de solicitudes.
@@ -674,115 +676,34 @@ def get_payment_stats(period='month'):
 # DASHBOARD OVERVIEW
 
 def get_overview_stats():
-    """Get general stats for dashboard overview"""
-    now = timezone.now()
-    thirty_days_ago = now - timedelta(days=30)
-    
-    # User stats
-    total_users = User.objects.filter(is_staff=False).count()
-    new_users_month = User.objects.filter(
-        is_staff=False,
-        date_joined__gte=thirty_days_ago
-    ).count()
-    
-    # Product stats
-    total_products = Product.objects.count()
-    active_products = Product.objects.filter(is_active=True).count()
-    
-    # Application stats
-    total_applications = CreditApplication.objects.count()
-    pending_applications = CreditApplication.objects.filter(
-        status__in=['submitted', 'in_review', 'additional_info_required']
-    ).count()
-    approved_applications = CreditApplication.objects.filter(
-        status='approved'
-    ).count()
-    
-    # Payment stats
-    total_payments = Payment.objects.count()
-    pending_payments = Payment.objects.filter(status='pending').count()
-    verified_payments = Payment.objects.filter(status='verified').count()
-    total_amount = Payment.objects.filter(status='verified').aggregate(
-        total=Sum('amount')
-    )['total'] or 0
+    """Get general stats for dashboard overview (one query per table)"""
+    users = DashboardAnalytics.get_user_counts()
+    products = DashboardAnalytics.get_product_counts()
+    applications = DashboardAnalytics.get_application_counts()
+    payments = DashboardAnalytics.get_payment_counts()
     
     return {
         'users': {
-            'total': total_users,
-            'new_month': new_users_month
+            'total': users['customers'],
+            'new_month': users['new_customers']
         },
         'products': {
-            'total': total_products,
-            'active': active_products
+            'total': products['total'],
+            'active': products['active']
         },
         'applications': {
-            'total': total_applications,
-            'pending': pending_applications,
-            'approved': approved_applications
+            'total': applications['total'],
+            'pending': applications['pending'],
+            'approved': applications['approved']
         },
         'payments': {
-            'total': total_payments,
-            'pending': pending_payments,
-            'verified': verified_payments,
-            'total_amount': total_amount
+            'total': payments['total'],
+            'pending': payments['pending'],
+            'verified': payments['verified'],
+            'total_amount': payments['verified_amount']
         }
     }
 
-# SALES STATS
-
-def get_sales_stats(period='month'):
-    """Get sales statistics for a given period"""
-    now = timezone.now()
-    
-    # Set up date range based on period
-    if period == 'week':
-        start_date = now - timedelta(days=7)
-        truncate_func = TruncDay
-        date_format = '%Y-%m-%d'
-    elif period == 'month':
-        start_date = now - timedelta(days=30)
-        truncate_func = TruncDay
-        date_format = '%Y-%m-%d'
-    elif period == 'quarter':
-        start_date = now - timedelta(days=90)
-        truncate_func = TruncWeek
-        date_format = '%Y-%m-%d'
-    elif period == 'year':
-        start_date = now - timedelta(days=365)
-        truncate_func = TruncMonth
-        date_format = '%Y-%m-%d'
-    else:
-        # Default to month
-        start_date = now - timedelta(days=30)
-        truncate_func = TruncDay
-        date_format = '%Y-%m-%d'
-    
-    # Get approved applications within the date range
-    applications = CreditApplication.objects.filter(
-        status='approved',
-        created_at__gte=start_date,
-        created_at__lte=now
-    )
-    
-    # Group by date and count
-    sales_by_date = applications.annotate(
-        date=truncate_func('created_at')
-    ).values('date').annotate(
-        count=Count('id'),
-        amount=Sum('total_price')
-    ).order_by('date')
-    
-    # Convert to list with properly formatted dates
-    result = []
-    for item in sales_by_date:
-        result.append({
-            'date': item['date'].strftime(date_format),
-            'count': item['count'],
-            'amount': float(item['amount']) if item['amount'] else 0
-        })
-    
-    return result
-
 # PRODUCT STATS
 
 def get_product_stats():
@@ -832,7 +753,7 @@ def get_user_stats():
     """Get user-related statistics"""
     # Get top applicants
     top_applicants = User.objects.annotate(
-        applications_count=Count('credit_applications')
+        applications_count=Count('applications')
     ).filter(
         applications_count__gt=0,
         is_staff=False
@@ -848,14 +769,9 @@ def get_user_stats():
     ).order_by('-payments_amount')[:10]
     
     # Get points distribution
-    points_summary = UserPointsSummary.objects.all()
-    
     points_distribution = {
-        'excellent': points_summary.filter(points__gte=100).count(),
-        'good': points_summary.filter(points__gte=80, points__lt=100).count(),
-        'average': points_summary.filter(points__gte=60, points__lt=80).count(),
-        'poor': points_summary.filter(points__gte=40, points__lt=60).count(),
-        'bad': points_summary.filter(points__lt=40).count()
+        bucket['key']: bucket['count']
+        for bucket in get_points_distribution()['buckets']
     }
     
     # Format results
@@ -887,32 +803,38 @@ def get_user_stats():
 # APPLICATION STATS
 
 def get_application_stats():
-    """Get application-related statistics"""
-    # Get status distribution
-    status_counts = CreditApplication.objects.values('status').annotate(
-        count=Count('id')
-    )
+    """
+    Get application-related statistics.
     
-    status_distribution = {}
-    for item in status_counts:
-        status_distribution[item['status']] = item['count']
+    The status and plan distributions are read from the daily rollups (closed days)
+    plus today's applications; only the approval time is computed from the raw table.
+    """
+    # Get status distribution
+    status_distribution = {
+        status: item['count']
+        for (status,), item in get_metric_totals('applications', ['status']).items()
+        if item['count']
+    }
     
     # Get plan distribution
-    plan_distribution = CreditApplication.objects.values(
-        'financing_plan__plan_type', 
-        'financing_plan__name'
-    ).annotate(
-        count=Count('id')
-    ).order_by('-count')
+    plan_counts = {
+        plan_id: item['count']
+        for (plan_id,), item in get_metric_totals('applications', ['plan_id']).items()
+        if plan_id and item['count']
+    }
+    plans = FinancingPlan.objects.filter(pk__in=plan_counts).values('pk', 'plan_type', 'name')
     
-    plan_data = []
-    for item in plan_distribution:
-        if item['financing_plan__plan_type'] and item['financing_plan__name']:
-            plan_data.append({
-                'plan_type': item['financing_plan__plan_type'],
-                'plan_name': item['financing_plan__name'],
-                'count': item['count']
-            })
+    plan_data = sorted(
+        (
+            {
+                'plan_type': plan['plan_type'],
+                'plan_name': plan['name'],
+                'count': plan_counts[plan['pk']]
+            }
+            for plan in plans
+        ),
+        key=lambda item: -item['count']
+    )
     
     # Calculate average approval time
     approved_apps = CreditApplication.objects.filter(
@@ -924,7 +846,7 @@ def get_application_stats():
     avg_approval_time = approved_apps.annotate(
         approval_time=ExpressionWrapper(
             F('approved_at') - F('submitted_at'),
-            output_field=DurationField()
+            output_field=fields.DurationField()
         )
     ).aggregate(avg=Avg('approval_time'))['avg']
     
@@ -955,39 +877,30 @@ def get_payment_stats(period='month'):
         # Default to month
         start_date = now - timedelta(days=30)
     
-    # Get status distribution with amounts
-    status_payments = Payment.objects.values('status').annotate(
-        count=Count('id'),
-        amount=Sum('amount')
-    )
-    
+    # Get status distribution with amounts (closed days from the daily rollup)
     status_distribution = {}
-    for item in status_payments:
-        status_distribution[item['status']] = {
-            'count': item['count'],
-            'amount': float(item['amount']) if item['amount'] else 0
-        }
+    for (status,), item in get_metric_totals('payments', ['status']).items():
+        if item['count']:
+            status_distribution[status] = {
+                'count': item['count'],
+                'amount': float(item['amount']) if item['amount'] else 0
+            }
     
-    # Get payments by month
-    payments_by_month = Payment.objects.filter(
-        payment_date__gte=start_date
-    ).annotate(
-        year=ExtractYear('payment_date'),
-        month=ExtractMonth('payment_date'),
-        date=TruncMonth('payment_date')
-    ).values('year', 'month', 'date').annotate(
-        count=Count('id'),
-        amount=Sum('amount')
-    ).order_by('date')
+    # Get payments by month (closed days from the daily rollup, today from payments)
+    months = {}
+    for row in get_daily_metrics('payments', timezone.localtime(start_date).date()):
+        month = months.setdefault(row.date.replace(day=1), {'count': 0, 'amount': Decimal('0.00')})
+        month['count'] += row.count
+        month['amount'] += row.amount
     
     month_data = []
-    for item in payments_by_month:
+    for month, item in sorted(months.items()):
         month_data.append({
-            'year': item['year'],
-            'month': item['month'],
-            'date': item['date'].strftime('%Y-%m-%d'),
+            'year': month.year,
+            'month': month.month,
+            'date': month.strftime('%Y-%m-%d'),
             'count': item['count'],
-            'amount': float(item['amount']) if item['amount'] else 0
+            'amount': float(item['amount'])
         })
     
     # Get payment timeliness
@@ -0,0 +1,91 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from applications.models import CreditApplication
+from payments.models import Payment
+from payments.signals import payments_verified
+from points_system.archive import is_archiving
+from points_system.models import PointTransaction
+from .models import DailyRollup
+from .rollups import METRIC_SOURCES, refresh_daily_metrics
+
+User = get_user_model()
+
+
+def _metric_day(source, value):
+    """Día local de un valor del campo de fecha de la fuente"""
+    return timezone.localtime(value).date() if source.is_datetime else value
+
+
+def _metric_dates(sender, instance):
+    """Valor del campo de fecha de cada métrica del modelo (sin leer campos diferidos)"""
+    return {
+        metric: instance.__dict__.get(source.date_field)
+        for metric, source in METRIC_SOURCES.items()
+        if source.model is sender
+    }
+
+
+@receiver(post_init, sender=CreditApplication)
+@receiver(post_init, sender=Payment)
+@receiver(post_init, sender=PointTransaction)
+@receiver(post_init, sender=User)
+def remember_metric_dates(sender, instance, **kwargs):
+    """
+    Guarda las fechas con las que las métricas cuentan el registro al cargarlo, para
+    que un cambio de fecha recalcule también el día anterior sin consultas extra.
+    """
+    instance._metric_dates = _metric_dates(sender, instance)
+
+
+@receiver([post_save, post_delete], sender=CreditApplication)
+@receiver([post_save, post_delete], sender=Payment)
+@receiver([post_save, post_delete], sender=PointTransaction)
+@receiver([post_save, post_delete], sender=User)
+def refresh_closed_day_metrics(sender, instance, **kwargs):
+    """
+    Recalcula las métricas de un día ya consolidado cuando cambia un registro de ese día.
+    
+    Si el guardado cambió la fecha del registro se recalculan el día anterior y el
+    nuevo. Los registros del día en curso no requieren trabajo: el dashboard los lee
+    de las tablas originales hasta que el día se cierra. Las transacciones borradas
+    al archivar un mes se ignoran: esos días conservan la métrica ya consolidada.
+    """
+    if sender is PointTransaction and is_archiving():
+        return
+    today = timezone.localdate()
+    update_fields = kwargs.get('update_fields')
+    saved_dates = instance.__dict__.setdefault('_metric_dates', {})
+    for metric, source in METRIC_SOURCES.items():
+        if source.model is not sender:
+            continue
+        if update_fields is not None and not source.tracked_fields & set(update_fields):
+            continue
+        
+        value = getattr(instance, source.date_field, None)
+        values = {value, saved_dates.get(metric)}
+        saved_dates[metric] = value
+        days = {_metric_day(source, date) for date in values if date is not None}
+        
+        closed = [day for day in days if day < today]
+        if not closed:
+            continue
+        for day in DailyRollup.objects.filter(date__in=closed).values_list('date', flat=True):
+            transaction.on_commit(partial(refresh_daily_metrics, day, metrics=[metric]))
+
+
+@receiver(payments_verified)
+def refresh_bulk_verified_payment_metrics(sender, payments, **kwargs):
+    """
+    Las verificaciones masivas usan update() y no envían post_save: se recalcula la
+    métrica de pagos una vez por cada día consolidado afectado.
+    """
+    today = timezone.localdate()
+    days = {payment.payment_date for payment in payments if payment.payment_date < today}
+    for day in DailyRollup.objects.filter(date__in=days).values_list('date', flat=True):
+        refresh_daily_metrics(day, metrics=['payments'])
@@ -1,3 +1,374 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from applications.models import CreditApplication
+from financing.models import FinancingPlan
+from payments.models import Payment, PaymentMethod, PaymentSchedule
+from products.models import Brand, Category, Product
+from .models import DailyMetric, DailyRollup
+from .rollups import get_daily_metrics, get_metric_totals, refresh_daily_metrics
+from .services import (
+    DashboardAnalytics, get_application_stats, get_dashboard_stats, get_overview_stats,
+    get_payment_stats,
+)
+
+
+class DashboardSummaryQueryTests(TestCase):
+    """Los resúmenes del dashboard usan una consulta de agregación por tabla"""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.admin = User.objects.create_user(username='admin', password='x', is_staff=True)
+        cls.client_user = User.objects.create_user(username='cliente', password='x')
+        User.objects.create_user(username='inactivo', password='x', is_active=False)
+
+        category = Category.objects.create(name='Motos', slug='motos')
+        brand = Brand.objects.create(name='Marca', slug='marca')
+        product = Product.objects.create(
+            name='Moto 150', slug='moto-150', category=category, brand=brand,
+            model='150', year=2024, description='Moto', price=Decimal('2500.00'), color='Rojo',
+        )
+        Product.objects.create(
+            name='Moto 250', slug='moto-250', category=category, brand=brand,
+            model='250', year=2024, description='Moto', price=Decimal('4000.00'), color='Azul',
+            availability='out_of_stock', is_active=False,
+        )
+        plan = FinancingPlan.objects.create(
+            name='Inmediato', plan_type='immediate', description='Inmediato',
+            min_term=1, max_term=60, interest_rate=Decimal('12.00'),
+            down_payment_percentage=Decimal('30.00'),
+        )
+
+        CreditApplication.objects.bulk_create([
+            CreditApplication(
+                user=cls.client_user, product=product, financing_plan=plan,
+                amount=Decimal('2500.00'), term_months=12, monthly_payment=Decimal('150.00'),
+                status=status,
+            )
+            for status in ('approved', 'approved', 'in_review', 'submitted', 'rejected')
+        ])
+        application = CreditApplication.objects.first()
+
+        method = PaymentMethod.objects.create(name='Transferencia')
+        Payment.objects.bulk_create([
+            Payment(
+                application=application, user=cls.client_user, payment_method=method,
+                amount=amount, payment_date=date(2026, 1, 1), status=status,
+            )
+            for amount, status in (
+                (Decimal('100.00'), 'verified'),
+                (Decimal('50.50'), 'verified'),
+                (Decimal('75.00'), 'pending'),
+                (Decimal('20.00'), 'rejected'),
+            )
+        ])
+
+    def test_dashboard_summary_query_count(self):
+        # Una consulta por tabla más las dos listas de actividad reciente
+        with self.assertNumQueries(6):
+            summary = DashboardAnalytics.get_dashboard_summary()
+
+        self.assertEqual(summary['user_metrics']['total_users'], 3)
+        self.assertEqual(summary['user_metrics']['active_users'], 2)
+        self.assertEqual(summary['application_metrics']['approved_applications'], 2)
+        self.assertEqual(summary['payment_metrics']['verified_payments'], 2)
+        self.assertEqual(summary['payment_metrics']['total_payment_amount'], Decimal('150.50'))
+        self.assertEqual(summary['product_metrics']['in_stock_products'], 1)
+        self.assertEqual(len(summary['recent_activity']['applications']), 5)
+
+    def test_dashboard_stats_query_count(self):
+        with self.assertNumQueries(4):
+            stats = get_dashboard_stats()
+
+        self.assertEqual(stats['users'], {'total': 3, 'new_month': 3})
+        self.assertEqual(stats['products'], {'total': 2, 'active': 1})
+        self.assertEqual(stats['applications'], {'total': 5, 'pending': 2, 'approved': 2})
+        self.assertEqual(
+            stats['payments'],
+            {'total': 4, 'pending': 1, 'verified': 2, 'total_amount': 150.5}
+        )
+
+    def test_overview_stats_excludes_staff(self):
+        with self.assertNumQueries(4):
+            stats = get_overview_stats()
+
+        self.assertEqual(stats['users'], {'total': 2, 'new_month': 2})
+        self.assertEqual(stats['payments']['total_amount'], Decimal('150.50'))
+
+
+class DailyMetricRollupTests(TestCase):
+    """Consolidación de métricas diarias y lectura combinada con las tablas originales"""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.client_user = User.objects.create_user(username='cliente', password='x')
+        category = Category.objects.create(name='Motos', slug='motos')
+        brand = Brand.objects.create(name='Marca', slug='marca')
+        product = Product.objects.create(
+            name='Moto 150', slug='moto-150', category=category, brand=brand,
+            model='150', year=2024, description='Moto', price=Decimal('2500.00'), color='Rojo',
+        )
+        plan = FinancingPlan.objects.create(
+            name='Inmediato', plan_type='immediate', description='Inmediato',
+            min_term=1, max_term=60, interest_rate=Decimal('12.00'),
+            down_payment_percentage=Decimal('30.00'),
+        )
+        cls.application = CreditApplication.objects.create(
+            user=cls.client_user, product=product, financing_plan=plan,
+            amount=Decimal('2500.00'), term_months=12, monthly_payment=Decimal('150.00'),
+        )
+        cls.method = PaymentMethod.objects.create(name='Transferencia')
+        cls.today = timezone.localdate()
+
+    def add_payments(self, days_ago, *entries):
+        """Crea pagos (monto, estado) sin señales en el día indicado"""
+        return Payment.objects.bulk_create([
+            Payment(
+                application=self.application, user=self.client_user, payment_method=self.method,
+                amount=Decimal(amount), status=status,
+                payment_date=self.today - timedelta(days=days_ago),
+            )
+            for amount, status in entries
+        ])
+
+    def stored(self, day):
+        return {
+            row.status: (row.count, row.amount)
+            for row in DailyMetric.objects.filter(metric='payments', date=day)
+        }
+
+    def test_refresh_upserts_rows_and_removes_stale_ones(self):
+        day = self.today - timedelta(days=3)
+        self.add_payments(3, ('100.00', 'verified'), ('50.00', 'pending'))
+
+        self.assertEqual(refresh_daily_metrics(day, metrics=['payments']), 2)
+        self.assertEqual(self.stored(day), {
+            'verified': (1, Decimal('100.00')), 'pending': (1, Decimal('50.00')),
+        })
+        # Solo una métrica: el día no queda marcado como consolidado
+        self.assertFalse(DailyRollup.objects.exists())
+
+        # Repetir sobre filas existentes actualiza en lugar de fallar por la clave única
+        Payment.objects.filter(status='pending').update(status='verified')
+        self.assertEqual(refresh_daily_metrics(day, metrics=['payments']), 1)
+        self.assertEqual(self.stored(day), {'verified': (2, Decimal('150.00'))})
+
+    def test_refresh_ignores_the_current_day(self):
+        self.add_payments(0, ('100.00', 'verified'))
+
+        self.assertEqual(refresh_daily_metrics(self.today), 0)
+        self.assertFalse(DailyMetric.objects.exists())
+
+    def test_daily_metrics_only_compute_pending_days(self):
+        self.add_payments(3, ('10.00', 'verified'))
+        self.add_payments(2, ('20.00', 'verified'))
+        self.add_payments(1, ('30.00', 'verified'))
+        self.add_payments(0, ('40.00', 'verified'))
+        rolled = self.today - timedelta(days=2)
+        refresh_daily_metrics(rolled)
+        # Se altera la fila guardada para distinguirla de un recálculo
+        DailyMetric.objects.filter(metric='payments', date=rolled).update(count=7)
+
+        # Fechas consolidadas, filas guardadas y una consulta para los dos tramos pendientes
+        with self.assertNumQueries(3):
+            rows = get_daily_metrics('payments', self.today - timedelta(days=3))
+
+        self.assertEqual(
+            [(row.date, row.count, row.amount) for row in rows],
+            [
+                (self.today - timedelta(days=3), 1, Decimal('10.00')),
+                (rolled, 7, Decimal('20.00')),
+                (self.today - timedelta(days=1), 1, Decimal('30.00')),
+                (self.today, 1, Decimal('40.00')),
+            ]
+        )
+
+    def test_metric_totals_combine_rollups_and_raw_rows(self):
+        self.add_payments(5, ('10.00', 'verified'), ('5.00', 'rejected'))
+        self.add_payments(3, ('20.00', 'verified'))
+        self.add_payments(1, ('30.00', 'pending'))
+        self.add_payments(0, ('40.00', 'verified'))
+        refresh_daily_metrics(self.today - timedelta(days=3))
+
+        totals = get_metric_totals('payments', ['status'])
+
+        self.assertEqual(totals, {
+            ('verified',): {'count': 3, 'amount': Decimal('70.00')},
+            ('rejected',): {'count': 1, 'amount': Decimal('5.00')},
+            ('pending',): {'count': 1, 'amount': Decimal('30.00')},
+        })
+
+    def test_distribution_stats_read_from_rollups(self):
+        self.add_payments(2, ('20.00', 'verified'), ('5.00', 'rejected'))
+        refresh_daily_metrics(self.today - timedelta(days=2))
+        DailyMetric.objects.filter(metric='payments', status='verified').update(count=4)
+
+        stats = get_payment_stats()
+        applications = get_application_stats()
+
+        self.assertEqual(stats['status_distribution'], {
+            'verified': {'count': 4, 'amount': 20.0},
+            'rejected': {'count': 1, 'amount': 5.0},
+        })
+        self.assertEqual(applications['status_distribution'], {'draft': 1})
+        self.assertEqual(applications['plan_distribution'], [
+            {'plan_type': 'immediate', 'plan_name': 'Inmediato', 'count': 1}
+        ])
+        self.assertEqual(applications['avg_approval_time'], 0)
+
+    def test_command_rolls_up_pending_days_incrementally(self):
+        self.add_payments(2, ('20.00', 'verified'))
+        self.add_payments(1, ('30.00', 'verified'))
+        Payment.objects.filter(payment_date=self.today - timedelta(days=1)).update(status='rejected')
+
+        out = StringIO()
+        call_command('rollup_dashboard_metrics', stdout=out)
+
+        yesterday = self.today - timedelta(days=1)
+        self.assertEqual(
+            list(DailyRollup.objects.order_by('date').values_list('date', flat=True)),
+            [self.today - timedelta(days=2), yesterday]
+        )
+        self.assertIn('Consolidados 2 días', out.getvalue())
+        self.assertEqual(self.stored(yesterday), {'rejected': (1, Decimal('30.00'))})
+
+        # La siguiente ejecución solo vuelve a consolidar ayer
+        out = StringIO()
+        call_command('rollup_dashboard_metrics', stdout=out)
+        self.assertIn('Consolidados 1 días', out.getvalue())
+
+    def test_moving_a_payment_refreshes_both_consolidated_days(self):
+        old_day, new_day = self.today - timedelta(days=3), self.today - timedelta(days=2)
+        payment, = self.add_payments(3, ('100.00', 'verified'))
+        refresh_daily_metrics(old_day, new_day)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            payment.payment_date = new_day
+            payment.save()
+
+        self.assertEqual(self.stored(old_day), {})
+        self.assertEqual(self.stored(new_day), {'verified': (1, Decimal('100.00'))})
+
+    def test_command_rejects_the_current_day(self):
+        with self.assertRaises(CommandError):
+            call_command('rollup_dashboard_metrics', '--date', self.today.isoformat(), stdout=StringIO())
+
+
+class SalesStatsResponseTests(TestCase):
+    """Forma de la respuesta de /stats/sales/"""
+
+    def test_sales_amounts_are_json_numbers(self):
+        User = get_user_model()
+        admin = User.objects.create_user(username='admin', password='x', is_staff=True)
+        category = Category.objects.create(name='Motos', slug='motos')
+        brand = Brand.objects.create(name='Marca', slug='marca')
+        product = Product.objects.create(
+            name='Moto 150', slug='moto-150', category=category, brand=brand,
+            model='150', year=2024, description='Moto', price=Decimal('2500.00'), color='Rojo',
+        )
+        plan = FinancingPlan.objects.create(
+            name='Inmediato', plan_type='immediate', description='Inmediato',
+            min_term=1, max_term=60, interest_rate=Decimal('12.00'),
+            down_payment_percentage=Decimal('30.00'),
+        )
+        CreditApplication.objects.bulk_create([
+            CreditApplication(
+                user=admin, product=product, financing_plan=plan, amount=amount,
+                term_months=12, monthly_payment=Decimal('150.00'),
+                status='approved', approved_at=timezone.now(),
+            )
+            for amount in (Decimal('2500.10'), Decimal('1200.25'))
+        ])
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        response = client.get('/api/v1/dashboard/stats/sales/', {'period': 'week'})
+
+        self.assertEqual(response.status_code, 200)
+        buckets = response.json()
+        self.assertEqual(len(buckets), 8)
+        for bucket in buckets:
+            self.assertEqual(set(bucket), {'date', 'count', 'amount'})
+            self.assertIsInstance(bucket['amount'], (int, float))
+        self.assertEqual(buckets[0]['amount'], 0)
+        self.assertEqual(buckets[-1], {
+            'date': timezone.localdate().isoformat(), 'count': 2, 'amount': 3700.35,
+        })
+
+
+class PaymentTimelinessTests(TestCase):
+    """Pagos puntuales y tardíos por mes y por plan según el vencimiento de la cuota"""
+
+    def test_timeliness_buckets(self):
+        User = get_user_model()
+        client_user = User.objects.create_user(username='cliente', password='x')
+        category = Category.objects.create(name='Motos', slug='motos')
+        brand = Brand.objects.create(name='Marca', slug='marca')
+        product = Product.objects.create(
+            name='Moto 150', slug='moto-150', category=category, brand=brand,
+            model='150', year=2024, description='Moto', price=Decimal('2500.00'), color='Rojo',
+        )
+        plans = [
+            FinancingPlan.objects.create(
+                name=name, plan_type='immediate', description=name,
+                min_term=1, max_term=60, interest_rate=Decimal('12.00'),
+                down_payment_percentage=Decimal('30.00'),
+            )
+            for name in ('Plan A', 'Plan B')
+        ]
+        applications = [
+            CreditApplication.objects.create(
+                user=client_user, product=product, financing_plan=plan,
+                amount=Decimal('2500.00'), term_months=12, monthly_payment=Decimal('150.00'),
+            )
+            for plan in plans
+        ]
+        method = PaymentMethod.objects.create(name='Transferencia')
+
+        def pay(application, number, due_date, payment_date, status='verified', linked=True):
+            payment = Payment.objects.create(
+                application=application, user=client_user, payment_method=method,
+                amount=Decimal('150.00'), payment_date=payment_date, status=status,
+            )
+            PaymentSchedule.objects.create(
+                application=application, payment_number=number, due_date=due_date,
+                amount=Decimal('150.00'), principal=Decimal('140.00'), interest=Decimal('10.00'),
+                payment=payment if linked else None,
+            )
+
+        plan_a, plan_b = applications
+        pay(plan_a, 1, date(2026, 1, 10), date(2026, 1, 10))           # puntual (mismo día)
+        pay(plan_a, 2, date(2026, 1, 20), date(2026, 1, 25))           # tardío
+        pay(plan_a, 3, date(2026, 2, 10), date(2026, 2, 1))            # puntual (adelantado)
+        pay(plan_b, 1, date(2026, 2, 1), date(2026, 2, 3))             # tardío
+        pay(plan_b, 2, date(2026, 2, 5), date(2026, 2, 20), status='pending')  # sin verificar
+        pay(plan_b, 3, date(2026, 3, 1), date(2026, 3, 9), linked=False)       # sin cuota
+
+        with self.assertNumQueries(1):
+            timeliness = DashboardAnalytics.get_payment_timeliness()
+
+        self.assertEqual((timeliness['on_time'], timeliness['late'], timeliness['on_time_rate']), (2, 2, 0.5))
+        self.assertEqual(timeliness['by_month'], [
+            {'month': '2026-01', 'on_time': 1, 'late': 1, 'on_time_rate': 0.5},
+            {'month': '2026-02', 'on_time': 1, 'late': 1, 'on_time_rate': 0.5},
+        ])
+        self.assertEqual(timeliness['by_plan'], [
+            {'plan_id': plans[0].pk, 'plan_name': 'Plan A', 'on_time': 2, 'late': 1, 'on_time_rate': 2 / 3},
+            {'plan_id': plans[1].pk, 'plan_name': 'Plan B', 'on_time': 0, 'late': 1, 'on_time_rate': 0},
+        ])
 
-# Create your tests here.
+        # Con un queryset acotado solo se consideran sus pagos
+        january = DashboardAnalytics.get_payment_timeliness(
+            Payment.objects.filter(payment_date__lt=date(2026, 2, 1))
+        )
+        self.assertEqual((january['on_time'], january['late']), (1, 1))
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import FinancingPlan, PlanRequirement, FinancingSimulation, PaymentSchedule
+from .services import get_simulation_schedule
 
 class PlanRequirementInline(admin.TabularInline):
     model = PlanRequirement
@@ -36,7 +37,8 @@ class FinancingSimulationAdmin(admin.ModelAdmin):
     search_fields = ('user__username', 'user__email', 'product__name')
     readonly_fields = ('user', 'product', 'plan', 'term_months', 'total_price', 
                       'down_payment', 'monthly_payment', 'adjudication_payment',
-                      'adjudication_month', 'total_interest', 'total_amount', 'created_at')
+                      'adjudication_month', 'total_interest', 'total_amount', 'created_at',
+                      'schedule_installments')
     fieldsets = (
         ('User & Product', {
             'fields': ('user', 'product')
@@ -46,7 +48,8 @@ class FinancingSimulationAdmin(admin.ModelAdmin):
         }),
         ('Payment Information', {
             'fields': ('down_payment', 'monthly_payment', 'adjudication_payment', 
-                      'adjudication_month', 'total_interest', 'total_amount')
+                      'adjudication_month', 'total_interest', 'total_amount',
+                      'schedule_installments')
         }),
         ('System Information', {
             'fields': ('created_at',)
@@ -54,6 +57,11 @@ class FinancingSimulationAdmin(admin.ModelAdmin):
     )
     inlines = [PaymentScheduleInline]
     
+    def schedule_installments(self, obj):
+        """Number of installments, including packed schedules not shown in the inline"""
+        return len(get_simulation_schedule(obj))
+    schedule_installments.short_description = 'Installments'
+    
     def has_add_permission(self, request):
         return False
     
@@ -0,0 +1,142 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+class ScheduleCache:
+    """
+    Caché LRU con expiración (TTL) para los resultados del calculador de financiamiento.
+
+    Las claves incluyen el precio y la marca de versión del plan (``updated_at``), por
+    lo que un resultado nunca se sirve con datos desactualizados aunque otro proceso
+    haya modificado el plan o el producto: la invalidación por señales solo libera
+    memoria en el proceso actual.
+    """
+
+    # Posiciones dentro de la clave (ver make_key)
+    PRODUCT_INDEX = 0
+    PLAN_INDEX = 2
+
+    def __init__(self, max_entries=512, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(product, plan, term_months, down_payment=None, simulation_date=None):
+        """
+        Construye la clave normalizada para un cálculo.
+
+        Args:
+            product: Producto (puede no estar guardado, p. ej. precio libre)
+            plan: Plan de financiamiento
+            term_months: Plazo en meses
+            down_payment: Pago inicial (opcional)
+            simulation_date: Fecha de inicio de la simulación
+
+        Returns:
+            tuple: Clave hashable
+        """
+        version = plan.updated_at.timestamp() if plan.updated_at else None
+        return (
+            product.pk,
+            product.price.normalize(),
+            plan.pk,
+            version,
+            int(term_months),
+            down_payment.normalize() if down_payment is not None else None,
+            simulation_date.isoformat() if simulation_date else None,
+        )
+
+    def get(self, key):
+        """Devuelve el valor en caché o None si no existe o expiró"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.evictions += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Guarda un valor, descartando las entradas menos usadas si se excede el límite"""
+        if self.max_entries <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """
+        Devuelve el valor en caché o lo calcula y lo guarda.
+
+        Los resultados con error no se guardan. El valor devuelto es compartido
+        entre solicitudes y debe tratarse como de solo lectura.
+        """
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            if 'error' not in value:
+                self.set(key, value)
+        return value
+
+    def invalidate(self, product_id=None, plan_id=None):
+        """Elimina las entradas de un producto y/o de un plan"""
+        with self._lock:
+            stale = [
+                key for key in self._entries
+                if (product_id is not None and key[self.PRODUCT_INDEX] == product_id)
+                or (plan_id is not None and key[self.PLAN_INDEX] == plan_id)
+            ]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self):
+        """Vacía la caché y reinicia los contadores"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def stats(self):
+        """Contadores de la caché para monitoreo (por proceso)"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / lookups) if lookups > 0 else 0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+            }
+
+
+schedule_cache = ScheduleCache(
+    max_entries=getattr(settings, 'FINANCING_CACHE_MAX_ENTRIES', 512),
+    ttl=getattr(settings, 'FINANCING_CACHE_TTL', 3600),
+)
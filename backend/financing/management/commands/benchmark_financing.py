@@ -0,0 +1,45 @@
+import timeit
+from datetime import date
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from financing.models import FinancingPlan
+from financing.services import compute_financing
+from products.models import Product
+
+
+class Command(BaseCommand):
+    """Mide el costo por solicitud del motor de cronogramas de financiamiento"""
+    help = 'Benchmark del cálculo de financiamiento para plazos de 12, 60 y 360 meses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--terms', type=int, nargs='+', default=[12, 60, 360],
+                            help='Plazos en meses a medir')
+        parser.add_argument('--number', type=int, default=200,
+                            help='Cálculos por medición')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Mediciones por plazo (se reporta la mejor)')
+
+    def handle(self, *args, **options):
+        # Instancias en memoria: el benchmark mide solo el cálculo, no la base de datos
+        product = Product(id=0, name='Benchmark', price=Decimal('25000.00'))
+        plans = [
+            FinancingPlan(id=0, name='Programada', plan_type='programmed',
+                          min_term=1, max_term=max(options['terms']),
+                          interest_rate=Decimal('0.00'), adjudication_percentage=Decimal('45.00')),
+            FinancingPlan(id=0, name='Inmediata', plan_type='immediate',
+                          min_term=1, max_term=max(options['terms']),
+                          interest_rate=Decimal('18.00'), down_payment_percentage=Decimal('30.00')),
+        ]
+        simulation_date = date(2025, 1, 31)
+
+        self.stdout.write(f"{'plan':<12}{'plazo':>8}{'ms/solicitud':>16}")
+        for plan in plans:
+            for term in options['terms']:
+                timer = timeit.Timer(
+                    lambda: compute_financing(product, plan, term, simulation_date=simulation_date)
+                )
+                best = min(timer.repeat(repeat=options['repeat'], number=options['number']))
+                per_request_ms = best / options['number'] * 1000
+                self.stdout.write(f"{plan.plan_type:<12}{term:>8}{per_request_ms:>16.3f}")
@@ -0,0 +1,23 @@
+# Generated by Django 4.2 on 2026-10-17 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("financing", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="financingsimulation",
+            name="packed_schedule",
+            field=models.BinaryField(
+                blank=True,
+                editable=False,
+                null=True,
+                verbose_name="Packed Payment Schedule",
+            ),
+        ),
+    ]
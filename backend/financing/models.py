@@ -77,6 +77,9 @@ class FinancingSimulation(models.Model):
     total_interest = models.DecimalField(_("Total Interest"), max_digits=12, decimal_places=2)
     total_amount = models.DecimalField(_("Total Amount to Pay"), max_digits=12, decimal_places=2)
     
+    # Compact schedule storage (replaces PaymentSchedule rows when set)
+    packed_schedule = models.BinaryField(_("Packed Payment Schedule"), null=True, blank=True, editable=False)
+    
     # System fields
     created_at = models.DateTimeField(auto_now_add=True)
     
@@ -0,0 +1,78 @@
+import struct
+import zlib
+from datetime import date
+from decimal import Decimal
+
+# Formato binario de cada cuota: número de cuota, fecha (ordinal), capital,
+# interés, pago total y saldo (en céntimos) e indicador de adjudicación
+ROW_FORMAT = struct.Struct('<HIqqqq?')
+FORMAT_VERSION = 1
+
+CENT = Decimal('0.01')
+
+
+def _to_cents(value):
+    """
+    Convierte un monto (Decimal, float o str) a céntimos enteros, redondeando
+    igual que un DecimalField de dos decimales al guardarse en la base de datos.
+    """
+    return int((Decimal(str(value)) * 100).quantize(Decimal('1')))
+
+
+def to_date(value):
+    """Acepta una fecha o una cadena ISO"""
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(value)
+
+
+def pack_schedule(payment_schedule):
+    """
+    Empaqueta un cronograma de pagos en un blob binario comprimido.
+
+    Args:
+        payment_schedule: Lista de cuotas con payment_number, payment_date, principal,
+                          interest, total_payment, remaining_balance e is_adjudication
+
+    Returns:
+        bytes: Cronograma empaquetado
+    """
+    body = b''.join(
+        ROW_FORMAT.pack(
+            item['payment_number'],
+            to_date(item['payment_date']).toordinal(),
+            _to_cents(item['principal']),
+            _to_cents(item['interest']),
+            _to_cents(item['total_payment']),
+            _to_cents(item['remaining_balance']),
+            bool(item['is_adjudication']),
+        )
+        for item in payment_schedule
+    )
+    return bytes([FORMAT_VERSION]) + zlib.compress(body)
+
+
+def unpack_schedule(blob):
+    """
+    Reconstruye el cronograma de pagos a partir de un blob de pack_schedule.
+
+    Returns:
+        list: Cuotas con montos Decimal y fechas date
+    """
+    blob = bytes(blob)
+    if blob[0] != FORMAT_VERSION:
+        raise ValueError(f"Versión de cronograma empaquetado no soportada: {blob[0]}")
+
+    return [
+        {
+            'payment_number': number,
+            'payment_date': date.fromordinal(ordinal),
+            'principal': Decimal(principal) * CENT,
+            'interest': Decimal(interest) * CENT,
+            'total_payment': Decimal(total) * CENT,
+            'remaining_balance': Decimal(balance) * CENT,
+            'is_adjudication': is_adjudication,
+        }
+        for number, ordinal, principal, interest, total, balance, is_adjudication
+        in ROW_FORMAT.iter_unpack(zlib.decompress(blob[1:]))
+    ]
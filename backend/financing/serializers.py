@@ -1,3 +1,4 @@
+from decimal import Decimal
 from rest_framework import serializers
 from .models import FinancingPlan, PlanRequirement, FinancingSimulation, PaymentSchedule
 from products.serializers import ProductListSerializer, ProductDetailSerializer
@@ -183,6 +184,74 @@ class FinancingCalculatorSerializer(serializers.Serializer):
             
         return data
 
+class FinancingMatrixSerializer(serializers.Serializer):
+    """Parámetros para calcular la grilla de financiamiento de uno o varios productos"""
+    
+    product_id = serializers.IntegerField(required=False)
+    product_ids = serializers.ListField(
+        child=serializers.IntegerField(), required=False, max_length=50
+    )
+    plan_ids = serializers.ListField(child=serializers.IntegerField(), required=False)
+    
+    # Rango de plazos (por defecto, el rango de cada plan)
+    term_min = serializers.IntegerField(min_value=1, max_value=120, required=False)
+    term_max = serializers.IntegerField(min_value=1, max_value=120, required=False)
+    term_step = serializers.IntegerField(min_value=1, max_value=120, default=1)
+    
+    # Rango de pago inicial en porcentaje (por defecto, el mínimo de cada plan)
+    down_payment_min = serializers.DecimalField(
+        max_digits=5, decimal_places=2, min_value=Decimal('0'), max_value=Decimal('100'), required=False
+    )
+    down_payment_max = serializers.DecimalField(
+        max_digits=5, decimal_places=2, min_value=Decimal('0'), max_value=Decimal('100'), required=False
+    )
+    down_payment_step = serializers.DecimalField(
+        max_digits=5, decimal_places=2, min_value=Decimal('0.01'), max_value=Decimal('100'),
+        default=Decimal('5.00')
+    )
+    
+    def validate(self, data):
+        """
+        Normalizar productos y rangos
+        """
+        product_ids = list(data.get('product_ids') or [])
+        if data.get('product_id') is not None:
+            product_ids.insert(0, data['product_id'])
+        if not product_ids:
+            raise serializers.ValidationError(
+                {'product_ids': 'Debe indicar al menos un producto'}
+            )
+        data['product_ids'] = list(dict.fromkeys(product_ids))
+        
+        terms = None
+        if 'term_min' in data or 'term_max' in data:
+            term_min = data.get('term_min', 1)
+            term_max = data.get('term_max', 120)
+            if term_min > term_max:
+                raise serializers.ValidationError(
+                    {'term_min': 'El plazo mínimo no puede ser mayor que el máximo'}
+                )
+            terms = list(range(term_min, term_max + 1, data['term_step']))
+        data['terms'] = terms
+        
+        percentages = None
+        if 'down_payment_min' in data or 'down_payment_max' in data:
+            down_min = data.get('down_payment_min', data.get('down_payment_max'))
+            down_max = data.get('down_payment_max', down_min)
+            if down_min > down_max:
+                raise serializers.ValidationError(
+                    {'down_payment_min': 'El pago inicial mínimo no puede ser mayor que el máximo'}
+                )
+            percentages = []
+            current = down_min
+            while current <= down_max:
+                percentages.append(current)
+                current += data['down_payment_step']
+        data['down_payment_percentages'] = percentages
+        
+        # El tamaño de la grilla depende de los planes; lo limita calculate_financing_matrix
+        return data
+
 class PaymentDetailSerializer(serializers.Serializer):
     payment_number = serializers.IntegerField()
     payment_date = serializers.DateField()
@@ -1,7 +1,12 @@
+from calendar import monthrange
 from datetime import date, timedelta
 from decimal import Decimal, ROUND_HALF_UP
+from .cache import schedule_cache
 from .models import FinancingSimulation, PaymentSchedule, FinancingPlan
-from dateutil.relativedelta import relativedelta
+from .packing import pack_schedule, unpack_schedule, to_date
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists
 from django.utils import timezone
 from products.models import Product
 
@@ -158,53 +163,340 @@ class FinancingCalculator:
         Returns:
             FinancingSimulation: The saved simulation
         """
-        # Create the simulation record
-        if plan.plan_type == 'programmed':
-            simulation = FinancingSimulation.objects.create(
-                user=user,
-                product=product,
-                plan=plan,
-                term_months=term_months,
-                total_price=total_price,
-                down_payment=Decimal('0.00'),
-                monthly_payment=results['monthly_payment'],
-                adjudication_payment=results['adjudication_payment'],
-                adjudication_month=results['adjudication_month'],
-                total_interest=results['total_interest'],
-                total_amount=results['total_amount']
-            )
-        else:  # immediate
-            simulation = FinancingSimulation.objects.create(
-                user=user,
-                product=product,
-                plan=plan,
-                term_months=term_months,
-                total_price=total_price,
-                down_payment=results['down_payment'],
-                monthly_payment=results['monthly_payment'],
-                total_interest=results['total_interest'],
-                total_amount=results['total_amount']
-            )
-        
-        # Create payment schedule records
         start_date = date.today()
-        
-        for item in results['payment_schedule']:
-            payment_date = start_date + timedelta(days=30 * item['payment_number'])
+        payment_schedule = [
+            dict(item, payment_date=start_date + timedelta(days=30 * item['payment_number']))
+            for item in results['payment_schedule']
+        ]
+        packed = pack_schedule(payment_schedule) if schedule_storage_is_packed() else None
+        
+        with transaction.atomic():
+            # Create the simulation record
+            if plan.plan_type == 'programmed':
+                simulation = FinancingSimulation.objects.create(
+                    user=user,
+                    product=product,
+                    plan=plan,
+                    term_months=term_months,
+                    total_price=total_price,
+                    down_payment=Decimal('0.00'),
+                    monthly_payment=results['monthly_payment'],
+                    adjudication_payment=results['adjudication_payment'],
+                    adjudication_month=results['adjudication_month'],
+                    total_interest=results['total_interest'],
+                    total_amount=results['total_amount'],
+                    packed_schedule=packed
+                )
+            else:  # immediate
+                simulation = FinancingSimulation.objects.create(
+                    user=user,
+                    product=product,
+                    plan=plan,
+                    term_months=term_months,
+                    total_price=total_price,
+                    down_payment=results['down_payment'],
+                    monthly_payment=results['monthly_payment'],
+                    total_interest=results['total_interest'],
+                    total_amount=results['total_amount'],
+                    packed_schedule=packed
+                )
             
-            PaymentSchedule.objects.create(
-                simulation=simulation,
-                payment_number=item['payment_number'],
-                payment_date=payment_date,
-                principal=item['principal'],
-                interest=item['interest'],
-                total_payment=item['total_payment'],
-                remaining_balance=item['remaining_balance'],
-                is_adjudication=item['is_adjudication']
-            )
+            if packed is None:
+                create_schedule_rows(simulation, payment_schedule)
         
         return simulation
 
+def _schedule_dates(start_date, term_months):
+    """
+    Genera las fechas de pago como cadenas ISO sin aplicar relativedelta mes a mes.
+    
+    Reproduce exactamente el encadenamiento de ``relativedelta(months=1)``: cuando
+    un mes no tiene el día de inicio, el día se ajusta al último del mes y ese
+    ajuste se conserva en los meses siguientes.
+    
+    Args:
+        start_date: Fecha del primer pago
+        term_months: Cantidad de pagos
+        
+    Returns:
+        list: Fechas en formato YYYY-MM-DD
+    """
+    year, month, day = start_date.year, start_date.month, start_date.day
+    dates = []
+    
+    for _ in range(term_months):
+        dates.append(f"{year:04d}-{month:02d}-{day:02d}")
+        
+        month += 1
+        if month > 12:
+            month = 1
+            year += 1
+        day = min(day, monthrange(year, month)[1])
+    
+    return dates
+
+
+def build_programmed_columns(total_price, term_months, adjudication_percentage):
+    """
+    Calcula en forma cerrada las columnas del plan de Compra Programada.
+    
+    La cuota es constante y sin interés, por lo que el saldo del mes ``i`` es
+    ``precio - cuota * i`` y no depende de los meses anteriores.
+    
+    Args:
+        total_price: Precio del producto (Decimal)
+        term_months: Plazo en meses
+        adjudication_percentage: Porcentaje de adjudicación (Decimal, 0-100)
+        
+    Returns:
+        dict: Cuota, mes y pago de adjudicación, columnas y totales
+    """
+    adjudication_amount = total_price * (adjudication_percentage / Decimal('100'))
+    monthly_payment = adjudication_amount / Decimal(term_months)
+    adjudication_month = int((adjudication_amount / monthly_payment).quantize(Decimal('1')))
+    adjudication_payment = total_price - (monthly_payment * adjudication_month)
+    
+    zero = Decimal('0')
+    balances = []
+    for i in range(1, term_months + 1):
+        remaining = total_price - monthly_payment * i
+        balances.append(remaining if remaining > 0 else zero)
+    
+    totals = [monthly_payment] * term_months
+    if 1 <= adjudication_month <= term_months:
+        totals[adjudication_month - 1] = monthly_payment + adjudication_payment
+    
+    return {
+        'monthly_payment': monthly_payment,
+        'adjudication_month': adjudication_month,
+        'adjudication_payment': adjudication_payment,
+        'principal': [monthly_payment] * term_months,
+        'interest': [zero] * term_months,
+        'total_payment': totals,
+        'remaining_balance': balances,
+        'total_interest': zero,
+        'total_amount': sum(totals, zero),
+    }
+
+
+def build_amortization_columns(finance_amount, monthly_interest_rate, term_months):
+    """
+    Calcula las columnas de una amortización francesa (cuota fija).
+    
+    El capital amortizado crece geométricamente: ``capital_k = capital_1 * (1 + i)^(k-1)``,
+    así que cada fila se obtiene con una sola multiplicación sobre la anterior. El
+    último pago absorbe el residuo de redondeo para dejar el saldo en cero.
+    
+    Args:
+        finance_amount: Monto a financiar (Decimal)
+        monthly_interest_rate: Tasa mensual en fracción (Decimal)
+        term_months: Plazo en meses
+        
+    Returns:
+        dict: Cuota, columnas y totales
+    """
+    zero = Decimal('0')
+    
+    if monthly_interest_rate == 0:
+        monthly_payment = finance_amount / Decimal(term_months)
+    else:
+        factor = ((1 + monthly_interest_rate) ** term_months)
+        monthly_payment = finance_amount * (monthly_interest_rate * factor) / (factor - 1)
+    
+    growth = 1 + monthly_interest_rate
+    principal_payment = monthly_payment - finance_amount * monthly_interest_rate
+    remaining_balance = finance_amount
+    
+    principals = []
+    interests = []
+    totals = []
+    balances = []
+    
+    for _ in range(term_months - 1):
+        remaining_balance -= principal_payment
+        principals.append(principal_payment)
+        interests.append(monthly_payment - principal_payment)
+        totals.append(monthly_payment)
+        balances.append(remaining_balance if remaining_balance > 0 else zero)
+        principal_payment *= growth
+    
+    # Último pago: liquida el saldo restante (ajuste por redondeo)
+    last_interest = remaining_balance * monthly_interest_rate
+    principals.append(remaining_balance)
+    interests.append(last_interest)
+    totals.append(remaining_balance + last_interest)
+    balances.append(zero)
+    
+    return {
+        'monthly_payment': monthly_payment,
+        'principal': principals,
+        'interest': interests,
+        'total_payment': totals,
+        'remaining_balance': balances,
+        'total_interest': sum(interests, zero),
+        'total_amount': sum(totals, zero),
+    }
+
+
+def format_payment_schedule(columns, simulation_date, adjudication_month=None):
+    """
+    Convierte las columnas calculadas en el cronograma serializable de la API.
+    
+    Args:
+        columns: Resultado de ``build_programmed_columns`` o ``build_amortization_columns``
+        simulation_date: Fecha del primer pago
+        adjudication_month: Mes de adjudicación (solo compra programada)
+        
+    Returns:
+        list: Filas del cronograma con montos en float
+    """
+    dates = _schedule_dates(simulation_date, len(columns['principal']))
+    
+    return [
+        {
+            "payment_number": number,
+            "payment_date": payment_date,
+            "principal": float(principal),
+            "interest": float(interest),
+            "total_payment": float(total),
+            "remaining_balance": float(balance),
+            "is_adjudication": number == adjudication_month
+        }
+        for number, payment_date, principal, interest, total, balance in zip(
+            range(1, len(dates) + 1),
+            dates,
+            columns['principal'],
+            columns['interest'],
+            columns['total_payment'],
+            columns['remaining_balance'],
+        )
+    ]
+
+
+def build_installments(plan, total_price, term_months, down_payment=None, start_date=None):
+    """
+    Calcula las cuotas de un crédito aprobado con el mismo motor que las simulaciones.
+
+    La primera cuota vence un mes después de ``start_date`` y los montos se
+    redondean a céntimos. En adjudicación inmediata el pago inicial no forma parte
+    del cronograma; si no se indica se usa el mínimo del plan.
+
+    Args:
+        plan: Plan de financiamiento
+        total_price: Precio total financiado (Decimal)
+        term_months: Plazo en meses
+        down_payment: Pago inicial (solo adjudicación inmediata)
+        start_date: Fecha de aprobación (por defecto, la fecha actual)
+
+    Returns:
+        list: Tuplas (número, vencimiento, monto, capital, interés)
+    """
+    if plan.plan_type == 'programmed':
+        columns = build_programmed_columns(total_price, term_months, plan.adjudication_percentage)
+    elif plan.plan_type == 'immediate':
+        if down_payment is None:
+            down_payment = total_price * (plan.down_payment_percentage / Decimal('100'))
+        monthly_interest_rate = plan.interest_rate / Decimal('100') / Decimal('12')
+        columns = build_amortization_columns(total_price - down_payment, monthly_interest_rate, term_months)
+    else:
+        raise ValueError(f"Tipo de plan no soportado: {plan.plan_type}")
+
+    start_date = start_date or timezone.now().date()
+    cent = Decimal('0.01')
+    principals = [total - interest for total, interest in zip(columns['total_payment'], columns['interest'])]
+    # La última cuota absorbe el residuo de redondear el capital fila por fila
+    remaining = sum(principals, Decimal('0')).quantize(cent, rounding=ROUND_HALF_UP)
+
+    installments = []
+    for number, due_date, principal, interest in zip(
+        range(1, term_months + 1),
+        _schedule_dates(start_date, term_months + 1)[1:],
+        principals,
+        columns['interest'],
+    ):
+        principal = remaining if number == term_months else principal.quantize(cent, rounding=ROUND_HALF_UP)
+        interest = interest.quantize(cent, rounding=ROUND_HALF_UP)
+        remaining -= principal
+        installments.append((number, date.fromisoformat(due_date), principal + interest, principal, interest))
+    return installments
+
+
+def compute_financing(product, plan, term_months, down_payment=None, simulation_date=None):
+    """
+    Calcula el financiamiento de un producto ya cargado sin consultar la base de datos.
+    
+    Args:
+        product: Producto a financiar (solo se usan id, name y price)
+        plan: Plan de financiamiento
+        term_months: Plazo del financiamiento en meses
+        down_payment: Pago inicial (opcional, solo para adjudicación inmediata)
+        simulation_date: Fecha de inicio de la simulación (por defecto, la fecha actual)
+        
+    Returns:
+        dict: Detalles del financiamiento calculado o {"error": ...}
+    """
+    if term_months < plan.min_term or term_months > plan.max_term:
+        return {"error": f"El plazo debe estar entre {plan.min_term} y {plan.max_term} meses"}
+    
+    # Usar la fecha actual si no se proporciona una
+    if simulation_date is None:
+        simulation_date = timezone.now().date()
+        
+    total_price = product.price
+    
+    product_data = {
+        "id": product.id,
+        "name": product.name,
+        "price": float(product.price)
+    }
+    plan_data = {
+        "id": plan.id,
+        "name": plan.name,
+        "type": plan.plan_type
+    }
+    
+    columns = build_financing_columns(total_price, plan, term_months, down_payment)
+    if 'error' in columns:
+        return columns
+    summary = summarize_financing_columns(plan, columns)
+    
+    # Diferentes detalles según el tipo de plan
+    if plan.plan_type == 'programmed':
+        # Compra Programada con Adjudicación: cuota simple sin interés
+        adjudication_month = summary['adjudication_month']
+        
+        return {
+            "product": product_data,
+            "plan": plan_data,
+            "financing_details": {
+                "term_months": term_months,
+                "monthly_payment": float(summary['monthly_payment']),
+                "adjudication_month": adjudication_month,
+                "adjudication_payment": float(summary['adjudication_payment']),
+                "adjudication_percentage": float(plan.adjudication_percentage),
+                "total_interest": float(summary['total_interest']),
+                "total_amount": float(summary['total_amount'])
+            },
+            "payment_schedule": format_payment_schedule(columns, simulation_date, adjudication_month)
+        }
+    
+    # Crédito de Adjudicación Inmediata
+    return {
+        "product": product_data,
+        "plan": plan_data,
+        "financing_details": {
+            "term_months": term_months,
+            "monthly_payment": float(summary['monthly_payment']),
+            "down_payment": float(summary['down_payment']),
+            "down_payment_percentage": float(plan.down_payment_percentage),
+            "financed_amount": float(summary['financed_amount']),
+            "total_interest": float(summary['total_interest']),
+            "total_amount": float(summary['total_amount'])
+        },
+        "payment_schedule": format_payment_schedule(columns, simulation_date)
+    }
+
+
 def calculate_financing(
     product_id, 
     plan_id, 
@@ -230,189 +522,347 @@ def calculate_financing(
         plan = FinancingPlan.objects.get(id=plan_id)
     except (Product.DoesNotExist, FinancingPlan.DoesNotExist):
         return {"error": "Producto o plan de financiamiento no encontrado"}
-        
-    if term_months < plan.min_term or term_months > plan.max_term:
-        return {"error": f"El plazo debe estar entre {plan.min_term} y {plan.max_term} meses"}
     
-    # Usar la fecha actual si no se proporciona una
+    return get_cached_financing(product, plan, term_months, down_payment, simulation_date)
+
+
+def get_cached_financing(product, plan, term_months, down_payment=None, simulation_date=None):
+    """
+    Devuelve el resultado de ``compute_financing`` usando la caché de cronogramas.
+    
+    La clave incluye precio, versión del plan, plazo, pago inicial y fecha de inicio,
+    así que un cambio en el plan o en el precio produce automáticamente una clave nueva.
+    
+    Args:
+        product: Producto a financiar (puede ser una instancia sin guardar)
+        plan: Plan de financiamiento
+        term_months: Plazo del financiamiento en meses
+        down_payment: Pago inicial (opcional, solo para adjudicación inmediata)
+        simulation_date: Fecha de inicio de la simulación (por defecto, la fecha actual)
+        
+    Returns:
+        dict: Detalles del financiamiento calculado (las listas internas son compartidas)
+    """
+    # Resolver la fecha antes de armar la clave para no servir fechas de otro día
     if simulation_date is None:
         simulation_date = timezone.now().date()
-        
-    total_price = product.price
-    annual_interest_rate = plan.interest_rate / Decimal('100')
-    monthly_interest_rate = annual_interest_rate / Decimal('12')
     
-    # Diferentes cálculos según el tipo de plan
-    if plan.plan_type == 'programmed':
-        # Compra Programada con Adjudicación al 45%
-        adjudication_percentage = plan.adjudication_percentage / Decimal('100')
-        adjudication_amount = total_price * adjudication_percentage
-        
-        # Calcular pago mensual simple (sin interés en la etapa de adjudicación)
-        monthly_payment = adjudication_amount / Decimal(term_months)
-        
-        # Calcular el mes de adjudicación (cuándo se llega al porcentaje)
-        adjudication_month = int((adjudication_amount / monthly_payment).quantize(Decimal('1')))
-        
-        # Calcular pago de adjudicación (el vehículo menos lo pagado)
-        adjudication_payment = total_price - (monthly_payment * adjudication_month)
-        
-        # Crear cronograma de pagos
-        payments = []
-        accumulated = Decimal('0')
-        current_date = simulation_date
-        
-        for i in range(1, term_months + 1):
-            is_adjudication = (i == adjudication_month)
-            payment_amount = monthly_payment
-            
-            # Si es el mes de adjudicación, añadir el pago de adjudicación
-            if is_adjudication:
-                payment_amount = monthly_payment + adjudication_payment
-                
-            accumulated += monthly_payment
-            remaining = total_price - accumulated
-            
-            payments.append({
-                "payment_number": i,
-                "payment_date": current_date,
-                "principal": monthly_payment,
-                "interest": Decimal('0'),  # No hay interés en la etapa inicial
-                "total_payment": payment_amount,
-                "remaining_balance": remaining if remaining > 0 else Decimal('0'),
-                "is_adjudication": is_adjudication
-            })
-            
-            current_date = current_date + relativedelta(months=1)
-            
-        # Cálculos totales
-        total_payments = sum(p["total_payment"] for p in payments)
-        total_interest = Decimal('0')  # No hay interés en este plan
-            
-        return {
-            "product": {
-                "id": product.id,
-                "name": product.name,
-                "price": float(product.price)
-            },
-            "plan": {
-                "id": plan.id,
-                "name": plan.name,
-                "type": plan.plan_type
-            },
-            "financing_details": {
-                "term_months": term_months,
-                "monthly_payment": float(monthly_payment),
-                "adjudication_month": adjudication_month,
-                "adjudication_payment": float(adjudication_payment),
-                "adjudication_percentage": float(plan.adjudication_percentage),
-                "total_interest": float(total_interest),
-                "total_amount": float(total_payments)
-            },
-            "payment_schedule": [
-                {
-                    "payment_number": p["payment_number"],
-                    "payment_date": p["payment_date"].strftime("%Y-%m-%d"),
-                    "principal": float(p["principal"]),
-                    "interest": float(p["interest"]),
-                    "total_payment": float(p["total_payment"]),
-                    "remaining_balance": float(p["remaining_balance"]),
-                    "is_adjudication": p["is_adjudication"]
-                }
-                for p in payments
-            ]
+    key = schedule_cache.make_key(product, plan, term_months, down_payment, simulation_date)
+    result = schedule_cache.get_or_compute(
+        key,
+        lambda: compute_financing(product, plan, term_months, down_payment, simulation_date)
+    )
+    
+    if 'error' in result:
+        return result
+    
+    # Los datos descriptivos del producto se toman siempre de la instancia actual
+    return {
+        **result,
+        "product": {
+            "id": product.id,
+            "name": product.name,
+            "price": float(product.price)
         }
+    }
+
+def build_financing_columns(total_price, plan, term_months, down_payment=None):
+    """
+    Calcula las columnas del financiamiento según el tipo de plan.
+    
+    Es el único punto que valida el pago inicial y elige la fórmula del plan;
+    ``compute_financing``, ``build_financing_summary`` y la grilla parten de aquí.
+    
+    Args:
+        total_price: Precio del producto (Decimal)
+        plan: Plan de financiamiento
+        term_months: Plazo en meses
+        down_payment: Pago inicial (opcional, solo para adjudicación inmediata)
         
+    Returns:
+        dict: Resultado de ``build_programmed_columns`` o de
+              ``build_amortization_columns`` (más down_payment y financed_amount),
+              o {"error": ...}
+    """
+    if plan.plan_type == 'programmed':
+        return build_programmed_columns(total_price, term_months, plan.adjudication_percentage)
+    
     elif plan.plan_type == 'immediate':
-        # Crédito de Adjudicación Inmediata
-        
-        # Validar pago inicial
         min_down_payment = total_price * (plan.down_payment_percentage / Decimal('100'))
         if down_payment is None:
             down_payment = min_down_payment
         elif down_payment < min_down_payment:
             return {"error": f"El pago inicial debe ser al menos {float(min_down_payment)} ({plan.down_payment_percentage}%)"}
-            
-        # Calcular monto a financiar
+        
         finance_amount = total_price - down_payment
+        monthly_interest_rate = plan.interest_rate / Decimal('100') / Decimal('12')
+        
+        columns = build_amortization_columns(finance_amount, monthly_interest_rate, term_months)
+        columns['down_payment'] = down_payment
+        columns['financed_amount'] = finance_amount
+        return columns
+    
+    return {"error": "Tipo de plan no soportado"}
+
+
+def summarize_financing_columns(plan, columns):
+    """
+    Cuota y totales (en Decimal) de las columnas de ``build_financing_columns``.
+    
+    En adjudicación inmediata la cuota informada es la última, que incluye el
+    ajuste de redondeo, igual que en el detalle de ``compute_financing``.
+    """
+    if plan.plan_type == 'programmed':
+        return {
+            'monthly_payment': columns['monthly_payment'],
+            'adjudication_month': columns['adjudication_month'],
+            'adjudication_payment': columns['adjudication_payment'],
+            'total_interest': columns['total_interest'],
+            'total_amount': columns['total_amount'],
+        }
+    
+    return {
+        'monthly_payment': columns['total_payment'][-1],
+        'down_payment': columns['down_payment'],
+        'financed_amount': columns['financed_amount'],
+        'total_interest': columns['total_interest'],
+        'total_amount': columns['down_payment'] + columns['total_amount'],
+    }
+
+
+def build_financing_summary(total_price, plan, term_months, down_payment=None):
+    """
+    Calcula la cuota y los totales de un financiamiento sin formatear el cronograma.
+    
+    Usa las mismas columnas que ``compute_financing``, así que los montos coinciden
+    exactamente; se usa para grillas y listados donde solo interesan cuota y totales.
+    
+    Args:
+        total_price: Precio del producto (Decimal)
+        plan: Plan de financiamiento
+        term_months: Plazo en meses
+        down_payment: Pago inicial (opcional, solo para adjudicación inmediata)
         
-        # Calcular cuota mensual con interés (fórmula de amortización)
-        if monthly_interest_rate == 0:
-            monthly_payment = finance_amount / Decimal(term_months)
-        else:
-            factor = ((1 + monthly_interest_rate) ** term_months)
-            monthly_payment = finance_amount * (monthly_interest_rate * factor) / (factor - 1)
+    Returns:
+        dict: Cuota y totales en Decimal, o {"error": ...}
+    """
+    columns = build_financing_columns(total_price, plan, term_months, down_payment)
+    if 'error' in columns:
+        return columns
+    return summarize_financing_columns(plan, columns)
+
+
+# Máximo de combinaciones producto × plan × plazo × pago inicial por grilla
+MATRIX_MAX_CELLS = 5000
+
+
+def matrix_plan_axes(plan, terms=None, down_payment_percentages=None):
+    """
+    Plazos y porcentajes de pago inicial que la grilla evalúa para un plan.
+    
+    Returns:
+        tuple: (plazos dentro del rango del plan, porcentajes >= mínimo del plan
+               o [None] si el plan no usa pago inicial)
+    """
+    if terms is None:
+        plan_terms = range(plan.min_term, plan.max_term + 1)
+    else:
+        plan_terms = [t for t in terms if plan.min_term <= t <= plan.max_term]
+    
+    if plan.plan_type == 'immediate':
+        percentages = down_payment_percentages or [plan.down_payment_percentage]
+        percentages = [p for p in percentages if p >= plan.down_payment_percentage]
+    else:
+        percentages = [None]
+    
+    return plan_terms, percentages
+
+
+def count_matrix_cells(product_count, plans, terms=None, down_payment_percentages=None):
+    """Número exacto de celdas que calcularía ``build_financing_matrix``"""
+    per_product = 0
+    for plan in plans:
+        plan_terms, percentages = matrix_plan_axes(plan, terms, down_payment_percentages)
+        per_product += len(plan_terms) * len(percentages)
+    return product_count * per_product
+
+
+def build_financing_matrix(products, plans, terms=None, down_payment_percentages=None):
+    """
+    Calcula la grilla producto × plan × plazo × pago inicial a partir de objetos ya cargados.
+    
+    Args:
+        products: Productos a financiar
+        plans: Planes de financiamiento
+        terms: Plazos en meses a evaluar (por defecto, todo el rango de cada plan)
+        down_payment_percentages: Porcentajes de pago inicial para planes de
+            adjudicación inmediata (por defecto, el mínimo de cada plan). Los
+            porcentajes por debajo del mínimo del plan se omiten.
         
-        # Crear cronograma de pagos
-        payments = []
-        current_date = simulation_date
-        remaining_balance = finance_amount
+    Returns:
+        list: Una entrada por producto con las opciones de cada plan
+    """
+    hundred = Decimal('100')
+    matrix = []
+    
+    for product in products:
+        plans_data = []
         
-        for i in range(1, term_months + 1):
-            interest_payment = remaining_balance * monthly_interest_rate
-            principal_payment = monthly_payment - interest_payment
+        for plan in plans:
+            plan_terms, percentages = matrix_plan_axes(plan, terms, down_payment_percentages)
             
-            if i == term_months:  # Último pago - ajustar por redondeo
-                principal_payment = remaining_balance
-                monthly_payment = principal_payment + interest_payment
+            options = []
+            for percentage in percentages:
+                down_payment = None
+                if percentage is not None:
+                    down_payment = product.price * (percentage / hundred)
                 
-            remaining_balance -= principal_payment
+                for term in plan_terms:
+                    summary = build_financing_summary(product.price, plan, term, down_payment)
+                    if 'error' in summary:
+                        continue
+                    
+                    option = {
+                        'term_months': term,
+                        'monthly_payment': float(summary['monthly_payment']),
+                        'total_interest': float(summary['total_interest']),
+                        'total_amount': float(summary['total_amount']),
+                    }
+                    if plan.plan_type == 'programmed':
+                        option['adjudication_month'] = summary['adjudication_month']
+                        option['adjudication_payment'] = float(summary['adjudication_payment'])
+                    else:
+                        option['down_payment_percentage'] = float(percentage)
+                        option['down_payment'] = float(summary['down_payment'])
+                        option['financed_amount'] = float(summary['financed_amount'])
+                    options.append(option)
             
-            if remaining_balance < 0:
-                remaining_balance = Decimal('0')
-                
-            payments.append({
-                "payment_number": i,
-                "payment_date": current_date,
-                "principal": principal_payment,
-                "interest": interest_payment,
-                "total_payment": monthly_payment,
-                "remaining_balance": remaining_balance,
-                "is_adjudication": False
+            plans_data.append({
+                'id': plan.id,
+                'name': plan.name,
+                'type': plan.plan_type,
+                'options': options
             })
-            
-            current_date = current_date + relativedelta(months=1)
         
-        # Cálculos totales
-        total_payments = down_payment + sum(p["total_payment"] for p in payments)
-        total_interest = sum(p["interest"] for p in payments)
+        matrix.append({
+            'id': product.id,
+            'name': product.name,
+            'price': float(product.price),
+            'plans': plans_data
+        })
+    
+    return matrix
+
+
+def calculate_financing_matrix(product_ids, plan_ids=None, terms=None, down_payment_percentages=None):
+    """
+    Calcula la grilla de financiamiento para varios productos con una sola lectura por tabla.
+    
+    Args:
+        product_ids: IDs de los productos
+        plan_ids: IDs de los planes (por defecto, todos los planes activos)
+        terms: Plazos en meses a evaluar (opcional)
+        down_payment_percentages: Porcentajes de pago inicial (opcional)
         
+    Returns:
+        dict: Grilla de financiamiento o {"error": ...} (con too_large si la
+              grilla supera MATRIX_MAX_CELLS)
+    """
+    products = list(
+        Product.objects.filter(id__in=product_ids).only('id', 'name', 'price').order_by('id')
+    )
+    if not products:
+        return {"error": "Producto no encontrado"}
+    
+    plans = FinancingPlan.objects.filter(is_active=True).order_by('id')
+    if plan_ids:
+        plans = plans.filter(id__in=plan_ids)
+    plans = list(plans)
+    
+    # Limitar por el tamaño real de la grilla antes de calcular cualquier celda
+    cells = count_matrix_cells(len(products), plans, terms, down_payment_percentages)
+    if cells > MATRIX_MAX_CELLS:
         return {
-            "product": {
-                "id": product.id,
-                "name": product.name,
-                "price": float(product.price)
-            },
-            "plan": {
-                "id": plan.id,
-                "name": plan.name,
-                "type": plan.plan_type
-            },
-            "financing_details": {
-                "term_months": term_months,
-                "monthly_payment": float(monthly_payment),
-                "down_payment": float(down_payment),
-                "down_payment_percentage": float(plan.down_payment_percentage),
-                "financed_amount": float(finance_amount),
-                "total_interest": float(total_interest),
-                "total_amount": float(total_payments)
-            },
-            "payment_schedule": [
-                {
-                    "payment_number": p["payment_number"],
-                    "payment_date": p["payment_date"].strftime("%Y-%m-%d"),
-                    "principal": float(p["principal"]),
-                    "interest": float(p["interest"]),
-                    "total_payment": float(p["total_payment"]),
-                    "remaining_balance": float(p["remaining_balance"]),
-                    "is_adjudication": p["is_adjudication"]
-                }
-                for p in payments
-            ]
+            "error": f"La grilla solicitada es demasiado grande ({cells} combinaciones, máximo {MATRIX_MAX_CELLS})",
+            "too_large": True
         }
+    
+    return {
+        "products": build_financing_matrix(products, plans, terms, down_payment_percentages)
+    }
+
+def schedule_storage_is_packed():
+    """
+    Indica si los cronogramas se guardan empaquetados en la simulación
+    (FINANCING_SCHEDULE_STORAGE = 'packed') o como filas de PaymentSchedule ('rows').
+    """
+    return getattr(settings, 'FINANCING_SCHEDULE_STORAGE', 'packed') == 'packed'
+
+def create_schedule_rows(simulation, payment_schedule):
+    """
+    Guarda el cronograma de una simulación como filas de PaymentSchedule en un solo INSERT.
+    
+    Args:
+        simulation: Simulación a la que pertenecen las cuotas
+        payment_schedule: Lista de cuotas (fechas como date o cadena ISO)
+    """
+    PaymentSchedule.objects.bulk_create([
+        PaymentSchedule(
+            simulation=simulation,
+            payment_number=item["payment_number"],
+            payment_date=to_date(item["payment_date"]),
+            principal=item["principal"],
+            interest=item["interest"],
+            total_payment=item["total_payment"],
+            remaining_balance=item["remaining_balance"],
+            is_adjudication=item["is_adjudication"]
+        )
+        for item in payment_schedule
+    ])
+
+def get_simulation_schedule(simulation):
+    """
+    Obtiene el cronograma de pagos de una simulación guardada.
+    
+    Usa el cronograma empaquetado si existe; si no, las filas de PaymentSchedule
+    (simulaciones anteriores o guardadas en modo 'rows'). Si tampoco hay filas,
+    lo regenera a partir de los parámetros de la simulación y el plan actual.
+    
+    Args:
+        simulation: Simulación guardada
         
-    else:
-        return {"error": "Tipo de plan no soportado"}
+    Returns:
+        list: Cuotas con payment_number, payment_date, principal, interest,
+              total_payment, remaining_balance e is_adjudication
+    """
+    if simulation.packed_schedule:
+        return unpack_schedule(simulation.packed_schedule)
+    
+    rows = list(
+        simulation.payments.order_by('payment_number').values(
+            'payment_number', 'payment_date', 'principal', 'interest',
+            'total_payment', 'remaining_balance', 'is_adjudication'
+        )
+    )
+    if rows:
+        return rows
+    
+    plan = simulation.plan
+    down_payment = simulation.down_payment if plan.plan_type == 'immediate' else None
+    result = compute_financing(
+        Product(id=simulation.product_id, price=simulation.total_price),
+        plan,
+        simulation.term_months,
+        down_payment=down_payment,
+        simulation_date=simulation.created_at.date(),
+    )
+    if 'error' in result:
+        return []
+    
+    return [
+        dict(item, payment_date=to_date(item["payment_date"]))
+        for item in result["payment_schedule"]
+    ]
 
 def save_financing_simulation(user, simulation_data):
     """
@@ -429,39 +879,40 @@ def save_financing_simulation(user, simulation_data):
     plan_id = simulation_data["plan"]["id"]
     details = simulation_data["financing_details"]
     
-    try:
-        product = Product.objects.get(id=product_id)
-        plan = FinancingPlan.objects.get(id=plan_id)
-    except (Product.DoesNotExist, FinancingPlan.DoesNotExist):
+    # Precio vigente del producto y existencia del plan en una sola consulta
+    row = (
+        Product.objects.filter(id=product_id)
+        .annotate(plan_exists=Exists(FinancingPlan.objects.filter(id=plan_id)))
+        .values_list('price', 'plan_exists')
+        .first()
+    )
+    if row is None or not row[1]:
         return None
+    total_price = row[0]
     
-    # Crear la simulación
-    simulation = FinancingSimulation.objects.create(
-        user=user,
-        product=product,
-        plan=plan,
-        term_months=details["term_months"],
-        total_price=product.price,
-        down_payment=details.get("down_payment", Decimal('0')),
-        monthly_payment=details["monthly_payment"],
-        adjudication_month=details.get("adjudication_month"),
-        adjudication_payment=details.get("adjudication_payment"),
-        total_interest=details["total_interest"],
-        total_amount=details["total_amount"]
-    )
+    payment_schedule = simulation_data["payment_schedule"]
+    packed = pack_schedule(payment_schedule) if schedule_storage_is_packed() else None
     
-    # Guardar el cronograma de pagos
-    for payment_data in simulation_data["payment_schedule"]:
-        PaymentSchedule.objects.create(
-            simulation=simulation,
-            payment_number=payment_data["payment_number"],
-            payment_date=date.fromisoformat(payment_data["payment_date"]),
-            principal=payment_data["principal"],
-            interest=payment_data["interest"],
-            total_payment=payment_data["total_payment"],
-            remaining_balance=payment_data["remaining_balance"],
-            is_adjudication=payment_data["is_adjudication"]
+    with transaction.atomic():
+        # Crear la simulación
+        simulation = FinancingSimulation.objects.create(
+            user=user,
+            product_id=product_id,
+            plan_id=plan_id,
+            term_months=details["term_months"],
+            total_price=total_price,
+            down_payment=details.get("down_payment") or Decimal('0'),
+            monthly_payment=details["monthly_payment"],
+            adjudication_month=details.get("adjudication_month"),
+            adjudication_payment=details.get("adjudication_payment"),
+            total_interest=details["total_interest"],
+            total_amount=details["total_amount"],
+            packed_schedule=packed
         )
+        
+        # Sin empaquetar, guardar el cronograma de pagos en un solo INSERT
+        if packed is None:
+            create_schedule_rows(simulation, payment_schedule)
     
     return simulation
 
@@ -476,4 +927,8 @@ def get_saved_simulations(user, limit=5):
     Returns:
         QuerySet: Las simulaciones del usuario
     """
-    return FinancingSimulation.objects.filter(user=user).order_by('-created_at')[:limit] 
\ No newline at end of file
+    return (
+        FinancingSimulation.objects.filter(user=user)
+        .defer('packed_schedule')
+        .order_by('-created_at')[:limit]
+    ) 
\ No newline at end of file
@@ -0,0 +1,23 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from products.models import Product
+from .cache import schedule_cache
+from .models import FinancingPlan
+
+@receiver([post_save, post_delete], sender=FinancingPlan)
+def invalidate_plan_schedules(sender, instance, **kwargs):
+    """
+    Descarta los cálculos en caché de un plan cuando se modifica o elimina.
+    """
+    schedule_cache.invalidate(plan_id=instance.pk)
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_product_schedules(sender, instance, **kwargs):
+    """
+    Descarta los cálculos en caché de un producto cuando cambia su precio.
+    """
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and 'price' not in update_fields:
+        return
+    schedule_cache.invalidate(product_id=instance.pk)
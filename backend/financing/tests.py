@@ -1,3 +1,284 @@
-from django.test import TestCase
+import os
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from products.models import Brand, Category, Product
+from .cache import ScheduleCache, schedule_cache
+from .models import FinancingPlan, FinancingSimulation, PaymentSchedule
+from .services import (
+    FinancingCalculator, MATRIX_MAX_CELLS, calculate_financing, calculate_financing_matrix,
+    compute_financing, get_cached_financing, get_simulation_schedule, save_financing_simulation
+)
+
+
+class SimulationPersistenceTests(TestCase):
+    """La persistencia de simulaciones usa un número fijo de consultas"""
+
+    TERMS = (12, 60, 120)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='cliente', password='secreto')
+        category = Category.objects.create(name='Motos', slug='motos')
+        brand = Brand.objects.create(name='Marca', slug='marca')
+        cls.product = Product.objects.create(
+            name='Moto 150', slug='moto-150', category=category, brand=brand,
+            model='150', year=2024, description='Moto', price=Decimal('2500.00'),
+            color='Rojo',
+        )
+        cls.programmed = FinancingPlan.objects.create(
+            name='Programado', plan_type='programmed', description='Programado',
+            min_term=1, max_term=120, interest_rate=Decimal('0.00'),
+            adjudication_percentage=Decimal('45.00'),
+        )
+        cls.immediate = FinancingPlan.objects.create(
+            name='Inmediato', plan_type='immediate', description='Inmediato',
+            min_term=1, max_term=120, interest_rate=Decimal('12.00'),
+            down_payment_percentage=Decimal('30.00'),
+        )
+
+    def _count_queries(self, save):
+        with CaptureQueriesContext(connection) as context:
+            simulation = save()
+        return simulation, len(context.captured_queries)
+
+    def test_save_financing_simulation_query_count_is_constant(self):
+        counts = set()
+        for plan in (self.programmed, self.immediate):
+            for term in self.TERMS:
+                data = calculate_financing(self.product.id, plan.id, term)
+                simulation, count = self._count_queries(
+                    lambda: save_financing_simulation(self.user, data)
+                )
+                counts.add(count)
+                self.assertEqual(len(get_simulation_schedule(simulation)), term)
+                self.assertEqual(simulation.total_price, self.product.price)
+
+        self.assertEqual(len(counts), 1)
+
+    def test_save_simulation_query_count_is_constant(self):
+        counts = set()
+        for term in self.TERMS:
+            results = FinancingCalculator.calculate_immediate_adjudication(
+                self.product.price, term, self.immediate.interest_rate,
+                self.immediate.down_payment_percentage,
+            )
+            simulation, count = self._count_queries(
+                lambda: FinancingCalculator.save_simulation(
+                    self.user, self.product, self.immediate, term, self.product.price, results
+                )
+            )
+            counts.add(count)
+            self.assertEqual(len(get_simulation_schedule(simulation)), term)
+
+        self.assertEqual(len(counts), 1)
+
+    def test_save_financing_simulation_with_unknown_plan(self):
+        data = calculate_financing(self.product.id, self.immediate.id, 12)
+        data['plan']['id'] = self.immediate.id + 1000
+
+        self.assertIsNone(save_financing_simulation(self.user, data))
+        self.assertFalse(FinancingSimulation.objects.exists())
+        self.assertFalse(PaymentSchedule.objects.exists())
+
+    def test_saved_schedule_matches_calculation(self):
+        data = calculate_financing(self.product.id, self.programmed.id, 24)
+        simulation = save_financing_simulation(self.user, data)
+        simulation.refresh_from_db()
+
+        schedule = get_simulation_schedule(simulation)
+
+        self.assertEqual(len(schedule), 24)
+        for saved, calculated in zip(schedule, data['payment_schedule']):
+            self.assertEqual(saved['payment_date'].isoformat(), calculated['payment_date'])
+            self.assertEqual(saved['total_payment'], Decimal(str(calculated['total_payment'])).quantize(Decimal('0.01')))
+            self.assertEqual(saved['remaining_balance'], Decimal(str(calculated['remaining_balance'])).quantize(Decimal('0.01')))
+            self.assertEqual(saved['is_adjudication'], calculated['is_adjudication'])
+
+
+@override_settings(FINANCING_SCHEDULE_STORAGE='rows')
+class RowSimulationPersistenceTests(SimulationPersistenceTests):
+    """Mismas garantías guardando el cronograma como filas de PaymentSchedule"""
+
+
+class FinancingMatrixTests(TestCase):
+    """La grilla usa el mismo cálculo que el simulador y se limita por su tamaño real"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Motos', slug='motos')
+        brand = Brand.objects.create(name='Marca', slug='marca')
+        cls.products = [
+            Product.objects.create(
+                name=f'Moto {price}', slug=f'moto-{price}', category=category, brand=brand,
+                model='150', year=2024, description='Moto', price=Decimal(price), color='Rojo',
+            )
+            for price in ('2500.00', '3999.99', '12345.67')
+        ]
+        cls.programmed = FinancingPlan.objects.create(
+            name='Programado', plan_type='programmed', description='Programado',
+            min_term=1, max_term=120, interest_rate=Decimal('0.00'),
+            adjudication_percentage=Decimal('45.00'),
+        )
+        cls.immediate = FinancingPlan.objects.create(
+            name='Inmediato', plan_type='immediate', description='Inmediato',
+            min_term=1, max_term=120, interest_rate=Decimal('12.00'),
+            down_payment_percentage=Decimal('30.00'),
+        )
+
+    def test_matrix_cells_match_compute_financing(self):
+        percentages = [Decimal('20.00'), Decimal('30.00'), Decimal('45.50')]
+        result = calculate_financing_matrix(
+            [product.id for product in self.products], terms=[1, 7, 36, 120],
+            down_payment_percentages=percentages,
+        )
+
+        plans = {plan.id: plan for plan in (self.programmed, self.immediate)}
+        cells = 0
+        for product, entry in zip(self.products, result['products']):
+            for plan_entry in entry['plans']:
+                plan = plans[plan_entry['id']]
+                for option in plan_entry['options']:
+                    down_payment = None
+                    if plan.plan_type == 'immediate':
+                        down_payment = product.price * (
+                            Decimal(str(option['down_payment_percentage'])) / Decimal('100')
+                        )
+                    details = compute_financing(
+                        product, plan, option['term_months'], down_payment
+                    )['financing_details']
+                    for key, value in option.items():
+                        if key != 'down_payment_percentage':
+                            self.assertEqual(value, details[key], (product.price, plan.plan_type, key))
+                    cells += 1
+
+        # El 20% queda por debajo del mínimo del plan inmediato y se omite
+        self.assertEqual(cells, 3 * (4 + 4 * 2))
+
+    def test_matrix_size_limit_counts_every_plan(self):
+        # 3 productos × (120 plazos × 13 porcentajes + 120 plazos programados) = 5040 celdas
+        payload = {
+            'product_ids': [product.id for product in self.products],
+            'down_payment_min': '30', 'down_payment_max': '90', 'down_payment_step': '5',
+        }
+        client = APIClient()
+
+        response = client.post('/api/v1/financing/calculator/matrix/', payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(str(MATRIX_MAX_CELLS), response.data['error'])
+
+        payload['plan_ids'] = [self.immediate.id]
+        response = client.post('/api/v1/financing/calculator/matrix/', payload, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['products'][0]['plans'][0]['options']), 120 * 13)
+
+
+class ScheduleCacheTests(TestCase):
+    """Caché de cálculos: aciertos, expiración, LRU e invalidación por señales"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Motos', slug='motos')
+        brand = Brand.objects.create(name='Marca', slug='marca')
+        cls.product = Product.objects.create(
+            name='Moto 150', slug='moto-150', category=category, brand=brand,
+            model='150', year=2024, description='Moto', price=Decimal('2500.00'), color='Rojo',
+        )
+        cls.plan = FinancingPlan.objects.create(
+            name='Inmediato', plan_type='immediate', description='Inmediato',
+            min_term=1, max_term=120, interest_rate=Decimal('12.00'),
+            down_payment_percentage=Decimal('30.00'),
+        )
+
+    def setUp(self):
+        schedule_cache.clear()
+        self.addCleanup(schedule_cache.clear)
+
+    def test_hits_misses_and_lru_eviction(self):
+        cache = ScheduleCache(max_entries=2, ttl=60)
+        self.assertIsNone(cache.get('a'))
+        cache.set('a', {'value': 1})
+        cache.set('b', {'value': 2})
+        self.assertEqual(cache.get('a'), {'value': 1})
+
+        # 'b' es la menos usada y sale al superar el límite
+        cache.set('c', {'value': 3})
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), {'value': 1})
+
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions'], stats['size']), (2, 2, 1, 2))
+
+    def test_expired_entries_are_dropped(self):
+        cache = ScheduleCache(max_entries=2, ttl=0)
+        cache.set('a', {'value': 1})
+
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+        self.assertEqual(cache.stats()['size'], 0)
+
+    def test_errors_are_not_cached(self):
+        calls = []
+        cache = ScheduleCache()
+        for _ in range(2):
+            cache.get_or_compute('a', lambda: calls.append(1) or {'error': 'x'})
+        self.assertEqual(len(calls), 2)
+
+    def test_plan_change_invalidates_its_entries(self):
+        first = get_cached_financing(self.product, self.plan, 12)
+        self.assertIs(get_cached_financing(self.product, self.plan, 12)['payment_schedule'],
+                      first['payment_schedule'])
+        self.assertEqual(schedule_cache.stats()['hits'], 1)
+
+        self.plan.interest_rate = Decimal('24.00')
+        self.plan.save()
+
+        self.assertEqual(schedule_cache.stats()['size'], 0)
+        updated = get_cached_financing(self.product, self.plan, 12)
+        self.assertGreater(
+            updated['financing_details']['total_interest'], first['financing_details']['total_interest']
+        )
+
+    def test_price_change_invalidates_product_entries(self):
+        get_cached_financing(self.product, self.plan, 12)
+
+        # Guardados que no tocan el precio conservan la caché
+        self.product.name = 'Moto 150 R'
+        self.product.save(update_fields=['name'])
+        self.assertEqual(schedule_cache.stats()['size'], 1)
+
+        self.product.price = Decimal('3000.00')
+        self.product.save()
+        self.assertEqual(schedule_cache.stats()['invalidations'], 1)
+        self.assertEqual(
+            get_cached_financing(self.product, self.plan, 12)['financing_details']['financed_amount'], 2100.0
+        )
+
+    def test_price_changed_elsewhere_uses_a_new_key(self):
+        get_cached_financing(self.product, self.plan, 12)
+        # Cambio hecho por otro proceso: aquí no llega ninguna señal
+        Product.objects.filter(pk=self.product.pk).update(price=Decimal('5000.00'))
+        product = Product.objects.get(pk=self.product.pk)
+
+        result = get_cached_financing(product, self.plan, 12)
+
+        self.assertEqual(result['financing_details']['financed_amount'], 3500.0)
+        self.assertEqual(schedule_cache.stats()['misses'], 2)
+
+    def test_stats_view_reports_the_serving_worker(self):
+        admin = get_user_model().objects.create_user(username='admin', password='x', is_staff=True)
+        get_cached_financing(self.product, self.plan, 12)
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        response = client.get('/api/v1/financing/calculator/cache-stats/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['scope'], 'process')
+        self.assertEqual(response.data['worker_pid'], os.getpid())
+        self.assertEqual(response.data['size'], 1)
@@ -3,7 +3,10 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     FinancingPlanViewSet,
     FinancingCalculatorView,
+    CalculatorAPIView,
+    FinancingCacheStatsView,
     ProductFinancingOptionsView,
+    FinancingMatrixView,
     SaveSimulationView,
     UserSimulationsView
 )
@@ -16,6 +19,9 @@ urlpatterns = [
     
     # Calculadora
     path('calculator/', FinancingCalculatorView.as_view(), name='financing-calculator'),
+    path('calculator/v2/', CalculatorAPIView.as_view(), name='financing-calculator-v2'),
+    path('calculator/matrix/', FinancingMatrixView.as_view(), name='financing-matrix'),
+    path('calculator/cache-stats/', FinancingCacheStatsView.as_view(), name='financing-cache-stats'),
     
     # Opciones de financiamiento para un producto
     path('products/<int:product_id>/options/', ProductFinancingOptionsView.as_view(), name='product-financing-options'),
@@ -1,3 +1,5 @@
+import os
+
 from django.shortcuts import render
 from decimal import Decimal
 from rest_framework import viewsets, generics, status, views
@@ -12,9 +14,14 @@ from .serializers import (
     FinancingPlanSerializer, PlanRequirementSerializer,
     FinancingSimulationSerializer, FinancingCalculatorSerializer,
     ProgrammedPurchaseResultSerializer, ImmediateAdjudicationResultSerializer,
-    PaymentScheduleSerializer, SaveSimulationSerializer
+    PaymentScheduleSerializer, SaveSimulationSerializer, FinancingMatrixSerializer
+)
+from .services import (
+    FinancingCalculator, calculate_financing, save_financing_simulation, get_saved_simulations,
+    build_financing_summary, calculate_financing_matrix, get_cached_financing,
+    get_simulation_schedule
 )
-from .services import FinancingCalculator, calculate_financing, save_financing_simulation, get_saved_simulations
+from .cache import schedule_cache
 from common.utils import format_currency
 import json
 
@@ -54,7 +61,11 @@ class FinancingSimulationViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         """Get simulations for the current user"""
-        return FinancingSimulation.objects.filter(user=self.request.user).order_by('-created_at')
+        return (
+            FinancingSimulation.objects.filter(user=self.request.user)
+            .defer('packed_schedule')
+            .order_by('-created_at')
+        )
 
     def perform_create(self, serializer):
         """Save the current user when creating a simulation."""
@@ -63,9 +74,11 @@ class FinancingSimulationViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'])
     def payment_schedule(self, request, pk=None):
         """Get payment schedule for a specific simulation."""
-        simulation = self.get_object()
-        payments = simulation.payments.all().order_by('payment_number')
-        serializer = PaymentScheduleSerializer(payments, many=True)
+        simulation = get_object_or_404(
+            FinancingSimulation.objects.select_related('plan'),
+            pk=pk, user=request.user
+        )
+        serializer = PaymentScheduleSerializer(get_simulation_schedule(simulation), many=True)
         return Response(serializer.data)
 
 class FinancingCalculatorView(views.APIView):
@@ -153,40 +166,45 @@ class CalculatorAPIView(views.APIView):
                         'min_down_payment_raw': float(min_down_payment)
                     }, status=status.HTTP_400_BAD_REQUEST)
             
-            # Calculate the financing details
-            result = calculate_financing(
+            # Calculate the financing details (cached by price, plan version and term)
+            result = get_cached_financing(
+                product=Product(name='', price=vehicle_price),
                 plan=plan,
-                vehicle_price=vehicle_price,
                 term_months=term_months,
-                down_payment=down_payment
+                down_payment=down_payment if plan_type == 'immediate' else None
             )
             
+            if 'error' in result:
+                return Response({'error': result['error']}, status=status.HTTP_400_BAD_REQUEST)
+            
+            details = result['financing_details']
+            
             # Format currency values for response
             formatted_result = {
                 'plan_type': plan_type,
                 'vehicle_price': format_currency(vehicle_price),
                 'vehicle_price_raw': float(vehicle_price),
                 'term_months': term_months,
-                'monthly_payment': format_currency(result['monthly_payment']),
-                'monthly_payment_raw': float(result['monthly_payment']),
-                'total_interest': format_currency(result['total_interest']),
-                'total_interest_raw': float(result['total_interest']),
-                'total_amount': format_currency(result['total_amount']),
-                'total_amount_raw': float(result['total_amount'])
+                'monthly_payment': format_currency(details['monthly_payment']),
+                'monthly_payment_raw': float(details['monthly_payment']),
+                'total_interest': format_currency(details['total_interest']),
+                'total_interest_raw': float(details['total_interest']),
+                'total_amount': format_currency(details['total_amount']),
+                'total_amount_raw': float(details['total_amount'])
             }
             
             if plan_type == 'immediate':
                 formatted_result.update({
                     'down_payment': format_currency(down_payment),
                     'down_payment_raw': float(down_payment),
-                    'financed_amount': format_currency(result['financed_amount']),
-                    'financed_amount_raw': float(result['financed_amount'])
+                    'financed_amount': format_currency(details['financed_amount']),
+                    'financed_amount_raw': float(details['financed_amount'])
                 })
             else:  # programmed
                 formatted_result.update({
-                    'adjudication_month': result['adjudication_month'],
-                    'adjudication_payment': format_currency(result['adjudication_payment']),
-                    'adjudication_payment_raw': float(result['adjudication_payment'])
+                    'adjudication_month': details['adjudication_month'],
+                    'adjudication_payment': format_currency(details['adjudication_payment']),
+                    'adjudication_payment_raw': float(details['adjudication_payment'])
                 })
             
             # Add payment schedule
@@ -220,6 +238,19 @@ class CalculatorAPIView(views.APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+class FinancingCacheStatsView(views.APIView):
+    """
+    Contadores de la caché del calculador de financiamiento.
+    
+    La caché vive en la memoria de cada proceso, así que la respuesta solo refleja
+    el worker que atendió la solicitud (se incluye su PID); con varios workers
+    cada llamada puede mostrar contadores distintos.
+    """
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request):
+        return Response(dict(schedule_cache.stats(), scope='process', worker_pid=os.getpid()))
+
 class ProductFinancingOptionsView(views.APIView):
     """
     Obtiene opciones de financiamiento para un producto específico
@@ -238,7 +269,8 @@ class ProductFinancingOptionsView(views.APIView):
         # Obtener todos los planes activos
         plans = FinancingPlan.objects.filter(is_active=True)
         
-        # Calcular opciones para cada plan con términos predeterminados
+        # Calcular opciones para cada plan con términos predeterminados,
+        # reutilizando el producto y los planes ya cargados
         options = []
         for plan in plans:
             # Usar un plazo predeterminado para cada tipo de plan
@@ -246,20 +278,16 @@ class ProductFinancingOptionsView(views.APIView):
             
             # Calcular para compra programada
             if plan.plan_type == 'programmed':
-                result = calculate_financing(
-                    product_id=product.id,
-                    plan_id=plan.id,
-                    term_months=term
-                )
+                result = build_financing_summary(product.price, plan, term)
                 if 'error' not in result:
                     options.append({
                         'plan_type': 'programmed',
                         'plan_name': plan.name,
                         'plan_id': plan.id,
                         'term_months': term,
-                        'monthly_payment': result['financing_details']['monthly_payment'],
-                        'adjudication_month': result['financing_details']['adjudication_month'],
-                        'total_amount': result['financing_details']['total_amount']
+                        'monthly_payment': float(result['monthly_payment']),
+                        'adjudication_month': result['adjudication_month'],
+                        'total_amount': float(result['total_amount'])
                     })
             
             # Calcular para adjudicación inmediata
@@ -267,21 +295,16 @@ class ProductFinancingOptionsView(views.APIView):
                 # Usar el pago inicial mínimo requerido
                 down_payment = product.price * (plan.down_payment_percentage / 100)
                 
-                result = calculate_financing(
-                    product_id=product.id,
-                    plan_id=plan.id,
-                    term_months=term,
-                    down_payment=down_payment
-                )
+                result = build_financing_summary(product.price, plan, term, down_payment)
                 if 'error' not in result:
                     options.append({
                         'plan_type': 'immediate',
                         'plan_name': plan.name,
                         'plan_id': plan.id,
                         'term_months': term,
-                        'monthly_payment': result['financing_details']['monthly_payment'],
-                        'down_payment': result['financing_details']['down_payment'],
-                        'total_amount': result['financing_details']['total_amount']
+                        'monthly_payment': float(result['monthly_payment']),
+                        'down_payment': float(result['down_payment']),
+                        'total_amount': float(result['total_amount'])
                     })
         
         return Response({
@@ -293,6 +316,34 @@ class ProductFinancingOptionsView(views.APIView):
             'financing_options': options
         })
 
+class FinancingMatrixView(views.APIView):
+    """
+    Calcula en una sola llamada la grilla de cuotas y totales para uno o varios
+    productos, todos los planes activos (o los indicados), un rango de plazos y
+    un rango de pagos iniciales, para que la calculadora no consulte al servidor
+    en cada cambio de los controles.
+    """
+    permission_classes = [AllowAny]
+    
+    def post(self, request):
+        serializer = FinancingMatrixSerializer(data=request.data)
+        if serializer.is_valid():
+            result = calculate_financing_matrix(
+                product_ids=serializer.validated_data['product_ids'],
+                plan_ids=serializer.validated_data.get('plan_ids'),
+                terms=serializer.validated_data['terms'],
+                down_payment_percentages=serializer.validated_data['down_payment_percentages']
+            )
+            
+            if 'error' in result:
+                error_status = (
+                    status.HTTP_400_BAD_REQUEST if result.get('too_large') else status.HTTP_404_NOT_FOUND
+                )
+                return Response({'error': result['error']}, status=error_status)
+                
+            return Response(result)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
 class SaveSimulationView(views.APIView):
     """
     Guarda una simulación de financiamiento
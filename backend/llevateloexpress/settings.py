@@ -214,6 +214,27 @@ ENABLE_REGISTRATION = config('ENABLE_REGISTRATION', default=True, cast=bool)
 # Maintenance mode
 MAINTENANCE_MODE = config('MAINTENANCE_MODE', default=False, cast=bool)
 
+# Financing calculator cache (per process)
+FINANCING_CACHE_MAX_ENTRIES = config('FINANCING_CACHE_MAX_ENTRIES', default=512, cast=int)
+FINANCING_CACHE_TTL = config('FINANCING_CACHE_TTL', default=3600, cast=int)
+
+# Saved simulation schedules: 'packed' (compact blob on the simulation) or 'rows' (PaymentSchedule)
+FINANCING_SCHEDULE_STORAGE = config('FINANCING_SCHEDULE_STORAGE', default='packed')
+
+# Active points configuration cache (per process, versioned by the active row in the database).
+# Requests recheck the version once each; outside requests it is rechecked every TTL seconds.
+POINTS_CONFIG_CACHE_TTL = config('POINTS_CONFIG_CACHE_TTL', default=60, cast=int)
+
+# Config changes that move tier boundaries re-tier summaries inline up to this many rows;
+# above it the retier_points_summaries command must be run instead
+POINTS_RETIER_INLINE_LIMIT = config('POINTS_RETIER_INLINE_LIMIT', default=50000, cast=int)
+
+# Point transactions older than this many months are compacted into monthly summaries
+POINTS_ARCHIVE_AFTER_MONTHS = config('POINTS_ARCHIVE_AFTER_MONTHS', default=24, cast=int)
+
+# Payment verification queue: minutes before an admin's claim on a payment expires
+PAYMENT_CLAIM_TIMEOUT_MINUTES = config('PAYMENT_CLAIM_TIMEOUT_MINUTES', default=15, cast=int)
+
 # Logging configuration
 LOGGING = {
     'version': 1,
@@ -252,6 +273,11 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False,
         },
+        'points_system': {
+            'handlers': ['console', 'file'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
 
@@ -0,0 +1,53 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from payments.reconciliation import STATEMENT_PARSERS, parse_statement, reconcile_statement
+
+
+class Command(BaseCommand):
+    """Concilia un estado de cuenta bancario con los pagos pendientes"""
+    help = 'Verifica los pagos pendientes cuya referencia y monto aparecen en un estado de cuenta'
+
+    def add_arguments(self, parser):
+        parser.add_argument('statement', help='Archivo del estado de cuenta (CSV u OFX)')
+        parser.add_argument('--format', dest='file_format', choices=sorted(STATEMENT_PARSERS),
+                            help='Formato del archivo (por defecto según la extensión)')
+        parser.add_argument('--user', required=True,
+                            help='Usuario administrador que figura como verificador')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Mostrar las coincidencias sin verificar ningún pago')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            admin_user = User.objects.get(username=options['user'], is_staff=True)
+        except User.DoesNotExist:
+            raise CommandError(f"No existe el administrador {options['user']}")
+
+        try:
+            with open(options['statement'], 'rb') as statement:
+                lines = parse_statement(
+                    statement, options['file_format'], name=options['statement']
+                )
+                result = reconcile_statement(lines, admin_user, dry_run=options['dry_run'])
+        except (OSError, ValueError, UnicodeDecodeError) as error:
+            raise CommandError(f'No se pudo leer el estado de cuenta: {error}')
+
+        for bucket in ('ambiguous', 'amount_mismatch', 'duplicated', 'invalid'):
+            for line in result[bucket]:
+                self.stdout.write(
+                    f'Línea {line.line_number} ({bucket}): {line.reference} {line.amount}'
+                )
+        self.stdout.write(
+            f"Coincidencias: {len(result['matched'])}, sin pago: {len(result['unmatched'])}, "
+            f"monto distinto: {len(result['amount_mismatch'])}, ambiguas: {len(result['ambiguous'])}, "
+            f"duplicadas: {len(result['duplicated'])}, inválidas: {len(result['invalid'])}"
+        )
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"Se verificarían {len(result['matched'])} pagos"))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Verificados {len(result['verified'])} pagos "
+                f"({len(result['already_verified'])} ya estaban verificados)"
+            ))
@@ -0,0 +1,61 @@
+# Generated by Django 4.2 on 2026-10-17 21:29
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("payments", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="payment",
+            name="claimed_at",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="Claimed At"
+            ),
+        ),
+        migrations.AddField(
+            model_name="payment",
+            name="claimed_by",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="claimed_payments",
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="Claimed By",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(
+                fields=["status", "-payment_date"], name="payment_status_date"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(
+                fields=["user", "-payment_date"], name="payment_user_date"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(
+                fields=["application", "-payment_date"], name="payment_application_date"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(
+                condition=models.Q(("status", "pending")),
+                fields=["payment_date", "id"],
+                name="payment_pending_queue",
+            ),
+        ),
+    ]
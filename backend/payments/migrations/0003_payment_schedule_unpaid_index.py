@@ -0,0 +1,20 @@
+# Generated by Django 4.2 on 2026-10-17 21:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0002_payment_indexes_and_claims"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="paymentschedule",
+            index=models.Index(
+                fields=["application", "is_paid", "payment_number"],
+                name="payment_schedule_unpaid",
+            ),
+        ),
+    ]
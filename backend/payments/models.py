@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 from applications.models import CreditApplication
@@ -71,6 +71,11 @@ class Payment(models.Model):
     # Points processing
     points_processed = models.BooleanField(_("Points Processed"), default=False)
     
+    # Verification work queue: admin currently reviewing this payment
+    claimed_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+                                  related_name='claimed_payments', verbose_name=_("Claimed By"))
+    claimed_at = models.DateTimeField(_("Claimed At"), null=True, blank=True)
+    
     # System fields
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -79,29 +84,59 @@ class Payment(models.Model):
         verbose_name = _("Payment")
         verbose_name_plural = _("Payments")
         ordering = ['-payment_date']
+        indexes = [
+            models.Index(fields=['status', '-payment_date'], name='payment_status_date'),
+            models.Index(fields=['user', '-payment_date'], name='payment_user_date'),
+            models.Index(fields=['application', '-payment_date'], name='payment_application_date'),
+            # Verification queue: pending payments, oldest first
+            models.Index(fields=['payment_date', 'id'], name='payment_pending_queue',
+                         condition=models.Q(status='pending')),
+        ]
     
     def __str__(self):
         return f"Payment {self.reference_number} for {self.application.reference_number}"
     
     def verify_payment(self, verified_by, verification_notes=None):
-        """Mark payment as verified and process points"""
-        self.status = 'verified'
-        self.is_verified = True
-        self.verified_by = verified_by
-        self.verification_date = timezone.now()
+        """
+        Mark payment as verified, mark its installments as paid and process points.
         
-        if verification_notes:
-            self.notes = verification_notes
-            
-        self.save()
+        The row is locked and its status re-read first, so a concurrent
+        verification of the same payment (single, bulk or bank reconciliation)
+        cannot apply it to the schedule twice.
         
-        # Process points after verification
-        self.process_points(verified_by)
+        Returns:
+            bool: False if the payment was no longer pending (nothing is changed)
+        """
+        # Import here to avoid circular import
+        from .services import apply_payment_to_schedule
         
-        # Mark scheduled payment as paid if it exists
-        scheduled_payment = getattr(self, 'scheduled_payment', None)
-        if scheduled_payment:
-            scheduled_payment.mark_as_paid(self)
+        with transaction.atomic():
+            current_status = Payment.objects.select_for_update().filter(pk=self.pk).values_list(
+                'status', flat=True
+            ).get()
+            if current_status != 'pending':
+                self.status = current_status
+                return False
+            
+            self.status = 'verified'
+            self.is_verified = True
+            self.verified_by = verified_by
+            self.verification_date = timezone.now()
+            
+            if verification_notes:
+                self.notes = verification_notes
+            
+            # Mark the scheduled payment as paid: the one already linked to this
+            # payment, otherwise the next unpaid installment(s) of the application
+            scheduled_payment = getattr(self, 'scheduled_payment', None)
+            if scheduled_payment:
+                scheduled_payment.mark_as_paid(self)
+            else:
+                apply_payment_to_schedule(self)
+            
+            # Points are awarded by the post_save receiver (see payments.signals)
+            self.save()
+        return True
     
     def reject_payment(self, verified_by, rejection_reason):
         """Mark payment as rejected"""
@@ -113,17 +148,28 @@ class Payment(models.Model):
         self.save()
     
     def process_points(self, admin_user=None):
-        """Process points for this payment"""
-        if self.is_verified and not self.points_processed:
-            # Import here to avoid circular import
-            from points_system.services import process_payment_points
-            
-            # Process points
-            process_payment_points(payment=self, created_by=admin_user)
+        """
+        Process points for this payment.
+        
+        Safe to call repeatedly: points are awarded once per payment and the
+        points_processed flag is set with a queryset update, so no further
+        post_save signal is sent.
+        """
+        if not self.is_verified:
+            return None
+        
+        # Import here to avoid circular import
+        from points_system.services import process_payment_points
+        
+        with transaction.atomic():
+            point_transaction = process_payment_points(payment=self, created_by=admin_user)
             
             # Mark as processed
-            self.points_processed = True
-            self.save(update_fields=['points_processed'])
+            if not self.points_processed:
+                Payment.objects.filter(pk=self.pk).update(points_processed=True)
+                self.points_processed = True
+        
+        return point_transaction
 
 class PaymentSchedule(models.Model):
     """Payment schedule for an application"""
@@ -143,6 +189,10 @@ class PaymentSchedule(models.Model):
         verbose_name_plural = _("Payment Schedules")
         ordering = ['payment_number']
         unique_together = [['application', 'payment_number']]
+        indexes = [
+            # Next unpaid installments of an application (see services.next_unpaid_installments)
+            models.Index(fields=['application', 'is_paid', 'payment_number'], name='payment_schedule_unpaid'),
+        ]
     
     def __str__(self):
         return f"Payment {self.payment_number} for {self.application.reference_number}"
@@ -151,4 +201,4 @@ class PaymentSchedule(models.Model):
         """Mark this scheduled payment as paid"""
         self.is_paid = True
         self.payment = payment
-        self.save()
+        self.save(update_fields=['is_paid', 'payment'])
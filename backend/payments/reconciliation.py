@@ -0,0 +1,289 @@
+import csv
+import io
+import re
+from collections import defaultdict, namedtuple
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from .models import Payment
+from .services import verify_payments_bulk
+
+# Movimiento de un estado de cuenta bancario
+StatementLine = namedtuple('StatementLine', 'line_number reference amount date description')
+
+# Encabezados aceptados en los CSV (en minúsculas) para cada campo
+CSV_COLUMNS = {
+    'reference': ('reference', 'referencia', 'ref', 'reference_number', 'numero_referencia'),
+    'amount': ('amount', 'monto', 'importe', 'credito', 'crédito', 'abono'),
+    'date': ('date', 'fecha', 'fecha_valor'),
+    'description': ('description', 'descripcion', 'descripción', 'concepto', 'memo'),
+}
+
+# Formatos de fecha aceptados y cuántos caracteres del valor usa cada uno
+DATE_FORMATS = (('%Y-%m-%d', 10), ('%d/%m/%Y', 10), ('%d-%m-%Y', 10), ('%Y%m%d', 8))
+
+OFX_TAG = re.compile(r'<(/?)(\w+)>([^<]*)')
+
+CENT = Decimal('0.01')
+
+# Lotes enviados a verify_payments_bulk (su límite por llamada desde la API)
+VERIFY_BATCH_SIZE = 1000
+
+
+def normalize_reference(value):
+    """Referencia comparable: sin espacios ni separadores y en mayúsculas"""
+    return re.sub(r'[^0-9A-Za-z]', '', value or '').upper()
+
+
+def parse_amount(value):
+    """
+    Convierte un monto del banco a Decimal con dos decimales.
+
+    Acepta separador decimal con punto o con coma ("1,234.50", "1.234,50",
+    "1234,5"). Devuelve None si el valor no es un monto.
+    """
+    value = (value or '').strip().replace(' ', '')
+    if ',' in value and '.' in value:
+        thousands = ',' if value.rfind('.') > value.rfind(',') else '.'
+        value = value.replace(thousands, '')
+    value = value.replace(',', '.')
+    try:
+        return Decimal(value).quantize(CENT)
+    except InvalidOperation:
+        return None
+
+
+def parse_date(value):
+    """Fecha del movimiento en cualquiera de DATE_FORMATS (OFX incluye la hora: AAAAMMDDHHMMSS), o None"""
+    value = (value or '').strip()
+    for date_format, length in DATE_FORMATS:
+        try:
+            return datetime.strptime(value[:length], date_format).date()
+        except ValueError:
+            continue
+    return None
+
+
+def parse_csv(stream):
+    """
+    Lee un estado de cuenta CSV (coma o punto y coma) con encabezado.
+
+    Las columnas se identifican por los nombres de CSV_COLUMNS; solo referencia y
+    monto son obligatorias.
+
+    Yields:
+        StatementLine
+    """
+    sample = stream.read(4096)
+    stream.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.reader(stream, dialect)
+
+    header = [column.strip().lower() for column in next(reader, [])]
+    positions = {}
+    for field, aliases in CSV_COLUMNS.items():
+        for alias in aliases:
+            if alias in header:
+                positions[field] = header.index(alias)
+                break
+    missing = {'reference', 'amount'} - positions.keys()
+    if missing:
+        raise ValueError(f"Columnas requeridas no encontradas: {', '.join(sorted(missing))}")
+
+    def column(row, field):
+        index = positions.get(field)
+        return row[index] if index is not None and index < len(row) else ''
+
+    for line_number, row in enumerate(reader, start=2):
+        if not any(row):
+            continue
+        yield StatementLine(
+            line_number,
+            column(row, 'reference').strip(),
+            parse_amount(column(row, 'amount')),
+            parse_date(column(row, 'date')),
+            column(row, 'description').strip(),
+        )
+
+
+def parse_ofx(stream):
+    """
+    Lee los movimientos <STMTTRN> de un archivo OFX (SGML o XML).
+
+    La referencia es REFNUM, CHECKNUM o FITID, en ese orden de preferencia.
+
+    Yields:
+        StatementLine
+    """
+    current = None
+    for line_number, line in enumerate(stream, start=1):
+        for closing, tag, value in OFX_TAG.findall(line):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                if not closing:
+                    current = {'line_number': line_number}
+                elif current is not None:
+                    yield StatementLine(
+                        current['line_number'],
+                        current.get('REFNUM') or current.get('CHECKNUM') or current.get('FITID', ''),
+                        parse_amount(current.get('TRNAMT')),
+                        parse_date(current.get('DTPOSTED')),
+                        current.get('MEMO') or current.get('NAME', ''),
+                    )
+                    current = None
+            elif current is not None and not closing:
+                current.setdefault(tag, value.strip())
+
+
+STATEMENT_PARSERS = {
+    'csv': parse_csv,
+    'ofx': parse_ofx,
+}
+
+
+def parse_statement(stream, file_format=None, name=''):
+    """
+    Elige el lector según el formato indicado o la extensión del archivo.
+
+    Args:
+        stream: Archivo de texto o binario (se decodifica como UTF-8)
+        file_format: 'csv' u 'ofx' (opcional)
+        name: Nombre del archivo, usado para deducir el formato
+    """
+    if file_format is None:
+        file_format = 'ofx' if name.lower().endswith(('.ofx', '.qfx')) else 'csv'
+    if file_format not in STATEMENT_PARSERS:
+        raise ValueError(f'Formato no soportado: {file_format}')
+    if not isinstance(stream, io.TextIOBase):
+        stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    return STATEMENT_PARSERS[file_format](stream)
+
+
+def build_pending_index():
+    """
+    Índice en memoria de los pagos pendientes con referencia.
+
+    Se carga con una sola consulta (solo columnas, sin modelos). Cada pago queda
+    indexado por (referencia, monto) y, si difiere, por (referencia, monto
+    esperado); además se guarda qué referencias existen para distinguir los
+    movimientos con monto distinto de los que no corresponden a ningún pago.
+
+    Returns:
+        tuple: (dict (referencia, monto) -> set de IDs, set de referencias)
+    """
+    index = defaultdict(set)
+    references = set()
+    pending = Payment.objects.filter(status='pending').exclude(reference_number='').values_list(
+        'id', 'reference_number', 'amount', 'expected_amount'
+    ).order_by()
+    for payment_id, reference, amount, expected_amount in pending.iterator(chunk_size=5000):
+        reference = normalize_reference(reference)
+        if not reference:
+            continue
+        references.add(reference)
+        index[reference, amount.quantize(CENT)].add(payment_id)
+        if expected_amount:
+            index[reference, expected_amount.quantize(CENT)].add(payment_id)
+    return index, references
+
+
+def match_statement(lines, index, references):
+    """
+    Empareja cada movimiento con un pago pendiente en una sola pasada.
+
+    Un movimiento se concilia si su (referencia, monto) corresponde a exactamente
+    un pago que no haya sido tomado por otro movimiento del mismo archivo.
+
+    Returns:
+        dict: matched (lista de (StatementLine, payment_id)), ambiguous,
+              amount_mismatch, unmatched, duplicated e invalid (listas de StatementLine)
+    """
+    result = {
+        'matched': [], 'ambiguous': [], 'amount_mismatch': [],
+        'unmatched': [], 'duplicated': [], 'invalid': [],
+    }
+    used = set()
+    for line in lines:
+        reference = normalize_reference(line.reference)
+        if not reference or line.amount is None or line.amount <= 0:
+            result['invalid'].append(line)
+            continue
+
+        candidates = index.get((reference, line.amount))
+        if not candidates:
+            bucket = 'amount_mismatch' if reference in references else 'unmatched'
+            result[bucket].append(line)
+            continue
+
+        available = candidates - used
+        if not available:
+            result['duplicated'].append(line)
+        elif len(available) > 1:
+            result['ambiguous'].append(line)
+        else:
+            payment_id = available.pop()
+            used.add(payment_id)
+            result['matched'].append((line, payment_id))
+    return result
+
+
+def reconcile_statement(lines, verified_by, dry_run=False, notes=None):
+    """
+    Concilia un estado de cuenta contra los pagos pendientes y verifica los emparejados.
+
+    Los pagos se verifican con verify_payments_bulk en lotes de VERIFY_BATCH_SIZE,
+    así que el costo en consultas crece con el número de lotes y no con el de
+    movimientos. Un pago verificado entre la carga del índice y la verificación se
+    informa como already_verified.
+
+    Args:
+        lines: Iterable de StatementLine
+        verified_by: Administrador a cargo de la conciliación
+        dry_run: Solo emparejar, sin verificar
+        notes: Nota de verificación (por defecto una genérica)
+
+    Returns:
+        dict: El resultado de match_statement más verified y already_verified (IDs)
+    """
+    index, references = build_pending_index()
+    result = match_statement(lines, index, references)
+    result['verified'] = []
+    result['already_verified'] = []
+    if dry_run:
+        return result
+
+    notes = notes or 'Conciliado automáticamente con el estado de cuenta bancario'
+    payment_ids = [payment_id for _, payment_id in result['matched']]
+    for start in range(0, len(payment_ids), VERIFY_BATCH_SIZE):
+        batch = verify_payments_bulk(
+            payment_ids[start:start + VERIFY_BATCH_SIZE], verified_by=verified_by, notes=notes
+        )
+        result['verified'].extend(payment.id for payment in batch['verified'])
+        result['already_verified'].extend(batch['already_verified'])
+    return result
+
+
+def summarize_reconciliation(result):
+    """Resumen serializable: cantidades por categoría y detalle de lo no conciliado"""
+    def describe(line):
+        return {
+            'line': line.line_number,
+            'reference': line.reference,
+            'amount': str(line.amount) if line.amount is not None else None,
+            'date': line.date.isoformat() if line.date else None,
+        }
+
+    summary = {
+        'matched': [
+            dict(describe(line), payment_id=payment_id) for line, payment_id in result['matched']
+        ],
+        'verified': result['verified'],
+        'already_verified': result['already_verified'],
+    }
+    for bucket in ('ambiguous', 'amount_mismatch', 'unmatched', 'duplicated', 'invalid'):
+        summary[bucket] = [describe(line) for line in result[bucket]]
+    summary['counts'] = {key: len(value) for key, value in summary.items()}
+    return summary
@@ -64,6 +64,23 @@ class PaymentSerializer(serializers.ModelSerializer):
         """Get the display name for status"""
         return dict(Payment.STATUS_CHOICES).get(obj.status, obj.status)
 
+class PaymentListSerializer(serializers.ModelSerializer):
+    """Lightweight payment serializer for listings (related objects as IDs)"""
+    payment_method_name = serializers.CharField(source='payment_method.name', read_only=True)
+    payment_type_display = serializers.CharField(source='get_payment_type_display', read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    
+    class Meta:
+        model = Payment
+        fields = [
+            'id', 'application', 'user', 'payment_method', 'payment_method_name',
+            'payment_type', 'payment_type_display', 'amount', 'expected_amount',
+            'reference_number', 'payment_date', 'due_date', 'status', 'status_display',
+            'is_verified', 'verified_by', 'verification_date', 'points_processed',
+            'claimed_by', 'claimed_at', 'created_at'
+        ]
+        read_only_fields = fields
+
 class PaymentCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating payments"""
     application_id = serializers.IntegerField()
@@ -141,6 +158,29 @@ class PaymentVerificationSerializer(serializers.Serializer):
             raise serializers.ValidationError({"notes": "Notes are required for rejection"})
         return data
 
+class PaymentBulkVerificationSerializer(serializers.Serializer):
+    """Serializer for verifying several payments at once"""
+    payment_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=1000
+    )
+    notes = serializers.CharField(required=False, allow_blank=True)
+
+class PaymentClaimSerializer(serializers.Serializer):
+    """Serializer for claiming pending payments from the verification queue"""
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+
+class PaymentReleaseSerializer(serializers.Serializer):
+    """Serializer for releasing claimed payments (all of them if no IDs are given)"""
+    payment_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False, max_length=1000
+    )
+
+class PaymentReconciliationSerializer(serializers.Serializer):
+    """Serializer for uploading a bank statement to reconcile"""
+    statement = serializers.FileField()
+    file_format = serializers.ChoiceField(choices=['csv', 'ofx'], required=False)
+    dry_run = serializers.BooleanField(default=False)
+
 class PaymentScheduleSerializer(serializers.ModelSerializer):
     """Serializer for payment schedule"""
     class Meta:
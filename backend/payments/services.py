@@ -0,0 +1,319 @@
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.utils import timezone
+
+from financing.services import build_installments
+from points_system.services import bulk_process_payment_points
+from .models import Payment, PaymentSchedule
+from .signals import payments_verified
+
+
+def verify_payments_bulk(payment_ids, verified_by, notes=None):
+    """
+    Verify a batch of payments and award their points in one transaction.
+
+    Equivalent to calling Payment.verify_payment on each payment, but with a fixed
+    number of queries: the payments are locked and updated with one UPDATE, their
+    installments are resolved and marked as paid (see apply_payments_to_schedules),
+    their point transactions are written with bulk_create and each affected user's
+    summary gets a single update. Per-row save() signals are not sent; listeners are notified
+    once through the payments_verified signal after commit.
+
+    Args:
+        payment_ids: IDs of the payments to verify
+        verified_by: Admin user verifying the batch
+        notes: Optional verification notes applied to every payment
+
+    Returns:
+        dict: verified (list of Payment), already_verified and not_found (lists of IDs)
+    """
+    payment_ids = set(payment_ids)
+
+    with transaction.atomic():
+        payments = list(
+            Payment.objects.select_for_update()
+            .filter(pk__in=payment_ids)
+            .order_by('pk')
+        )
+        found_ids = {payment.pk for payment in payments}
+        already_verified = sorted(payment.pk for payment in payments if payment.status == 'verified')
+        payments = [payment for payment in payments if payment.status != 'verified']
+
+        if payments:
+            now = timezone.now()
+            changes = {
+                'status': 'verified',
+                'is_verified': True,
+                'verified_by': verified_by,
+                'verification_date': now,
+                'points_processed': True,
+                'updated_at': now,
+            }
+            if notes:
+                changes['notes'] = notes
+
+            pending_points = [payment for payment in payments if not payment.points_processed]
+            Payment.objects.filter(pk__in=[payment.pk for payment in payments]).update(**changes)
+            for payment in payments:
+                for field, value in changes.items():
+                    setattr(payment, field, value)
+
+            # Resolve installments first: points depend on the installment due date
+            PaymentSchedule.objects.filter(payment__in=payments).update(is_paid=True)
+            apply_payments_to_schedules(payments)
+            bulk_process_payment_points(pending_points, created_by=verified_by)
+
+            transaction.on_commit(
+                lambda: payments_verified.send(sender=Payment, payments=payments)
+            )
+
+    return {
+        'verified': payments,
+        'already_verified': already_verified,
+        'not_found': sorted(payment_ids - found_ids),
+    }
+
+
+def get_claim_cutoff():
+    """Claims older than this are considered abandoned"""
+    minutes = getattr(settings, 'PAYMENT_CLAIM_TIMEOUT_MINUTES', 15)
+    return timezone.now() - timedelta(minutes=minutes)
+
+
+def pending_queue():
+    """Pending payments in verification order (oldest first), served by payment_pending_queue"""
+    return Payment.objects.filter(status='pending').order_by('payment_date', 'id')
+
+
+def claim_pending_payments(admin_user, limit=20):
+    """
+    Claim the oldest pending payments for review.
+
+    Rows are selected with SELECT ... FOR UPDATE SKIP LOCKED, so concurrent
+    admins claiming at the same time get disjoint batches instead of waiting on
+    each other. Payments already claimed by someone else are skipped until their
+    claim expires (PAYMENT_CLAIM_TIMEOUT_MINUTES); the caller's own claims are
+    renewed.
+
+    Args:
+        admin_user: Admin claiming the payments
+        limit: Maximum number of payments to claim
+
+    Returns:
+        list: The claimed Payment objects
+    """
+    with transaction.atomic():
+        payments = list(
+            pending_queue()
+            .select_for_update(skip_locked=True)
+            .filter(
+                Q(claimed_at__isnull=True)
+                | Q(claimed_at__lt=get_claim_cutoff())
+                | Q(claimed_by=admin_user)
+            )[:limit]
+        )
+        if payments:
+            now = timezone.now()
+            Payment.objects.filter(pk__in=[payment.pk for payment in payments]).update(
+                claimed_by=admin_user, claimed_at=now
+            )
+            for payment in payments:
+                payment.claimed_by = admin_user
+                payment.claimed_at = now
+
+    return payments
+
+
+def release_claimed_payments(admin_user, payment_ids=None):
+    """
+    Release the caller's claims (all of them, or only the given payments).
+
+    Returns:
+        int: Number of payments released
+    """
+    queryset = Payment.objects.filter(claimed_by=admin_user)
+    if payment_ids is not None:
+        queryset = queryset.filter(pk__in=payment_ids)
+    return queryset.update(claimed_by=None, claimed_at=None)
+
+
+def next_unpaid_installments(application, limit=2, lock=False):
+    """
+    Next unpaid scheduled installments of an application, in order.
+
+    One query served by the payment_schedule_unpaid index; callers get both the
+    current installment and the following one (for double payments) from it.
+    With ``lock`` the rows stay locked until the transaction ends, so two
+    payments verified at the same time cannot take the same installment.
+
+    Returns:
+        list: Up to ``limit`` PaymentSchedule objects
+    """
+    queryset = PaymentSchedule.objects.filter(application=application, is_paid=False)
+    if lock:
+        queryset = queryset.select_for_update()
+    return list(queryset.order_by('payment_number')[:limit])
+
+
+def mark_installments_paid(installments, payment):
+    """
+    Mark installments as paid with a single UPDATE.
+
+    The payment is linked to the first installment only (the link is one-to-one);
+    the rest are just flagged as paid. Installments paid concurrently are left
+    untouched.
+
+    Returns:
+        int: Number of installments updated
+    """
+    if not installments:
+        return 0
+
+    first = installments[0]
+    updated = PaymentSchedule.objects.filter(
+        pk__in=[installment.pk for installment in installments], is_paid=False
+    ).update(
+        is_paid=True,
+        payment=Case(
+            When(pk=first.pk, then=Value(payment.pk)), default=F('payment'), output_field=IntegerField()
+        ),
+    )
+    for installment in installments:
+        installment.is_paid = True
+    first.payment = payment
+    return updated
+
+
+def generate_payment_schedule(application, start_date=None):
+    """
+    Create the installment schedule of an approved application.
+
+    Installments come from the financing engine (the same calculation shown in
+    simulations) and are written with one bulk INSERT, so it belongs inside the
+    approval transaction. Idempotent: an application that already has a schedule
+    is left untouched, and rows racing in from a concurrent approval are dropped
+    by the (application, payment_number) unique constraint.
+
+    Args:
+        application: Approved CreditApplication
+        start_date: Approval date; the first installment is due a month later
+
+    Returns:
+        int: Number of installments created (0 if the schedule already existed)
+    """
+    if PaymentSchedule.objects.filter(application=application).exists():
+        return 0
+
+    if start_date is None and application.approved_at:
+        start_date = timezone.localtime(application.approved_at).date()
+
+    installments = build_installments(
+        application.financing_plan, application.amount, application.term_months,
+        down_payment=application.down_payment, start_date=start_date
+    )
+    PaymentSchedule.objects.bulk_create(
+        [
+            PaymentSchedule(
+                application=application, payment_number=number, due_date=due_date,
+                amount=amount, principal=principal, interest=interest,
+            )
+            for number, due_date, amount, principal, interest in installments
+        ],
+        ignore_conflicts=True,
+    )
+    return len(installments)
+
+
+# A payment covers two installments when it is at least this many times the first one
+DOUBLE_PAYMENT_FACTOR = Decimal('1.9')
+
+
+def allocate_installments(payment, installments):
+    """
+    Installments a payment covers, out of the next unpaid ones (in order).
+
+    Only regular payments consume installments; one worth at least
+    DOUBLE_PAYMENT_FACTOR times the current installment also covers the next.
+    """
+    if payment.payment_type != 'regular' or not installments:
+        return []
+    if len(installments) > 1 and payment.amount >= installments[0].amount * DOUBLE_PAYMENT_FACTOR:
+        return installments[:2]
+    return installments[:1]
+
+
+def apply_payment_to_schedule(payment):
+    """
+    Resolve and mark as paid the installments covered by a payment being verified.
+
+    Must run inside the verification transaction and before the payment is
+    saved: a payment without its own due date takes the installment's, which is
+    what its points are computed from.
+
+    Returns:
+        list: The installments marked as paid
+    """
+    if payment.payment_type != 'regular':
+        return []
+
+    installments = allocate_installments(
+        payment, next_unpaid_installments(payment.application_id, limit=2, lock=True)
+    )
+    mark_installments_paid(installments, payment)
+    if installments and payment.due_date is None:
+        payment.due_date = installments[0].due_date
+    return installments
+
+
+def apply_payments_to_schedules(payments):
+    """
+    Bulk version of apply_payment_to_schedule for verify_payments_bulk.
+
+    The unpaid installments of every affected application are locked and loaded
+    with one query and handed out in memory by payment date. They are written back
+    with one UPDATE for the paid flag plus bulk updates for the payment links and
+    the inherited due dates. Payments already linked to an installment are skipped.
+    """
+    linked = set(
+        PaymentSchedule.objects.filter(payment__in=payments).values_list('payment_id', flat=True)
+    )
+    pending = [
+        payment for payment in payments
+        if payment.payment_type == 'regular' and payment.pk not in linked
+    ]
+    if not pending:
+        return
+
+    queues = defaultdict(list)
+    unpaid = PaymentSchedule.objects.select_for_update().filter(
+        application_id__in={payment.application_id for payment in pending}, is_paid=False
+    ).order_by('application_id', 'payment_number')
+    for installment in unpaid:
+        queues[installment.application_id].append(installment)
+
+    paid = []
+    first_installments = []
+    dated = []
+    for payment in sorted(pending, key=lambda payment: (payment.payment_date, payment.pk)):
+        queue = queues[payment.application_id]
+        installments = allocate_installments(payment, queue[:2])
+        if not installments:
+            continue
+        del queue[:len(installments)]
+        paid.extend(installments)
+        installments[0].payment = payment
+        first_installments.append(installments[0])
+        if payment.due_date is None:
+            payment.due_date = installments[0].due_date
+            dated.append(payment)
+
+    PaymentSchedule.objects.filter(pk__in=[installment.pk for installment in paid]).update(is_paid=True)
+    for installment in paid:
+        installment.is_paid = True
+    PaymentSchedule.objects.bulk_update(first_installments, ['payment'])
+    Payment.objects.bulk_update(dated, ['due_date'])
@@ -1,14 +1,19 @@
 from django.db.models.signals import post_save
-from django.dispatch import receiver
+from django.dispatch import Signal, receiver
 
 from .models import Payment
-from points_system.services import process_payment_points
+
+# Enviada tras confirmar una verificación masiva (argumento: payments)
+payments_verified = Signal()
 
 @receiver(post_save, sender=Payment)
 def update_points_on_payment_verification(sender, instance, created, **kwargs):
     """
-    Actualiza los puntos del usuario cuando un pago es verificado.
+    Otorga los puntos cuando un pago queda verificado.
+    
+    Es la única vía de otorgamiento al verificar: los guardados posteriores de un
+    pago ya procesado no hacen nada, y si la instancia está desactualizada la
+    restricción única (pago, tipo) evita duplicar la transacción.
     """
-    # Solo procesar si el pago ha sido verificado y no es creación
-    if not created and instance.status == 'verified':
-        process_payment_points(instance) 
\ No newline at end of file
+    if not created and instance.status == 'verified' and not instance.points_processed:
+        instance.process_points(admin_user=instance.verified_by)
@@ -1,3 +1,367 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from applications.models import CreditApplication
+from applications.services import process_application_status_change
+from financing.models import FinancingPlan
+from points_system.models import PointTransaction, UserPointsSummary
+from products.models import Brand, Category, Product
+from .models import Payment, PaymentMethod, PaymentSchedule
+from .signals import payments_verified
+from .services import claim_pending_payments, mark_installments_paid, next_unpaid_installments
+
+
+class PaymentTestCase(TestCase):
+    """Datos comunes: un administrador, un cliente con una solicitud y dos métodos de pago"""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.admin = User.objects.create_user(username='admin', password='x', is_staff=True)
+        cls.client_user = User.objects.create_user(username='cliente', password='x')
+
+        category = Category.objects.create(name='Motos', slug='motos')
+        brand = Brand.objects.create(name='Marca', slug='marca')
+        product = Product.objects.create(
+            name='Moto 150', slug='moto-150', category=category, brand=brand,
+            model='150', year=2024, description='Moto', price=Decimal('2500.00'), color='Rojo',
+        )
+        plan = FinancingPlan.objects.create(
+            name='Inmediato', plan_type='immediate', description='Inmediato',
+            min_term=1, max_term=60, interest_rate=Decimal('12.00'),
+            down_payment_percentage=Decimal('30.00'),
+        )
+        cls.application = CreditApplication.objects.create(
+            user=cls.client_user, product=product, financing_plan=plan,
+            amount=Decimal('2500.00'), term_months=12, monthly_payment=Decimal('150.00'),
+        )
+        cls.methods = [PaymentMethod.objects.create(name=name) for name in ('Transferencia', 'Efectivo')]
+
+
+class PaymentListQueryTests(PaymentTestCase):
+    """El listado de pagos usa un número fijo de consultas sin importar su tamaño"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def _create_payments(self, count):
+        Payment.objects.bulk_create([
+            Payment(
+                application=self.application, user=self.client_user,
+                payment_method=self.methods[index % 2], amount=Decimal('150.00'),
+                payment_date=date(2026, 1, 1), status='verified' if index % 3 else 'pending',
+                verified_by=self.admin if index % 3 else None,
+            )
+            for index in range(count)
+        ])
+
+    def _list_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(context.captured_queries)
+
+    def test_list_query_count_does_not_grow_with_page_size(self):
+        url = '/api/v1/payments/transactions/?page_size=100'
+        self._create_payments(3)
+        _, few = self._list_queries(url)
+
+        self._create_payments(60)
+        response, many = self._list_queries(url)
+
+        self.assertEqual(len(response.data['results']), 63)
+        self.assertEqual(few, many)
+        self.assertIn('payment_method_name', response.data['results'][0])
+
+    def test_list_serializer_skips_nested_objects(self):
+        self._create_payments(2)
+        response, _ = self._list_queries('/api/v1/payments/transactions/')
+
+        payment = response.data['results'][0]
+        self.assertEqual(payment['application'], self.application.pk)
+        self.assertIsInstance(payment['payment_method'], int)
+
+    def test_expanded_list_query_count_does_not_grow(self):
+        url = '/api/v1/payments/transactions/?page_size=100&expand=full'
+        self._create_payments(3)
+        _, few = self._list_queries(url)
+
+        self._create_payments(60)
+        response, many = self._list_queries(url)
+
+        self.assertEqual(few, many)
+        self.assertEqual(response.data['results'][0]['application']['id'], self.application.pk)
+
+
+
+class PaymentVerificationQueueTests(PaymentTestCase):
+    """La cola de verificación reparte los pagos pendientes sin solaparse"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other_admin = get_user_model().objects.create_user(
+            username='admin2', password='x', is_staff=True
+        )
+        cls.pending = Payment.objects.bulk_create([
+            Payment(
+                application=cls.application, user=cls.client_user,
+                payment_method=cls.methods[0], amount=Decimal('150.00'),
+                payment_date=date(2026, 1, 1) + timedelta(days=index % 3),
+            )
+            for index in range(6)
+        ])
+        Payment.objects.create(
+            application=cls.application, user=cls.client_user, payment_method=cls.methods[0],
+            amount=Decimal('150.00'), payment_date=date(2025, 1, 1), status='verified',
+        )
+
+    def test_queue_lists_pending_oldest_first(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.get('/api/v1/payments/transactions/queue/?page_size=4')
+
+        self.assertEqual(response.status_code, 200)
+        first_page = [payment['id'] for payment in response.data['results']]
+        second_page = [payment['id'] for payment in client.get(response.data['next']).data['results']]
+        expected = [payment.pk for payment in sorted(self.pending, key=lambda p: (p.payment_date, p.pk))]
+        self.assertEqual(first_page + second_page, expected)
+
+    def test_claims_are_disjoint_and_expire(self):
+        first = claim_pending_payments(self.admin, limit=4)
+        second = claim_pending_payments(self.other_admin, limit=4)
+
+        self.assertEqual(len(first), 4)
+        self.assertEqual(len(second), 2)
+        self.assertFalse({p.pk for p in first} & {p.pk for p in second})
+
+        Payment.objects.filter(claimed_by=self.admin).update(
+            claimed_at=timezone.now() - timedelta(hours=1)
+        )
+        self.assertEqual(len(claim_pending_payments(self.other_admin, limit=10)), 6)
+
+
+class PaymentReconciliationTests(PaymentTestCase):
+    """La conciliación verifica los pagos cuya referencia y monto aparecen en el estado de cuenta"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.payments = Payment.objects.bulk_create([
+            Payment(
+                application=cls.application, user=cls.client_user, payment_method=cls.methods[0],
+                amount=Decimal('150.00'), expected_amount=Decimal('160.00'),
+                reference_number=f'TRF-{index:04d}', payment_date=date(2026, 1, 1),
+            )
+            for index in range(4)
+        ])
+
+    def _reconcile(self, content, name='estado.csv', **data):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        data['statement'] = SimpleUploadedFile(name, content.encode())
+        return client.post('/api/v1/payments/transactions/reconcile/', data, format='multipart')
+
+    def test_csv_matches_by_reference_and_amount(self):
+        statement = '\n'.join([
+            'fecha;referencia;monto',
+            '02/01/2026;trf 0000;150,00',
+            '02/01/2026;TRF-0001;160.00',
+            '02/01/2026;TRF-0002;99.00',
+            '02/01/2026;TRF-9999;150.00',
+            '02/01/2026;TRF-0000;150.00',
+        ])
+        response = self._reconcile(statement, dry_run='true')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['counts']['matched'], 2)
+        self.assertEqual(response.data['verified'], [])
+
+        response = self._reconcile(statement)
+        counts = response.data['counts']
+        self.assertEqual(
+            (counts['verified'], counts['amount_mismatch'], counts['unmatched'], counts['duplicated']),
+            (2, 1, 1, 1)
+        )
+        self.assertEqual(
+            set(Payment.objects.filter(status='verified').values_list('pk', flat=True)),
+            {self.payments[0].pk, self.payments[1].pk}
+        )
+
+    def test_ofx_statement(self):
+        statement = (
+            '<OFX><BANKTRANLIST><STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20260102'
+            '<TRNAMT>150.00<FITID>1<REFNUM>TRF-0003</STMTTRN></BANKTRANLIST></OFX>'
+        )
+        response = self._reconcile(statement, name='estado.ofx')
+        self.assertEqual(response.data['verified'], [self.payments[3].pk])
+
+
+class PaymentScheduleCursorTests(PaymentTestCase):
+    """Las próximas cuotas se obtienen y se marcan pagadas con una consulta cada una"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        PaymentSchedule.objects.bulk_create([
+            PaymentSchedule(
+                application=cls.application, payment_number=number, due_date=date(2026, number, 1),
+                amount=Decimal('150.00'), principal=Decimal('140.00'), interest=Decimal('10.00'),
+                is_paid=number == 1,
+            )
+            for number in range(1, 5)
+        ])
+        cls.payment = Payment.objects.create(
+            application=cls.application, user=cls.client_user, payment_method=cls.methods[0],
+            amount=Decimal('300.00'), payment_date=date(2026, 2, 1),
+        )
+
+    def test_next_installments_and_double_payment(self):
+        with self.assertNumQueries(1):
+            installments = next_unpaid_installments(self.application)
+        self.assertEqual([installment.payment_number for installment in installments], [2, 3])
+
+        with self.assertNumQueries(1):
+            self.assertEqual(mark_installments_paid(installments, self.payment), 2)
+
+        schedule = PaymentSchedule.objects.filter(application=self.application)
+        self.assertEqual(
+            list(schedule.values_list('payment_number', 'is_paid', 'payment')),
+            [(1, True, None), (2, True, self.payment.pk), (3, True, None), (4, False, None)]
+        )
+        self.assertEqual([i.payment_number for i in next_unpaid_installments(self.application)], [4])
+
+    def test_verifying_through_api_marks_installments_paid(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.post(f'/api/v1/payments/transactions/{self.payment.pk}/verify/', {})
+        self.assertEqual(response.status_code, 200)
+
+        schedule = PaymentSchedule.objects.filter(application=self.application)
+        # Un pago del doble de la cuota cubre la actual y la siguiente
+        self.assertEqual(
+            list(schedule.values_list('payment_number', 'is_paid', 'payment')),
+            [(1, True, None), (2, True, self.payment.pk), (3, True, None), (4, False, None)]
+        )
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.due_date, date(2026, 2, 1))
+        self.assertEqual(
+            list(PointTransaction.objects.filter(payment=self.payment).values_list('transaction_type', flat=True)),
+            ['on_time_payment']
+        )
+
+
+class PaymentBulkVerificationTests(PaymentTestCase):
+    """La verificación masiva otorga puntos una vez, marca cuotas y notifica al confirmar"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        PaymentSchedule.objects.bulk_create([
+            PaymentSchedule(
+                application=cls.application, payment_number=number, due_date=date(2026, number, 1),
+                amount=Decimal('150.00'), principal=Decimal('140.00'), interest=Decimal('10.00'),
+            )
+            for number in range(1, 5)
+        ])
+        cls.payments = Payment.objects.bulk_create([
+            Payment(
+                application=cls.application, user=cls.client_user, payment_method=cls.methods[0],
+                amount=Decimal('150.00'), payment_date=payment_date,
+            )
+            for payment_date in (date(2026, 1, 1), date(2026, 2, 1), date(2026, 3, 10))
+        ])
+
+    def setUp(self):
+        self.sent = []
+        receiver = lambda sender, payments, **kwargs: self.sent.append([p.pk for p in payments])
+        payments_verified.connect(receiver)
+        self.addCleanup(payments_verified.disconnect, receiver)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def _verify_bulk(self, payment_ids):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(
+                '/api/v1/payments/transactions/verify_bulk/', {'payment_ids': payment_ids}, format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        # La señal se envía solo al confirmar la transacción
+        self.assertEqual(self.sent, [])
+        for callback in callbacks:
+            callback()
+        return response.data
+
+    def test_bulk_verification_awards_points_once_and_marks_schedule(self):
+        ids = [payment.pk for payment in self.payments]
+
+        data = self._verify_bulk(ids + [999999])
+
+        self.assertEqual(sorted(data['verified']), ids)
+        self.assertEqual(data['not_found'], [999999])
+        self.assertEqual(self.sent, [ids])
+        self.assertEqual(
+            list(PaymentSchedule.objects.filter(application=self.application).values_list(
+                'payment_number', 'is_paid', 'payment'
+            )),
+            [(1, True, ids[0]), (2, True, ids[1]), (3, True, ids[2]), (4, False, None)]
+        )
+        self.assertEqual(
+            list(PointTransaction.objects.filter(payment__in=ids).order_by('payment_id').values_list(
+                'payment', 'transaction_type'
+            )),
+            [(ids[0], 'on_time_payment'), (ids[1], 'on_time_payment'), (ids[2], 'very_late_payment')]
+        )
+        balance = UserPointsSummary.objects.get(user=self.client_user).current_points
+
+        # Repetir la verificación no vuelve a otorgar puntos ni a marcar cuotas
+        self.sent.clear()
+        data = self._verify_bulk(ids)
+        self.assertEqual(data['verified'], [])
+        self.assertEqual(data['already_verified'], ids)
+        self.assertEqual(PointTransaction.objects.filter(payment__in=ids).count(), 3)
+        self.assertEqual(UserPointsSummary.objects.get(user=self.client_user).current_points, balance)
+        self.assertEqual(PaymentSchedule.objects.filter(is_paid=True).count(), 3)
+
+
+    def test_single_verification_of_a_bulk_verified_payment_is_a_noop(self):
+        # Instancia leída antes de que la verificación masiva confirmara
+        stale = Payment.objects.get(pk=self.payments[0].pk)
+        self._verify_bulk([stale.pk])
+
+        self.assertFalse(stale.verify_payment(verified_by=self.admin))
+        self.assertEqual(stale.status, 'verified')
+        self.assertEqual(PaymentSchedule.objects.filter(is_paid=True).count(), 1)
+        self.assertEqual(PointTransaction.objects.filter(payment=stale).count(), 1)
+
+        response = self.client.post(f'/api/v1/payments/transactions/{stale.pk}/verify/', {})
+        self.assertEqual(response.status_code, 400)
+
+
+class PaymentScheduleGenerationTests(PaymentTestCase):
+    """Al aprobar una solicitud se genera su cronograma una sola vez"""
+
+    def test_approval_generates_schedule_once(self):
+        # Guardado, comprobación, un INSERT del cronograma e historial (más el savepoint)
+        with self.assertNumQueries(6):
+            process_application_status_change(self.application, 'approved', 'Aprobada', self.admin)
+
+        schedule = list(PaymentSchedule.objects.filter(application=self.application))
+        self.assertEqual([installment.payment_number for installment in schedule], list(range(1, 13)))
+        approved_on = timezone.localtime(self.application.approved_at).date()
+        self.assertGreater(schedule[0].due_date, approved_on)
+        # Se financia el 70 % del precio (pago inicial mínimo del 30 %)
+        self.assertEqual(sum(installment.principal for installment in schedule), Decimal('1750.00'))
+        for installment in schedule:
+            self.assertEqual(installment.principal + installment.interest, installment.amount)
 
-# Create your tests here.
+        process_application_status_change(self.application, 'approved', 'Reaprobada', self.admin)
+        self.assertEqual(PaymentSchedule.objects.filter(application=self.application).count(), 12)
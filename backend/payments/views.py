@@ -11,8 +11,16 @@ from .models import Payment, PaymentMethod, PaymentSchedule
 from .serializers import (
     PaymentSerializer, PaymentMethodSerializer, 
     PaymentVerificationSerializer, PaymentCreateSerializer,
-    PaymentScheduleSerializer
+    PaymentScheduleSerializer, PaymentBulkVerificationSerializer,
+    PaymentListSerializer, PaymentClaimSerializer, PaymentReleaseSerializer,
+    PaymentReconciliationSerializer
 )
+from .reconciliation import parse_statement, reconcile_statement, summarize_reconciliation
+from .services import (
+    verify_payments_bulk, pending_queue, get_claim_cutoff,
+    claim_pending_payments, release_claimed_payments
+)
+from common.pagination import PaymentQueueCursorPagination
 
 class PaymentMethodViewSet(viewsets.ModelViewSet):
     """ViewSet for payment methods"""
@@ -38,9 +46,16 @@ class PaymentViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     
     def get_serializer_class(self):
-        """Use different serializers based on action"""
+        """
+        Use different serializers based on action. Listings use the lightweight
+        serializer unless ?expand=full is given.
+        """
         if self.action == 'create':
             return PaymentCreateSerializer
+        if self.action == 'queue':
+            return PaymentListSerializer
+        if self.action == 'list' and self.request.query_params.get('expand') != 'full':
+            return PaymentListSerializer
         return PaymentSerializer
     
     def get_queryset(self):
@@ -77,7 +92,10 @@ class PaymentViewSet(viewsets.ModelViewSet):
             if application_id:
                 queryset = queryset.filter(application_id=application_id)
         
-        return queryset
+        # Join everything the serializer reads so a page costs a fixed number of queries
+        if self.get_serializer_class() is PaymentListSerializer:
+            return queryset.select_related('payment_method')
+        return queryset.select_related('application', 'payment_method', 'verified_by')
     
     def perform_create(self, serializer):
         """Set the user when creating a payment"""
@@ -104,11 +122,15 @@ class PaymentViewSet(viewsets.ModelViewSet):
         if serializer.is_valid():
             verification_notes = serializer.validated_data.get('notes')
             
-            # Verify the payment (this also processes points)
-            payment.verify_payment(
+            # Verify the payment (this also processes points); the status is
+            # re-checked under a row lock in case another admin got there first
+            if not payment.verify_payment(
                 verified_by=request.user,
                 verification_notes=verification_notes
-            )
+            ):
+                return Response({
+                    'error': f'Payment is no longer pending ({payment.status})'
+                }, status=status.HTTP_400_BAD_REQUEST)
             
             # Return updated payment
             response_serializer = PaymentSerializer(payment)
@@ -116,6 +138,120 @@ class PaymentViewSet(viewsets.ModelViewSet):
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+    @action(detail=False, methods=['post'])
+    def verify_bulk(self, request):
+        """Verify a batch of payments in one transaction (admin only)"""
+        if not request.user.is_staff:
+            return Response({
+                'error': 'Only administrators can verify payments'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        serializer = PaymentBulkVerificationSerializer(data=request.data)
+        if serializer.is_valid():
+            result = verify_payments_bulk(
+                serializer.validated_data['payment_ids'],
+                verified_by=request.user,
+                notes=serializer.validated_data.get('notes')
+            )
+            
+            return Response({
+                'verified': [payment.id for payment in result['verified']],
+                'already_verified': result['already_verified'],
+                'not_found': result['not_found'],
+            })
+        
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    @action(detail=False, methods=['post'])
+    def reconcile(self, request):
+        """
+        Reconcile an uploaded bank statement (CSV or OFX) against pending payments
+        and verify the matches (admin only). Use dry_run to preview the matches.
+        """
+        if not request.user.is_staff:
+            return Response({
+                'error': 'Only administrators can reconcile payments'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        serializer = PaymentReconciliationSerializer(data=request.data)
+        if serializer.is_valid():
+            statement = serializer.validated_data['statement']
+            try:
+                lines = parse_statement(
+                    statement.file, serializer.validated_data.get('file_format'),
+                    name=statement.name
+                )
+                result = reconcile_statement(
+                    lines, request.user, dry_run=serializer.validated_data['dry_run']
+                )
+            except (ValueError, UnicodeDecodeError) as error:
+                return Response({
+                    'error': f'Could not read the statement: {error}'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            
+            return Response(summarize_reconciliation(result))
+        
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    @action(detail=False, methods=['get'])
+    def queue(self, request):
+        """
+        Pending payments awaiting verification, oldest first (admin only).
+        
+        Keyset-paginated over the partial pending index. ?available=true hides
+        payments currently claimed by other administrators.
+        """
+        if not request.user.is_staff:
+            return Response({
+                'error': 'Only administrators can view the verification queue'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        queryset = pending_queue().select_related('payment_method')
+        if request.query_params.get('available') == 'true':
+            queryset = queryset.filter(
+                Q(claimed_at__isnull=True) | Q(claimed_at__lt=get_claim_cutoff()) |
+                Q(claimed_by=request.user)
+            )
+        
+        paginator = PaymentQueueCursorPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = PaymentListSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+    
+    @action(detail=False, methods=['post'])
+    def claim(self, request):
+        """Claim the oldest unclaimed pending payments for review (admin only)"""
+        if not request.user.is_staff:
+            return Response({
+                'error': 'Only administrators can claim payments'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        serializer = PaymentClaimSerializer(data=request.data)
+        if serializer.is_valid():
+            payments = claim_pending_payments(
+                request.user, limit=serializer.validated_data['limit']
+            )
+            return Response(PaymentListSerializer(payments, many=True).data)
+        
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    @action(detail=False, methods=['post'])
+    def release(self, request):
+        """Release payments claimed by the current administrator"""
+        if not request.user.is_staff:
+            return Response({
+                'error': 'Only administrators can release payments'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        serializer = PaymentReleaseSerializer(data=request.data)
+        if serializer.is_valid():
+            released = release_claimed_payments(
+                request.user, payment_ids=serializer.validated_data.get('payment_ids')
+            )
+            return Response({'released': released})
+        
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
     @action(detail=True, methods=['post'])
     def reject(self, request, pk=None):
         """Reject a payment (admin only)"""
@@ -170,11 +306,8 @@ class PaymentViewSet(viewsets.ModelViewSet):
                 'error': 'Only verified payments can have points processed'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Reset points processed flag
+        # Award points only if the payment is missing its points transaction
         payment.points_processed = False
-        payment.save(update_fields=['points_processed'])
-        
-        # Process points
         payment.process_points(admin_user=request.user)
         
         # Return updated payment
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import PointsConfig, PointTransaction, UserPointsSummary
+from .models import MonthlyPointsSummary, PointsConfig, PointTransaction, UserPointsSummary
 
 @admin.register(PointsConfig)
 class PointsConfigAdmin(admin.ModelAdmin):
@@ -59,9 +59,10 @@ class PointTransactionAdmin(admin.ModelAdmin):
 
 @admin.register(UserPointsSummary)
 class UserPointsSummaryAdmin(admin.ModelAdmin):
-    list_display = ('user', 'current_points', 'lifetime_points', 'get_status_label', 'get_waiting_days', 'last_updated')
+    list_display = ('user', 'current_points', 'lifetime_points', 'tier', 'waiting_days', 'last_updated')
+    list_filter = ('tier',)
     search_fields = ('user__username', 'user__email')
-    readonly_fields = ('last_updated',)
+    readonly_fields = ('tier', 'waiting_days', 'last_updated')
     raw_id_fields = ('user',)
     
     fieldsets = (
@@ -69,14 +70,15 @@ class UserPointsSummaryAdmin(admin.ModelAdmin):
             'fields': ('user',)
         }),
         ('Points Summary', {
-            'fields': ('current_points', 'lifetime_points', 'last_updated')
+            'fields': ('current_points', 'lifetime_points', 'tier', 'waiting_days', 'last_updated')
         }),
     )
-    
-    def get_status_label(self, obj):
-        return obj.get_status_label()
-    get_status_label.short_description = 'Status'
-    
-    def get_waiting_days(self, obj):
-        return obj.get_waiting_days()
-    get_waiting_days.short_description = 'Waiting Days'
+
+
+@admin.register(MonthlyPointsSummary)
+class MonthlyPointsSummaryAdmin(admin.ModelAdmin):
+    list_display = ('user', 'month', 'transaction_type', 'transaction_count', 'points_amount', 'earned_points')
+    list_filter = ('transaction_type', 'month')
+    search_fields = ('user__username', 'user__email')
+    raw_id_fields = ('user',)
+    readonly_fields = ('archived_at',)
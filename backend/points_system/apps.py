@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class PointsSystemConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'points_system'
+    
+    def ready(self):
+        import points_system.signals
@@ -0,0 +1,157 @@
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+from django.utils import timezone
+
+from .models import MonthlyPointsSummary, PointTransaction
+
+# Transacciones borradas por sentencia al archivar un mes
+DELETE_BATCH_SIZE = 5000
+
+_state = threading.local()
+
+
+def add_months(month, months):
+    """Primer día del mes desplazado ``months`` meses"""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _month_start(month):
+    """Medianoche (hora local) del primer día del mes"""
+    return timezone.make_aware(datetime(month.year, month.month, 1))
+
+
+def get_archive_watermark():
+    """
+    Inicio del primer mes no archivado, o None si nunca se archivó nada.
+
+    Las transacciones anteriores a este instante solo existen como filas de
+    MonthlyPointsSummary.
+    """
+    last_month = MonthlyPointsSummary.objects.aggregate(last=Max('month'))['last']
+    return _month_start(add_months(last_month, 1)) if last_month else None
+
+
+def month_transactions(month):
+    """Transacciones creadas en el mes (por hora local)"""
+    return PointTransaction.objects.filter(
+        created_at__gte=_month_start(month),
+        created_at__lt=_month_start(add_months(month, 1)),
+    )
+
+
+def is_archiving():
+    """Indica si este hilo está borrando transacciones archivadas (ver _delete_in_batches)"""
+    return getattr(_state, 'archiving', False)
+
+
+@contextmanager
+def _archiving():
+    _state.archiving = True
+    try:
+        yield
+    finally:
+        _state.archiving = False
+
+
+def _delete_in_batches(queryset, batch_size=DELETE_BATCH_SIZE):
+    """
+    Borra las filas del queryset en lotes acotados por rango de ID.
+
+    Es un delete() normal, así que se envía post_delete por cada fila; mientras
+    dura el borrado is_archiving() es verdadero y el receptor del dashboard las
+    ignora en lugar de programar un recálculo por fila. Las métricas de puntos de
+    los días archivados quedan congeladas (ver dashboard.rollups).
+
+    Returns:
+        int: Número de filas borradas
+    """
+    deleted = 0
+    with _archiving():
+        while True:
+            ids = list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                return deleted
+            count, _ = queryset.filter(pk__gte=ids[0], pk__lte=ids[-1]).delete()
+            deleted += count
+
+
+def archive_month(month):
+    """
+    Compacta las transacciones de un mes en MonthlyPointsSummary y las elimina.
+
+    Se agrupa por usuario y tipo en una consulta; si el mes ya tenía filas
+    archivadas se suman. Las transacciones se borran por lotes (ver
+    _delete_in_batches): las métricas diarias del dashboard de esos días ya
+    deben estar consolidadas y no se recalculan.
+
+    Args:
+        month: Primer día del mes a archivar
+
+    Returns:
+        int: Número de transacciones archivadas
+    """
+    queryset = month_transactions(month)
+
+    with transaction.atomic():
+        grouped = queryset.values('user_id', 'transaction_type').annotate(
+            total=Count('pk'),
+            net=Sum('points_amount'),
+            earned=Sum('points_amount', filter=Q(points_amount__gt=0)),
+        ).order_by()
+
+        existing = {
+            (row.user_id, row.transaction_type): row
+            for row in MonthlyPointsSummary.objects.select_for_update().filter(month=month)
+        }
+        now = timezone.now()
+        created = []
+        changed = []
+        for item in grouped:
+            row = existing.get((item['user_id'], item['transaction_type']))
+            if row is None:
+                row = MonthlyPointsSummary(
+                    user_id=item['user_id'], month=month,
+                    transaction_type=item['transaction_type']
+                )
+                created.append(row)
+            else:
+                changed.append(row)
+            row.transaction_count += item['total']
+            row.points_amount += item['net'] or 0
+            row.earned_points += item['earned'] or 0
+            row.archived_at = now
+
+        MonthlyPointsSummary.objects.bulk_create(created)
+        MonthlyPointsSummary.objects.bulk_update(
+            changed, ['transaction_count', 'points_amount', 'earned_points', 'archived_at']
+        )
+        return _delete_in_batches(queryset)
+
+
+def get_archivable_months(before):
+    """
+    Meses con transacciones anteriores al mes ``before``, del más antiguo al más reciente.
+
+    Args:
+        before: Primer día del primer mes que no se archiva
+
+    Returns:
+        list: Primer día de cada mes
+    """
+    oldest = PointTransaction.objects.order_by('created_at').values_list(
+        'created_at', flat=True
+    ).first()
+    if oldest is None:
+        return []
+
+    month = timezone.localtime(oldest).date().replace(day=1)
+    months = []
+    while month < before:
+        months.append(month)
+        month = add_months(month, 1)
+    return months
@@ -0,0 +1,82 @@
+import threading
+import time
+
+from django.conf import settings
+
+
+class ConfigCache:
+    """
+    Caché en proceso para la configuración activa del sistema de puntos.
+
+    La versión de la configuración vive en la base de datos (la fila activa y su
+    ``updated_at``), así que cualquier worker ve los cambios de otro sin depender
+    de un backend de caché compartido. Cada request comprueba la versión una sola
+    vez con una consulta mínima y solo recarga la fila si cambió; las llamadas
+    siguientes dentro del mismo request no consultan nada. Fuera de un request
+    (comandos, tareas) la comprobación se repite cada ``ttl`` segundos.
+    """
+
+    def __init__(self, loader, version_loader, version_of, ttl=60):
+        """
+        Args:
+            loader: Carga la configuración activa
+            version_loader: Lee la versión actual (consulta mínima)
+            version_of: Versión de una configuración ya cargada
+            ttl: Segundos entre comprobaciones fuera de un request
+        """
+        self.loader = loader
+        self.version_loader = version_loader
+        self.version_of = version_of
+        self.ttl = ttl
+        self._value = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def start_request(self):
+        """Obliga a comprobar la versión en la próxima lectura (se llama al iniciar cada request)"""
+        self._local.checked_at = None
+
+    def get(self):
+        """
+        Devuelve la configuración en caché, recargándola si su versión cambió.
+
+        El valor devuelto es compartido dentro del proceso y debe tratarse como de
+        solo lectura.
+        """
+        with self._lock:
+            value = self._value
+
+        checked_at = getattr(self._local, 'checked_at', None)
+        now = time.monotonic()
+        if value is not None and checked_at is not None and now - checked_at < self.ttl:
+            return value
+
+        if value is None or self.version_loader() != self.version_of(value):
+            value = self.loader()
+            with self._lock:
+                self._value = value
+        self._local.checked_at = now
+        return value
+
+    def invalidate(self):
+        """Descarta la copia local (los demás procesos lo detectan por la versión)"""
+        with self._lock:
+            self._value = None
+
+
+def _load_active_config():
+    from .models import PointsConfig
+    return PointsConfig.load_active_config()
+
+
+def _active_config_version():
+    from .models import PointsConfig
+    return PointsConfig.objects.filter(is_active=True).values_list('pk', 'updated_at').first()
+
+
+config_cache = ConfigCache(
+    loader=_load_active_config,
+    version_loader=_active_config_version,
+    version_of=lambda config: (config.pk, config.updated_at),
+    ttl=getattr(settings, 'POINTS_CONFIG_CACHE_TTL', 60),
+)
@@ -0,0 +1,159 @@
+from collections import namedtuple
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from .models import MonthlyPointsSummary, PointsConfig, PointTransaction, UserPointsSummary
+
+User = get_user_model()
+
+# Diferencia entre el resumen guardado y el recalculado desde el historial
+SummaryDiff = namedtuple(
+    'SummaryDiff', 'user_id old_current new_current old_lifetime new_lifetime'
+)
+
+
+def get_ledger_totals(queryset, archived=None):
+    """
+    Suma el historial de transacciones por usuario con una consulta agrupada, más
+    otra para los meses ya archivados si se indican.
+
+    Args:
+        queryset: Transacciones a considerar
+        archived: Filas de MonthlyPointsSummary a sumar (opcional)
+
+    Returns:
+        dict: user_id -> (current_points, lifetime_points)
+    """
+    grouped = queryset.values('user_id').annotate(
+        current=Sum('points_amount'),
+        lifetime=Sum('points_amount', filter=Q(points_amount__gt=0)),
+    ).order_by()
+    totals = {
+        item['user_id']: (item['current'] or 0, item['lifetime'] or 0)
+        for item in grouped
+    }
+
+    if archived is not None:
+        for item in archived.values('user_id').annotate(
+            current=Sum('points_amount'), lifetime=Sum('earned_points')
+        ).order_by():
+            current, lifetime = totals.get(item['user_id'], (0, 0))
+            totals[item['user_id']] = (current + item['current'], lifetime + item['lifetime'])
+    return totals
+
+
+def iter_pk_ranges(queryset, chunk_size):
+    """
+    Divide las claves primarias de un queryset en rangos contiguos de hasta
+    ``chunk_size`` filas.
+
+    Los límites se obtienen con paginación por clave (una consulta por rango), sin
+    cargar todos los IDs en memoria.
+
+    Yields:
+        tuple: (primer_id, último_id), ambos inclusive
+    """
+    ids = queryset.order_by('pk').values_list('pk', flat=True)
+    start = ids.first()
+    while start is not None:
+        end = ids.filter(pk__gte=start)[chunk_size - 1:chunk_size].first()
+        if end is None:
+            end = ids.last()
+        yield start, end
+        start = ids.filter(pk__gt=end).first()
+
+
+def iter_user_id_ranges(chunk_size):
+    """Rangos de IDs de usuario de hasta ``chunk_size`` usuarios (ver iter_pk_ranges)"""
+    return iter_pk_ranges(User.objects.all(), chunk_size)
+
+
+def rebuild_summaries(first_id, last_id, dry_run=False):
+    """
+    Recalcula desde el historial (incluidos los meses archivados) los resúmenes de
+    puntos de un rango de usuarios.
+
+    Los resúmenes del rango se bloquean antes de sumar el historial, de modo que
+    una transacción registrada en paralelo o ya está incluida en la suma o aplica
+    su incremento después, sobre el valor recalculado.
+
+    Args:
+        first_id: Primer ID de usuario (inclusive)
+        last_id: Último ID de usuario (inclusive)
+        dry_run: Solo calcular las diferencias, sin guardar
+
+    Returns:
+        list: SummaryDiff de los usuarios cuyo resumen cambia
+    """
+    with transaction.atomic():
+        summaries = {
+            summary.user_id: summary
+            for summary in UserPointsSummary.objects.select_for_update().filter(
+                user_id__gte=first_id, user_id__lte=last_id
+            )
+        }
+        totals = get_ledger_totals(
+            PointTransaction.objects.filter(user_id__gte=first_id, user_id__lte=last_id),
+            archived=MonthlyPointsSummary.objects.filter(user_id__gte=first_id, user_id__lte=last_id)
+        )
+
+        now = timezone.now()
+        config = PointsConfig.get_active_config()
+        diffs = []
+        changed = []
+        missing = []
+        for user_id in sorted(summaries.keys() | totals.keys()):
+            current, lifetime = totals.get(user_id, (0, 0))
+            summary = summaries.get(user_id)
+            if summary is None:
+                diffs.append(SummaryDiff(user_id, None, current, None, lifetime))
+                summary = UserPointsSummary(
+                    user_id=user_id, current_points=current, lifetime_points=lifetime
+                )
+                summary.refresh_tier(config)
+                missing.append(summary)
+            elif (summary.current_points, summary.lifetime_points) != (current, lifetime):
+                diffs.append(SummaryDiff(
+                    user_id, summary.current_points, current, summary.lifetime_points, lifetime
+                ))
+                summary.current_points = current
+                summary.lifetime_points = lifetime
+                summary.last_updated = now
+                summary.refresh_tier(config)
+                changed.append(summary)
+
+        if not dry_run:
+            UserPointsSummary.objects.bulk_update(
+                changed, ['current_points', 'lifetime_points', 'tier', 'waiting_days', 'last_updated']
+            )
+            UserPointsSummary.objects.bulk_create(missing)
+
+    return diffs
+
+
+def retier_summaries(config=None, chunk_size=10000):
+    """
+    Recalcula el nivel y los días de espera guardados de todos los resúmenes.
+
+    Se ejecuta un UPDATE por rango de IDs que solo reescribe las filas cuyo nivel
+    o días de espera cambian con la configuración indicada.
+
+    Args:
+        config: Configuración de puntos (por defecto la activa)
+        chunk_size: Resúmenes por rango
+
+    Returns:
+        int: Número de resúmenes actualizados
+    """
+    config = config or PointsConfig.get_active_config()
+    expressions = config.get_tier_expressions()
+
+    updated = 0
+    for first_id, last_id in iter_pk_ranges(UserPointsSummary.objects.all(), chunk_size):
+        updated += UserPointsSummary.objects.filter(
+            pk__gte=first_id, pk__lte=last_id
+        ).exclude(**expressions).update(**expressions)
+    return updated
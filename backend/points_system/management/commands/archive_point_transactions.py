@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from points_system.archive import add_months, archive_month, get_archivable_months, month_transactions
+
+
+class Command(BaseCommand):
+    """Compacta las transacciones de puntos antiguas en resúmenes mensuales"""
+    help = 'Archiva por mes las transacciones de puntos anteriores al periodo de retención'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int,
+                            default=getattr(settings, 'POINTS_ARCHIVE_AFTER_MONTHS', 24),
+                            help='Meses completos de transacciones que se conservan')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Mostrar cuántas transacciones se archivarían sin cambiar nada')
+
+    def handle(self, *args, **options):
+        if options['months'] < 1:
+            raise CommandError('--months debe ser mayor que cero')
+
+        before = add_months(timezone.localdate().replace(day=1), -options['months'])
+        months = get_archivable_months(before)
+        if not months:
+            self.stdout.write(f'No hay transacciones anteriores a {before:%Y-%m}')
+            return
+
+        total = 0
+        for month in months:
+            if options['dry_run']:
+                count = month_transactions(month).count()
+            else:
+                count = archive_month(month)
+            total += count
+            self.stdout.write(f'{month:%Y-%m}: {count} transacciones')
+
+        verb = 'Se archivarían' if options['dry_run'] else 'Archivadas'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {total} transacciones'))
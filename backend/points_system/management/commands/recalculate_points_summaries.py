@@ -0,0 +1,74 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from points_system.ledger import iter_user_id_ranges, rebuild_summaries
+
+
+def _init_worker():
+    """Cada proceso abre sus propias conexiones a la base de datos"""
+    django.setup()
+    connections.close_all()
+
+
+def _rebuild_range(bounds, dry_run):
+    first_id, last_id = bounds
+    return bounds, rebuild_summaries(first_id, last_id, dry_run=dry_run)
+
+
+class Command(BaseCommand):
+    """Recalcula todos los resúmenes de puntos desde el historial de transacciones"""
+    help = 'Recalcula UserPointsSummary desde PointTransaction por rangos de usuarios'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help='Usuarios por lote')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Procesos en paralelo (1 = en este proceso); requiere PostgreSQL, '
+                                 'SQLite no admite escrituras concurrentes')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Mostrar las diferencias sin guardar')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        workers = options['workers']
+        dry_run = options['dry_run']
+        if chunk_size < 1 or workers < 1:
+            raise CommandError('--chunk-size y --workers deben ser mayores que cero')
+
+        ranges = list(iter_user_id_ranges(chunk_size))
+        if not ranges:
+            self.stdout.write('No hay usuarios')
+            return
+
+        if workers == 1:
+            results = (_rebuild_range(bounds, dry_run) for bounds in ranges)
+            self._report(results, len(ranges), dry_run)
+            return
+
+        # Los procesos hijos no deben heredar las conexiones abiertas del padre
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            futures = [executor.submit(_rebuild_range, bounds, dry_run) for bounds in ranges]
+            self._report((future.result() for future in as_completed(futures)), len(ranges), dry_run)
+
+    def _report(self, results, total_ranges, dry_run):
+        changed = 0
+        for done, ((first_id, last_id), diffs) in enumerate(results, start=1):
+            changed += len(diffs)
+            self.stdout.write(
+                f'[{done}/{total_ranges}] usuarios {first_id}..{last_id}: {len(diffs)} cambios'
+            )
+            if dry_run:
+                for diff in diffs:
+                    self.stdout.write(
+                        f'  usuario {diff.user_id}: puntos {diff.old_current} -> {diff.new_current}, '
+                        f'históricos {diff.old_lifetime} -> {diff.new_lifetime}'
+                    )
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING(f'Simulación: {changed} resúmenes cambiarían'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Recalculados {changed} resúmenes'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from points_system.ledger import retier_summaries
+
+
+class Command(BaseCommand):
+    """Recalcula el nivel guardado de los resúmenes con la configuración activa"""
+    help = 'Recalcula tier y waiting_days de todos los UserPointsSummary con la configuración activa'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=10000,
+                            help='Resúmenes por UPDATE')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size debe ser mayor que cero')
+
+        updated = retier_summaries(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Actualizados {updated} resúmenes'))
@@ -0,0 +1,49 @@
+# Generated by Django 4.2 on 2026-10-17 21:17
+
+from django.db import migrations, models
+from django.db.models import Count, F, Min
+
+
+def remove_duplicate_payment_transactions(apps, schema_editor):
+    """
+    Elimina las transacciones repetidas por pago y tipo (conserva la primera) y
+    descuenta sus puntos de los resúmenes de cada usuario.
+    """
+    PointTransaction = apps.get_model("points_system", "PointTransaction")
+    UserPointsSummary = apps.get_model("points_system", "UserPointsSummary")
+
+    duplicated = (
+        PointTransaction.objects.filter(payment__isnull=False)
+        .values("payment_id", "transaction_type")
+        .annotate(first_id=Min("id"), total=Count("id"))
+        .filter(total__gt=1)
+    )
+    for group in duplicated.iterator():
+        extra = PointTransaction.objects.filter(
+            payment_id=group["payment_id"], transaction_type=group["transaction_type"]
+        ).exclude(id=group["first_id"])
+        for user_id, points in extra.values_list("user_id", "points_amount"):
+            UserPointsSummary.objects.filter(user_id=user_id).update(
+                current_points=F("current_points") - points,
+                lifetime_points=F("lifetime_points") - max(points, 0),
+            )
+        extra.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("points_system", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_payment_transactions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="pointtransaction",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("payment__isnull", False)),
+                fields=("payment", "transaction_type"),
+                name="unique_payment_point_transaction",
+            ),
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 4.2 on 2026-10-17 21:20
+
+from django.db import migrations, models
+from django.db.models import Case, Value, When
+
+
+def populate_tiers(apps, schema_editor):
+    """Calcula el nivel y los días de espera de los resúmenes existentes"""
+    PointsConfig = apps.get_model("points_system", "PointsConfig")
+    UserPointsSummary = apps.get_model("points_system", "UserPointsSummary")
+
+    config = PointsConfig.objects.filter(is_active=True).first() or PointsConfig()
+    ladder = [
+        ("excellent", config.excellent_threshold, config.excellent_waiting_days),
+        ("good", config.good_threshold, config.good_waiting_days),
+        ("average", config.average_threshold, config.average_waiting_days),
+        ("poor", config.poor_threshold, config.poor_waiting_days),
+    ]
+    UserPointsSummary.objects.update(
+        tier=Case(
+            *[When(current_points__gte=threshold, then=Value(key)) for key, threshold, _ in ladder],
+            default=Value("bad"),
+        ),
+        waiting_days=Case(
+            *[When(current_points__gte=threshold, then=Value(days)) for _, threshold, days in ladder],
+            default=Value(config.bad_waiting_days),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("points_system", "0002_point_transaction_unique_payment"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userpointssummary",
+            name="tier",
+            field=models.CharField(
+                choices=[
+                    ("excellent", "Excelente"),
+                    ("good", "Bueno"),
+                    ("average", "Promedio"),
+                    ("poor", "Bajo"),
+                    ("bad", "Crítico"),
+                ],
+                default="bad",
+                editable=False,
+                max_length=10,
+                verbose_name="Tier",
+            ),
+        ),
+        migrations.AddField(
+            model_name="userpointssummary",
+            name="waiting_days",
+            field=models.IntegerField(
+                default=0, editable=False, verbose_name="Waiting Days"
+            ),
+        ),
+        migrations.RunPython(populate_tiers, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="userpointssummary",
+            index=models.Index(
+                fields=["tier", "-current_points"], name="points_summary_tier"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="userpointssummary",
+            index=models.Index(
+                fields=["waiting_days"], name="points_summary_waiting_days"
+            ),
+        ),
+    ]
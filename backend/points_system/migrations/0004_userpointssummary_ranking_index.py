@@ -0,0 +1,19 @@
+# Generated by Django 4.2 on 2026-10-17 21:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("points_system", "0003_userpointssummary_tier"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="userpointssummary",
+            index=models.Index(
+                fields=["-current_points", "id"], name="points_summary_ranking"
+            ),
+        ),
+    ]
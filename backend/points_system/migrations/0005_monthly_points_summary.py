@@ -0,0 +1,91 @@
+# Generated by Django 4.2 on 2026-10-17 21:23
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("points_system", "0004_userpointssummary_ranking_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MonthlyPointsSummary",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "month",
+                    models.DateField(
+                        help_text="First day of the month", verbose_name="Month"
+                    ),
+                ),
+                (
+                    "transaction_type",
+                    models.CharField(
+                        choices=[
+                            ("initial", "Initial Points"),
+                            ("on_time_payment", "On-Time Payment"),
+                            ("late_payment", "Late Payment (1-5 days)"),
+                            ("very_late_payment", "Very Late Payment (>5 days)"),
+                            ("advance_payment", "Advance Payment"),
+                            ("double_payment", "Double Payment"),
+                            ("educational_course", "Educational Course"),
+                            ("manual_adjustment", "Manual Adjustment"),
+                        ],
+                        max_length=30,
+                        verbose_name="Transaction Type",
+                    ),
+                ),
+                (
+                    "transaction_count",
+                    models.PositiveIntegerField(default=0, verbose_name="Transactions"),
+                ),
+                (
+                    "points_amount",
+                    models.IntegerField(default=0, verbose_name="Net Points"),
+                ),
+                (
+                    "earned_points",
+                    models.IntegerField(default=0, verbose_name="Points Earned"),
+                ),
+                ("archived_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Monthly Points Summary",
+                "verbose_name_plural": "Monthly Points Summaries",
+                "ordering": ["-month", "transaction_type"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="pointtransaction",
+            index=models.Index(
+                fields=["user", "-created_at"], name="point_tx_user_created"
+            ),
+        ),
+        migrations.AddField(
+            model_name="monthlypointssummary",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="monthly_points",
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="User",
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="monthlypointssummary",
+            unique_together={("user", "month", "transaction_type")},
+        ),
+    ]
@@ -0,0 +1,87 @@
+from django.db import migrations
+from django.db.models import Exists, OuterRef, Subquery, Sum
+
+
+def backfill_initial_transactions(apps, schema_editor):
+    """
+    Registra la transacción 'initial' de los resúmenes creados sin ella.
+
+    Hasta ahora el saldo inicial de un usuario nuevo solo se sumaba al resumen, así
+    que recalcular desde el historial lo perdía. El monto que falta es la
+    diferencia entre el resumen guardado y su historial (transacciones más meses
+    archivados); la transacción se fecha con el alta del usuario.
+
+    Solo se registra cuando la diferencia es igual al initial_points configurado.
+    Cualquier otra diferencia es un descuadre real que no debe quedar como saldo
+    inicial legítimo: esos usuarios se cuentan y se dejan para revisarlos con
+    recalculate_points_summaries --dry-run.
+    """
+    PointsConfig = apps.get_model("points_system", "PointsConfig")
+    PointTransaction = apps.get_model("points_system", "PointTransaction")
+    MonthlyPointsSummary = apps.get_model("points_system", "MonthlyPointsSummary")
+    UserPointsSummary = apps.get_model("points_system", "UserPointsSummary")
+    User = apps.get_model("accounts", "User")
+
+    summaries = UserPointsSummary.objects.exclude(
+        Exists(PointTransaction.objects.filter(user_id=OuterRef("user_id"), transaction_type="initial"))
+    ).exclude(
+        Exists(MonthlyPointsSummary.objects.filter(user_id=OuterRef("user_id"), transaction_type="initial"))
+    )
+
+    initial_points = PointsConfig.objects.filter(is_active=True).values_list(
+        "initial_points", flat=True
+    ).first()
+    if initial_points is None:
+        initial_points = PointsConfig._meta.get_field("initial_points").default
+
+    skipped = 0
+    last_user_id = 0
+    while True:
+        batch = dict(
+            summaries.filter(user_id__gt=last_user_id).order_by("user_id")
+            .values_list("user_id", "current_points")[:1000]
+        )
+        if not batch:
+            break
+        last_user_id = max(batch)
+
+        ledger = {user_id: 0 for user_id in batch}
+        for model in (PointTransaction, MonthlyPointsSummary):
+            totals = model.objects.filter(user_id__in=batch).values("user_id").annotate(
+                total=Sum("points_amount")
+            ).order_by()
+            for item in totals:
+                ledger[item["user_id"]] += item["total"] or 0
+
+        gaps = {user_id: current - ledger[user_id] for user_id, current in batch.items()}
+        skipped += sum(1 for gap in gaps.values() if gap not in (0, initial_points))
+        created = PointTransaction.objects.bulk_create([
+            PointTransaction(
+                user_id=user_id, transaction_type="initial", points_amount=gap,
+                reason="Initial points for new user",
+            )
+            for user_id, gap in gaps.items()
+            if gap and gap == initial_points
+        ])
+        PointTransaction.objects.filter(pk__in=[row.pk for row in created]).update(
+            created_at=Subquery(User.objects.filter(pk=OuterRef("user_id")).values("date_joined")[:1])
+        )
+
+    if skipped:
+        print(
+            f"\n  {skipped} resúmenes difieren de su historial en un monto distinto del saldo "
+            f"inicial ({initial_points}); no se registró su transacción 'initial'. "
+            "Revíselos con recalculate_points_summaries --dry-run."
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0001_initial"),
+        ("points_system", "0005_monthly_points_summary"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_initial_transactions, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,10 @@
 from django.db import models
+from django.db.models import Case, F, Value, When
+from django.db.models.lookups import GreaterThanOrEqual
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
 from payments.models import Payment
+from .cache import config_cache
 
 class PointsConfig(models.Model):
     """Configuration for the points system"""
@@ -44,9 +47,69 @@ class PointsConfig(models.Model):
     def __str__(self):
         return f"Points Config (Updated: {self.updated_at.strftime('%Y-%m-%d')})"
     
+    # Standing tiers from best to worst
+    TIERS = (
+        ('excellent', _("Excelente")),
+        ('good', _("Bueno")),
+        ('average', _("Promedio")),
+        ('poor', _("Bajo")),
+        ('bad', _("Crítico")),
+    )
+    
+    def get_tiers(self):
+        """
+        Standing tiers from best to worst as dicts with key, label, min_points,
+        max_points (inclusive, None when unbounded) and waiting_days
+        """
+        lower_bounds = [
+            self.excellent_threshold, self.good_threshold,
+            self.average_threshold, self.poor_threshold, None
+        ]
+        tiers = []
+        upper = None
+        for (key, label), lower in zip(self.TIERS, lower_bounds):
+            tiers.append({
+                'key': key,
+                'label': label,
+                'min_points': lower,
+                'max_points': upper,
+                'waiting_days': getattr(self, f'{key}_waiting_days'),
+            })
+            upper = lower - 1 if lower is not None else None
+        return tiers
+    
+    def get_tier(self, points):
+        """Tier dict (see get_tiers) for a points balance"""
+        for tier in self.get_tiers():
+            if tier['min_points'] is None or points >= tier['min_points']:
+                return tier
+    
+    def get_tier_expressions(self, points=F('current_points')):
+        """
+        Case expressions computing tier and waiting_days from a points expression,
+        so UPDATE statements can recompute the stored tier in the database
+        """
+        tiers = self.get_tiers()
+        
+        def ladder(field):
+            return Case(
+                *[
+                    When(GreaterThanOrEqual(points, tier['min_points']), then=Value(tier[field]))
+                    for tier in tiers[:-1]
+                ],
+                default=Value(tiers[-1][field])
+            )
+        
+        return {'tier': ladder('key'), 'waiting_days': ladder('waiting_days')}
+    
     @classmethod
     def get_active_config(cls):
-        """Get the active configuration or create with defaults if none exists"""
+        """Get the active configuration, cached per process (see points_system.cache)"""
+        return config_cache.get()
+    
+    @classmethod
+    def load_active_config(cls):
+        """Load the active configuration or create with defaults if none exists"""
         config = cls.objects.filter(is_active=True).first()
         if not config:
             config = cls.objects.create(is_active=True)
@@ -67,6 +130,12 @@ class PointTransaction(models.Model):
         ('manual_adjustment', _('Manual Adjustment')),
     )
     
+    # Types awarded when a payment is verified (at most one per payment)
+    PAYMENT_TRANSACTION_TYPES = (
+        'on_time_payment', 'late_payment', 'very_late_payment',
+        'advance_payment', 'double_payment',
+    )
+    
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, 
                             related_name='point_transactions',
                             verbose_name=_("User"))
@@ -93,11 +162,47 @@ class PointTransaction(models.Model):
         verbose_name = _("Point Transaction")
         verbose_name_plural = _("Point Transactions")
         ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['payment', 'transaction_type'],
+                condition=models.Q(payment__isnull=False),
+                name='unique_payment_point_transaction'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='point_tx_user_created'),
+        ]
     
     def __str__(self):
         return f"{self.user.username}: {self.points_amount} points ({self.get_transaction_type_display()})"
 
 
+class MonthlyPointsSummary(models.Model):
+    """Per-month rollup of archived point transactions for a user and type"""
+    
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+                            related_name='monthly_points',
+                            verbose_name=_("User"))
+    month = models.DateField(_("Month"), help_text=_("First day of the month"))
+    transaction_type = models.CharField(_("Transaction Type"), max_length=30,
+                                      choices=PointTransaction.TRANSACTION_TYPES)
+    
+    transaction_count = models.PositiveIntegerField(_("Transactions"), default=0)
+    points_amount = models.IntegerField(_("Net Points"), default=0)
+    earned_points = models.IntegerField(_("Points Earned"), default=0)
+    
+    archived_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = _("Monthly Points Summary")
+        verbose_name_plural = _("Monthly Points Summaries")
+        ordering = ['-month', 'transaction_type']
+        unique_together = [['user', 'month', 'transaction_type']]
+    
+    def __str__(self):
+        return f"{self.user.username} {self.month:%Y-%m}: {self.points_amount} points ({self.get_transaction_type_display()})"
+
+
 class UserPointsSummary(models.Model):
     """Current points summary for a user"""
     
@@ -108,41 +213,44 @@ class UserPointsSummary(models.Model):
     current_points = models.IntegerField(_("Current Points"), default=0)
     lifetime_points = models.IntegerField(_("Lifetime Points Earned"), default=0)
     
+    # Standing derived from current_points and the active configuration. Kept in
+    # sync on every points update and re-tiered in bulk when the config changes.
+    tier = models.CharField(_("Tier"), max_length=10, choices=PointsConfig.TIERS,
+                            default='bad', editable=False)
+    waiting_days = models.IntegerField(_("Waiting Days"), default=0, editable=False)
+    
     last_updated = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name = _("User Points Summary")
         verbose_name_plural = _("User Points Summaries")
+        indexes = [
+            models.Index(fields=['tier', '-current_points'], name='points_summary_tier'),
+            models.Index(fields=['waiting_days'], name='points_summary_waiting_days'),
+            models.Index(fields=['-current_points', 'id'], name='points_summary_ranking'),
+        ]
     
     def __str__(self):
         return f"{self.user.username}: {self.current_points} points"
     
+    def save(self, *args, **kwargs):
+        """Keep the stored tier in sync with current_points"""
+        self.refresh_tier()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'current_points' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'tier', 'waiting_days'}
+        super().save(*args, **kwargs)
+    
+    def refresh_tier(self, config=None):
+        """Recompute tier and waiting_days from current_points (without saving)"""
+        tier = (config or PointsConfig.get_active_config()).get_tier(self.current_points)
+        self.tier = tier['key']
+        self.waiting_days = tier['waiting_days']
+    
     def get_waiting_days(self):
-        """Calculate waiting days based on current points"""
-        config = PointsConfig.get_active_config()
-        
-        if self.current_points >= config.excellent_threshold:
-            return config.excellent_waiting_days
-        elif self.current_points >= config.good_threshold:
-            return config.good_waiting_days
-        elif self.current_points >= config.average_threshold:
-            return config.average_waiting_days
-        elif self.current_points >= config.poor_threshold:
-            return config.poor_waiting_days
-        else:
-            return config.bad_waiting_days
+        """Waiting days for the stored tier"""
+        return self.waiting_days
     
     def get_status_label(self):
-        """Get a human-readable status based on current points"""
-        config = PointsConfig.get_active_config()
-        
-        if self.current_points >= config.excellent_threshold:
-            return _("Excelente")
-        elif self.current_points >= config.good_threshold:
-            return _("Bueno")
-        elif self.current_points >= config.average_threshold:
-            return _("Promedio")
-        elif self.current_points >= config.poor_threshold:
-            return _("Bajo")
-        else:
-            return _("Crítico")
+        """Get a human-readable status for the stored tier"""
+        return self.get_tier_display()
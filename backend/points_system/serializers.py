@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from .models import PointTransaction, UserPointsSummary, PointsConfig
+from .models import MonthlyPointsSummary, PointTransaction, UserPointsSummary, PointsConfig
 from payments.serializers import PaymentSerializer
 
 User = get_user_model()
@@ -42,6 +42,30 @@ class PointTransactionSerializer(serializers.ModelSerializer):
         return obj.get_transaction_type_display()
 
 
+class PointTransactionHistorySerializer(serializers.ModelSerializer):
+    """Lightweight serializer for the points history (no nested objects)"""
+    transaction_type_display = serializers.CharField(source='get_transaction_type_display', read_only=True)
+    
+    class Meta:
+        model = PointTransaction
+        fields = [
+            'id', 'transaction_type', 'transaction_type_display',
+            'points_amount', 'payment', 'reason', 'created_at'
+        ]
+
+
+class MonthlyPointsSummarySerializer(serializers.ModelSerializer):
+    """Serializer for archived monthly points"""
+    transaction_type_display = serializers.CharField(source='get_transaction_type_display', read_only=True)
+    
+    class Meta:
+        model = MonthlyPointsSummary
+        fields = [
+            'month', 'transaction_type', 'transaction_type_display',
+            'transaction_count', 'points_amount', 'earned_points'
+        ]
+
+
 class UserPointsSummarySerializer(serializers.ModelSerializer):
     """Serializer for user points summary"""
     user = UserMinimalSerializer(read_only=True)
@@ -52,7 +76,7 @@ class UserPointsSummarySerializer(serializers.ModelSerializer):
         model = UserPointsSummary
         fields = [
             'id', 'user', 'current_points', 'lifetime_points', 
-            'status', 'waiting_days', 'last_updated'
+            'tier', 'status', 'waiting_days', 'last_updated'
         ]
     
     def get_status(self, obj):
@@ -1,6 +1,11 @@
+from collections import defaultdict
+
 from django.utils import timezone
-from django.db import transaction
+from django.db import IntegrityError, transaction
+from django.db.models import Avg, Count, F, Q
 from django.contrib.auth import get_user_model
+from .archive import get_archive_watermark
+from .ledger import rebuild_summaries
 from .models import PointsConfig, PointTransaction, UserPointsSummary
 
 User = get_user_model()
@@ -8,107 +13,6 @@ User = get_user_model()
 class PointsCalculator:
     """Service for calculating and managing client points"""
     
-    @classmethod
-    def calculate_points_for_payment(cls, payment):
-        """
-        Calculate points for a payment based on its timeliness
-        
-        Args:
-            payment: PaymentTransaction instance
-        
-        Returns:
-            PointsTransaction: The created points transaction or None
-        """
-        # Only process verified payments
-        if payment.status != 'verified':
-            return None
-        
-        # Get the client
-        user = payment.application.user
-        
-        # Get or create client points profile
-        points_profile, created = UserPointsSummary.objects.get_or_create(
-            user=user,
-            defaults={'current_points': cls.get_initial_points()}
-        )
-        
-        # Get configuration
-        config = cls.get_configuration()
-        
-        # Find the scheduled payment this payment corresponds to
-        scheduled_payment = None
-        payment_schedule = payment.application.payment_schedule.filter(is_paid=False).order_by('payment_number')
-        
-        if payment_schedule.exists():
-            scheduled_payment = payment_schedule.first()
-        
-        # Calculate points based on timeliness
-        transaction_type = 'manual_adjustment'
-        points_amount = 0
-        notes = ""
-        
-        if scheduled_payment:
-            # Calculate days from due date
-            days_late = (payment.payment_date - scheduled_payment.due_date).days
-            
-            # Determine payment category (green, yellow, red)
-            if days_late <= 0:
-                # On-time or early payment (green)
-                transaction_type = 'green_payment'
-                points_amount = config.green_payment_points
-                notes = f"On-time payment for {payment.application.reference_number}"
-                
-                # Additional points for early payment (at least 3 days before due date)
-                if days_late <= -3:
-                    points_profile.add_points(
-                        config.early_payment_points,
-                        'early_payment',
-                        f"Payment made {abs(days_late)} days before due date",
-                        payment
-                    )
-            
-            elif days_late <= config.yellow_days_max:
-                # Slightly late payment (yellow)
-                transaction_type = 'yellow_payment'
-                points_amount = config.yellow_payment_points
-                notes = f"Slightly late payment ({days_late} days) for {payment.application.reference_number}"
-            else:
-                # Late payment (red)
-                transaction_type = 'red_payment'
-                points_amount = config.red_payment_points
-                notes = f"Late payment ({days_late} days) for {payment.application.reference_number}"
-            
-            # Mark scheduled payment as paid
-            scheduled_payment.mark_as_paid(payment)
-            
-            # Check for double payment (paying current + next payment)
-            if payment.amount >= (scheduled_payment.amount * 1.9) and payment_schedule.count() > 1:
-                next_payment = payment_schedule.all()[1]
-                next_payment.mark_as_paid(payment)
-                
-                # Award bonus points for double payment
-                points_profile.add_points(
-                    config.double_payment_points,
-                    'double_payment',
-                    f"Double payment for {payment.application.reference_number}",
-                    payment
-                )
-        else:
-            # Handle payments without scheduled payments (like down payments)
-            transaction_type = 'green_payment'
-            points_amount = config.green_payment_points
-            notes = f"{payment.get_payment_type_display()} for {payment.application.reference_number}"
-        
-        # Add points to client profile
-        transaction = points_profile.add_points(
-            points_amount,
-            transaction_type,
-            notes,
-            payment
-        )
-        
-        return transaction
-    
     @classmethod
     def add_educational_points(cls, user):
         """
@@ -241,36 +145,88 @@ def calculate_user_points(user):
     Returns:
         int: The total points
     """
-    transactions = PointTransaction.objects.filter(user=user)
-    total_points = sum(t.points_amount for t in transactions)
-    positive_points = sum(t.points_amount for t in transactions if t.points_amount > 0)
+    # Sum the ledger in the database and rewrite the summary if it differs
+    rebuild_summaries(user.pk, user.pk)
+    
+    return UserPointsSummary.objects.filter(user=user).values_list(
+        'current_points', flat=True
+    ).first() or 0
+
+
+def apply_points_delta(user, points, initial_points=0, earned=None, config=None):
+    """
+    Apply a points delta to a user's summary with a single DB-side update.
     
-    # Update the summary
-    summary, _ = UserPointsSummary.objects.get_or_create(user=user)
-    summary.current_points = total_points
-    summary.lifetime_points = positive_points
-    summary.save()
+    The increment uses F() expressions, so concurrent workers never overwrite each
+    other, and the stored tier is recomputed from the new balance in the same
+    statement. If the user has no summary yet it is created starting at
+    ``initial_points``, and that starting balance is recorded as an 'initial'
+    transaction so rebuilding the summary from the ledger keeps it; a concurrent
+    creation is resolved by retrying the update.
     
-    return total_points
+    Args:
+        user: The user whose summary changes
+        points: Points to add (can be negative)
+        initial_points: Starting balance when the summary does not exist yet
+        earned: Points added to lifetime_points (defaults to the positive part of
+                ``points``; batches pass the sum of their positive transactions)
+        config: Active PointsConfig already resolved by the caller (loaded if omitted)
+    """
+    if config is None:
+        config = PointsConfig.get_active_config()
+    if earned is None:
+        earned = max(points, 0)
+    changes = {
+        'current_points': F('current_points') + points,
+        'lifetime_points': F('lifetime_points') + earned,
+        'last_updated': timezone.now(),
+        **config.get_tier_expressions(F('current_points') + points),
+    }
+    if UserPointsSummary.objects.filter(user=user).update(**changes):
+        return
+    
+    try:
+        with transaction.atomic():
+            UserPointsSummary.objects.create(
+                user=user,
+                current_points=initial_points + points,
+                lifetime_points=max(initial_points, 0) + earned
+            )
+            if initial_points:
+                PointTransaction.objects.create(
+                    user=user,
+                    points_amount=initial_points,
+                    transaction_type='initial',
+                    reason='Initial points for new user'
+                )
+    except IntegrityError:
+        # Another worker created the summary first
+        UserPointsSummary.objects.filter(user=user).update(**changes)
 
 
-def add_points(user, points, transaction_type, reason='', payment=None, created_by=None):
+def record_points_transaction(user, points, transaction_type, reason='', payment=None,
+                              created_by=None, initial_points=0):
     """
-    Add (or subtract) points to a user and record the transaction.
+    Record a points transaction and apply it to the user's summary atomically.
     
     Args:
-        user: The user to add points to
-        points: The number of points to add (can be negative)
+        user: The user receiving the points
+        points: The number of points (can be negative)
         transaction_type: The type of transaction
         reason: Optional reason for the transaction
         payment: Optional related payment
-        created_by: Optional user who created this transaction (for manual adjustments)
+        created_by: Optional user who created this transaction
+        initial_points: Starting balance if the user has no summary yet
         
     Returns:
         PointTransaction: The created transaction
     """
+    # Resolved before the transaction: its version check is a read, and the
+    # transaction must start with the summary write to avoid lock upgrades
+    config = PointsConfig.get_active_config()
     with transaction.atomic():
-        # Create the transaction
+        # Summary first: a new user's 'initial' transaction precedes this one
+        apply_points_delta(user, points, initial_points, config=config)
         point_transaction = PointTransaction.objects.create(
             user=user,
             points_amount=points,
@@ -279,15 +235,29 @@ def add_points(user, points, transaction_type, reason='', payment=None, created_
             payment=payment,
             created_by=created_by
         )
+    
+    return point_transaction
+
+
+def add_points(user, points, transaction_type, reason='', payment=None, created_by=None):
+    """
+    Add (or subtract) points to a user and record the transaction.
+    
+    Args:
+        user: The user to add points to
+        points: The number of points to add (can be negative)
+        transaction_type: The type of transaction
+        reason: Optional reason for the transaction
+        payment: Optional related payment
+        created_by: Optional user who created this transaction (for manual adjustments)
         
-        # Update the summary
-        summary, _ = UserPointsSummary.objects.get_or_create(user=user)
-        summary.current_points += points
-        if points > 0:
-            summary.lifetime_points += points
-        summary.save()
-        
-        return point_transaction
+    Returns:
+        PointTransaction: The created transaction
+    """
+    return record_points_transaction(
+        user, points, transaction_type,
+        reason=reason, payment=payment, created_by=created_by
+    )
 
 
 def get_points_for_payment(payment):
@@ -336,27 +306,18 @@ def get_points_for_payment(payment):
         )
 
 
-def process_payment_points(payment, created_by=None):
-    """Process points for a verified payment"""
-    if not payment.is_verified:
-        return None
-    
-    user = payment.user
-    config = PointsConfig.get_active_config()
-    
-    # Get or create user points summary
-    summary, created = UserPointsSummary.objects.get_or_create(
-        user=user,
-        defaults={
-            'current_points': config.initial_points,
-            'lifetime_points': config.initial_points
-        }
-    )
+def calculate_payment_points(payment, config=None):
+    """
+    Calculate the points for a verified payment without touching the database.
     
-    # Determine transaction type and points amount
-    transaction_type = 'manual_adjustment'
-    points_amount = 0
-    reason = ""
+    Args:
+        payment: The payment object
+        config: Points configuration (defaults to the active one)
+        
+    Returns:
+        tuple: (points, transaction_type, reason)
+    """
+    config = config or PointsConfig.get_active_config()
     
     # Check if payment has a due date for determining if it's on time or late
     if payment.due_date:
@@ -395,24 +356,111 @@ def process_payment_points(payment, created_by=None):
         points_amount += config.double_payment_points
         reason = "Double payment bonus"
     
+    return points_amount, transaction_type, reason
+
+
+def payment_points_awarded(payment):
+    """
+    Whether a payment already has its points transaction (one indexed lookup).
+    
+    Payments verified before the archive watermark count as awarded: their
+    transaction, if any, was compacted into MonthlyPointsSummary.
+    """
+    if PointTransaction.objects.filter(
+        payment=payment,
+        transaction_type__in=PointTransaction.PAYMENT_TRANSACTION_TYPES
+    ).exists():
+        return True
+    
+    watermark = get_archive_watermark()
+    return (
+        watermark is not None
+        and payment.verification_date is not None
+        and payment.verification_date < watermark
+    )
+
+
+def process_payment_points(payment, created_by=None):
+    """
+    Process points for a verified payment.
+    
+    Idempotent: a payment gets at most one points transaction, enforced by the
+    unique (payment, transaction_type) constraint. Calling it again for the same
+    payment is a no-op and returns None.
+    """
+    if not payment.is_verified or payment_points_awarded(payment):
+        return None
+    
+    config = PointsConfig.get_active_config()
+    points_amount, transaction_type, reason = calculate_payment_points(payment, config)
+    
     # Create transaction and update points summary
-    with transaction.atomic():
-        # Create transaction
-        point_transaction = PointTransaction.objects.create(
-            user=user,
-            transaction_type=transaction_type,
+    try:
+        return record_points_transaction(
+            payment.user, points_amount, transaction_type,
+            reason=reason, payment=payment, created_by=created_by,
+            initial_points=config.initial_points
+        )
+    except IntegrityError:
+        # A concurrent worker awarded the points first
+        return None
+
+
+def bulk_process_payment_points(payments, created_by=None):
+    """
+    Process points for a batch of verified payments.
+    
+    All transactions are computed in memory and written with a single bulk_create;
+    each affected user's summary then gets one F() update with the net delta, so the
+    cost depends on the number of users rather than the number of payments. Must be
+    called inside a transaction so the ledger and the summaries commit together.
+    
+    Args:
+        payments: Verified payments whose points have not been processed yet
+        created_by: Optional user who verified the batch
+        
+    Returns:
+        list: The created PointTransaction objects
+    """
+    config = PointsConfig.get_active_config()
+    
+    # Skip payments that already have their points transaction
+    awarded = set(
+        PointTransaction.objects.filter(
+            payment__in=payments,
+            transaction_type__in=PointTransaction.PAYMENT_TRANSACTION_TYPES
+        ).values_list('payment_id', flat=True)
+    )
+    
+    point_transactions = []
+    deltas = defaultdict(lambda: [0, 0])
+    for payment in payments:
+        if payment.pk in awarded:
+            continue
+        points_amount, transaction_type, reason = calculate_payment_points(payment, config)
+        point_transactions.append(PointTransaction(
+            user_id=payment.user_id,
             points_amount=points_amount,
-            payment=payment,
+            transaction_type=transaction_type,
             reason=reason,
+            payment=payment,
             created_by=created_by
+        ))
+        delta = deltas[payment.user_id]
+        delta[0] += points_amount
+        delta[1] += max(points_amount, 0)
+    
+    if not point_transactions:
+        return []
+    
+    # Summaries first: new users' 'initial' transactions precede the batch
+    for user_id, (points, earned) in deltas.items():
+        apply_points_delta(
+            User(pk=user_id), points, config.initial_points, earned=earned, config=config
         )
-        
-        # Update summary
-        summary.current_points += points_amount
-        summary.lifetime_points += max(0, points_amount)  # Only add positive points to lifetime
-        summary.save()
+    PointTransaction.objects.bulk_create(point_transactions)
     
-    return point_transaction
+    return point_transactions
 
 
 def get_waiting_days_for_user(user):
@@ -426,76 +474,162 @@ def get_waiting_days_for_user(user):
         dict: Information about waiting days and status
     """
     summary = get_user_points_summary(user)
-    config = PointsConfig.get_active_config()
-    
-    waiting_days = summary.get_waiting_days()
-    status = summary.get_status_label()
-    
-    # Calculate points needed for next level
-    if summary.current_points < config.poor_threshold:
-        next_threshold = config.poor_threshold
-        next_level = "Bajo"
-        points_needed = next_threshold - summary.current_points
-    elif summary.current_points < config.average_threshold:
-        next_threshold = config.average_threshold
-        next_level = "Promedio"
-        points_needed = next_threshold - summary.current_points
-    elif summary.current_points < config.good_threshold:
-        next_threshold = config.good_threshold
-        next_level = "Bueno"
-        points_needed = next_threshold - summary.current_points
-    elif summary.current_points < config.excellent_threshold:
-        next_threshold = config.excellent_threshold
-        next_level = "Excelente"
-        points_needed = next_threshold - summary.current_points
+    tiers = PointsConfig.get_active_config().get_tiers()
+    
+    # Tiers go from best to worst: the next level is the one right above
+    index = [tier['key'] for tier in tiers].index(summary.tier)
+    if index > 0:
+        next_tier = tiers[index - 1]
+        next_level = next_tier['label']
+        points_needed = next_tier['min_points'] - summary.current_points
     else:
-        next_threshold = None
         next_level = None
         points_needed = 0
     
     return {
         'current_points': summary.current_points,
-        'waiting_days': waiting_days,
-        'status': status,
+        'waiting_days': summary.waiting_days,
+        'status': summary.get_status_label(),
         'next_level': next_level,
         'points_needed': points_needed,
         'lifetime_points': summary.lifetime_points
     }
 
 
-def add_educational_course_points(user, created_by=None):
-    """Add points for completing an educational course"""
-    config = PointsConfig.get_active_config()
+def get_points_distribution(queryset=None, config=None):
+    """
+    Histograma de usuarios por nivel de puntos según los umbrales de la configuración.
     
-    # Get or create user points summary
-    summary, created = UserPointsSummary.objects.get_or_create(
-        user=user,
-        defaults={
-            'current_points': config.initial_points,
-            'lifetime_points': config.initial_points
-        }
-    )
+    Todos los niveles, el total y el promedio se obtienen en una sola consulta.
     
-    # Points for educational course
-    points_amount = config.educational_course_points
+    Args:
+        queryset: Resúmenes de puntos a considerar (por defecto todos)
+        config: Configuración de puntos (por defecto la activa)
+        
+    Returns:
+        dict: total, average_points y buckets (de mejor a peor nivel) con key, label,
+              min_points, max_points, count y percentage
+    """
+    queryset = UserPointsSummary.objects.all() if queryset is None else queryset
+    config = config or PointsConfig.get_active_config()
+    tiers = config.get_tiers()
+    
+    aggregates = {'total': Count('pk'), 'average_points': Avg('current_points')}
+    for tier in tiers:
+        condition = Q()
+        if tier['min_points'] is not None:
+            condition &= Q(current_points__gte=tier['min_points'])
+        if tier['max_points'] is not None:
+            condition &= Q(current_points__lte=tier['max_points'])
+        aggregates[tier['key']] = Count('pk', filter=condition)
+    
+    result = queryset.aggregate(**aggregates)
+    total = result['total']
     
-    # Create transaction and update points summary
-    with transaction.atomic():
-        # Create transaction
-        point_transaction = PointTransaction.objects.create(
-            user=user,
-            transaction_type='educational_course',
-            points_amount=points_amount,
-            reason="Completed educational course",
-            created_by=created_by
+    return {
+        'total': total,
+        'average_points': result['average_points'] or 0,
+        'buckets': [
+            dict(
+                tier,
+                count=result[tier['key']],
+                percentage=(result[tier['key']] / total) if total > 0 else 0
+            )
+            for tier in tiers
+        ]
+    }
+
+
+def get_leaderboard(limit=50, after=None):
+    """
+    Get a page of the points leaderboard using keyset pagination.
+    
+    Summaries are ordered by points (highest first) and id, matching the
+    points_summary_ranking index, so any page costs an index range scan instead
+    of an OFFSET. Ranks use competition ranking: tied balances share a rank.
+    
+    No page counts rows: the first page starts at rank 1 and each later page
+    continues from the rank and position carried in ``after``. Ranks therefore
+    stay consistent with the pages already returned; summaries that move above
+    the cursor while paging do not shift the following ranks.
+    
+    Args:
+        limit: Maximum number of entries
+        after: (current_points, id, rank, position) of the last entry of the
+               previous page, position being its 1-based place in the listing
+        
+    Returns:
+        dict: entries (list of (rank, summary)) and next (the ``after`` tuple for
+              the following page, or None on the last page)
+    """
+    queryset = UserPointsSummary.objects.select_related('user').order_by('-current_points', 'id')
+    if after is None:
+        previous_points, rank, position = None, 0, 0
+    else:
+        points, summary_id, rank, position = after
+        previous_points = points
+        queryset = queryset.filter(
+            Q(current_points__lt=points) | Q(current_points=points, id__gt=summary_id)
         )
+    
+    summaries = list(queryset[:limit + 1])
+    has_more = len(summaries) > limit
+    summaries = summaries[:limit]
+    
+    entries = []
+    for summary in summaries:
+        position += 1
+        if summary.current_points != previous_points:
+            rank = position
+            previous_points = summary.current_points
+        entries.append((rank, summary))
+    
+    if not has_more:
+        return {'entries': entries, 'next': None}
+    last = summaries[-1]
+    return {
+        'entries': entries,
+        'next': (last.current_points, last.id, rank, position)
+    }
+
+
+def get_user_rank(user):
+    """
+    Get a user's position in the points leaderboard.
+    
+    The rank is one plus the number of summaries with a higher balance. The count
+    is a range scan on the points_summary_ranking index over the entries above
+    the user, so its cost grows with the rank (cheap near the top, a scan of most
+    of the index for the lowest balances); it does not touch the table rows.
+    
+    Args:
+        user: The user to rank
         
-        # Update summary
-        summary.current_points += points_amount
-        summary.lifetime_points += points_amount
-        summary.save()
+    Returns:
+        dict: rank, current_points and tier, or None if the user has no points
+              summary
+    """
+    summary = UserPointsSummary.objects.filter(user=user).values('current_points', 'tier').first()
+    if summary is None:
+        return None
     
-    return point_transaction
+    return {
+        'rank': UserPointsSummary.objects.filter(current_points__gt=summary['current_points']).count() + 1,
+        'current_points': summary['current_points'],
+        'tier': summary['tier'],
+    }
+
+
+def add_educational_course_points(user, created_by=None):
+    """Add points for completing an educational course"""
+    config = PointsConfig.get_active_config()
+    
+    # Create transaction and update points summary
+    return record_points_transaction(
+        user, config.educational_course_points, 'educational_course',
+        reason="Completed educational course", created_by=created_by,
+        initial_points=config.initial_points
+    )
 
 
 def add_manual_adjustment(user, points_amount, reason, created_by):
@@ -503,33 +637,12 @@ def add_manual_adjustment(user, points_amount, reason, created_by):
     if not reason:
         reason = "Manual adjustment"
     
-    # Get or create user points summary
-    summary, created = UserPointsSummary.objects.get_or_create(
-        user=user,
-        defaults={
-            'current_points': PointsConfig.get_active_config().initial_points,
-            'lifetime_points': PointsConfig.get_active_config().initial_points
-        }
-    )
-    
     # Create transaction and update points summary
-    with transaction.atomic():
-        # Create transaction
-        point_transaction = PointTransaction.objects.create(
-            user=user,
-            transaction_type='manual_adjustment',
-            points_amount=points_amount,
-            reason=reason,
-            created_by=created_by
-        )
-        
-        # Update summary
-        summary.current_points += points_amount
-        if points_amount > 0:
-            summary.lifetime_points += points_amount
-        summary.save()
-    
-    return point_transaction
+    return record_points_transaction(
+        user, points_amount, 'manual_adjustment',
+        reason=reason, created_by=created_by,
+        initial_points=PointsConfig.get_active_config().initial_points
+    )
 
 
 def get_user_waiting_days(user):
@@ -0,0 +1,79 @@
+import logging
+
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from .cache import config_cache
+from .ledger import retier_summaries
+from .models import PointsConfig, UserPointsSummary
+
+logger = logging.getLogger(__name__)
+
+@receiver(request_started)
+def recheck_points_config_version(sender, **kwargs):
+    """Cada request comprueba una vez si la configuración activa cambió en otro proceso"""
+    config_cache.start_request()
+
+
+@receiver([post_save, post_delete], sender=PointsConfig)
+def invalidate_points_config(sender, instance, **kwargs):
+    """
+    Descarta la configuración en caché de este proceso al guardar o eliminar una
+    configuración (incluye activarla con set_active).
+
+    Se hace al confirmar la transacción: antes, otra lectura en este proceso podría
+    volver a cargar la fila anterior. Los demás procesos detectan el cambio por la
+    versión guardada en la base de datos.
+    """
+    transaction.on_commit(config_cache.invalidate)
+
+
+def _tier_settings(config):
+    """Umbrales y días de espera de cada nivel: lo único que determina el nivel guardado"""
+    return [(tier['min_points'], tier['waiting_days']) for tier in config.get_tiers()]
+
+
+@receiver(pre_save, sender=PointsConfig)
+def remember_previous_tier_settings(sender, instance, raw=False, **kwargs):
+    """Guarda los niveles de la fila antes del cambio (None si no estaba activa)"""
+    previous = None
+    if instance.pk and not raw:
+        previous = PointsConfig.objects.filter(pk=instance.pk, is_active=True).first()
+    instance._previous_tier_settings = _tier_settings(previous) if previous else None
+
+
+def retier_or_defer():
+    """
+    Reclasifica los resúmenes en línea si la tabla es pequeña.
+
+    Por encima de POINTS_RETIER_INLINE_LIMIT resúmenes el trabajo no se hace en el
+    request del administrador: se registra un aviso para ejecutar el comando
+    retier_points_summaries.
+    """
+    limit = getattr(settings, 'POINTS_RETIER_INLINE_LIMIT', 50000)
+    if UserPointsSummary.objects.order_by().values_list('pk', flat=True)[limit:limit + 1]:
+        logger.warning(
+            'Cambiaron los niveles de la configuración de puntos y hay más de %s resúmenes: '
+            'ejecute "manage.py retier_points_summaries" para actualizar los niveles guardados',
+            limit
+        )
+        return
+    retier_summaries()
+
+
+@receiver(post_save, sender=PointsConfig)
+def retier_on_active_config_change(sender, instance, raw=False, **kwargs):
+    """
+    Recalcula el nivel guardado de los resúmenes cuando la configuración activa
+    cambia de umbrales o días de espera, o cuando se activa otra configuración.
+    Los cambios que no afectan a los niveles (p. ej. puntos por pago) no
+    reclasifican nada.
+    """
+    if raw or not instance.is_active:
+        return
+    if getattr(instance, '_previous_tier_settings', None) == _tier_settings(instance):
+        return
+    transaction.on_commit(retier_or_defer)
@@ -0,0 +1,98 @@
+import csv
+import json
+
+from django.db.models import Sum
+
+from .models import MonthlyPointsSummary, PointTransaction
+
+STATEMENT_FIELDS = (
+    'user_id', 'username', 'transaction_id', 'created_at', 'transaction_type',
+    'points_amount', 'balance', 'payment_id', 'reason',
+)
+
+
+class _Echo:
+    """Pseudo-buffer para csv.writer: devuelve cada línea en vez de guardarla"""
+
+    def write(self, value):
+        return value
+
+
+def get_opening_balances(user_id=None):
+    """
+    Saldo inicial de cada usuario: la suma de sus meses ya archivados.
+
+    Returns:
+        dict: user_id -> puntos (solo usuarios con meses archivados)
+    """
+    queryset = MonthlyPointsSummary.objects.all()
+    if user_id is not None:
+        queryset = queryset.filter(user_id=user_id)
+    return dict(
+        queryset.values('user_id').annotate(total=Sum('points_amount')).values_list('user_id', 'total').order_by()
+    )
+
+
+def iter_statement_rows(user_id=None, chunk_size=2000):
+    """
+    Recorre el historial de puntos en orden cronológico por usuario con el saldo
+    acumulado calculado al vuelo.
+
+    Las transacciones se leen con iterator() (cursor del lado del servidor en
+    PostgreSQL), así que la memoria no depende del tamaño del historial.
+
+    Args:
+        user_id: Limitar a un usuario (por defecto todos)
+        chunk_size: Filas leídas por bloque
+
+    Yields:
+        dict: Una fila por transacción con las claves de STATEMENT_FIELDS
+    """
+    opening = get_opening_balances(user_id)
+
+    queryset = PointTransaction.objects.all()
+    if user_id is not None:
+        queryset = queryset.filter(user_id=user_id)
+    rows = queryset.order_by('user_id', 'created_at', 'id').values_list(
+        'user_id', 'user__username', 'id', 'created_at', 'transaction_type',
+        'points_amount', 'payment_id', 'reason',
+    )
+
+    current_user = None
+    balance = 0
+    for user, username, transaction_id, created_at, transaction_type, points, payment_id, reason in rows.iterator(chunk_size=chunk_size):
+        if user != current_user:
+            current_user = user
+            balance = opening.get(user, 0)
+        balance += points
+        yield {
+            'user_id': user,
+            'username': username,
+            'transaction_id': transaction_id,
+            'created_at': created_at.isoformat(),
+            'transaction_type': transaction_type,
+            'points_amount': points,
+            'balance': balance,
+            'payment_id': payment_id,
+            'reason': reason,
+        }
+
+
+def stream_csv(rows):
+    """Genera el estado de cuenta como líneas CSV (con encabezado)"""
+    writer = csv.DictWriter(_Echo(), fieldnames=STATEMENT_FIELDS)
+    yield writer.writeheader()
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_jsonl(rows):
+    """Genera el estado de cuenta como JSON Lines (un objeto por línea)"""
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+STATEMENT_FORMATS = {
+    'csv': (stream_csv, 'text/csv; charset=utf-8'),
+    'jsonl': (stream_jsonl, 'application/x-ndjson; charset=utf-8'),
+}
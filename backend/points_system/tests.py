@@ -1,3 +1,746 @@
-from django.test import TestCase
+import json
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from importlib import import_module
+from io import StringIO
+from unittest import skipIf
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import IntegrityError, connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from applications.models import CreditApplication
+from financing.models import FinancingPlan
+from payments.models import Payment, PaymentMethod
+from products.models import Brand, Category, Product
+from dashboard.models import DailyMetric, DailyRollup
+from .archive import _delete_in_batches, archive_month, month_transactions
+from .cache import config_cache
+from .models import MonthlyPointsSummary, PointsConfig, PointTransaction, UserPointsSummary
+from .signals import retier_or_defer
+from .statements import iter_statement_rows
+from .ledger import rebuild_summaries
+from .services import (
+    add_manual_adjustment, add_points, get_points_distribution, get_user_rank,
+    process_payment_points, record_points_transaction,
+)
+from .whatif import get_replayed_deltas
+
+
+class PointsConfigCacheTests(TestCase):
+    """La configuración activa se lee una sola vez y se invalida al guardarse"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='cliente', password='secreto')
+        cls.config = PointsConfig.objects.create(is_active=True)
+        UserPointsSummary.objects.create(user=cls.user, current_points=85, lifetime_points=85)
+
+    def setUp(self):
+        config_cache.invalidate()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _config_queries(self, func):
+        table = PointsConfig._meta.db_table
+        with CaptureQueriesContext(connection) as context:
+            result = func()
+        return result, [q for q in context.captured_queries if table in q['sql']]
+
+    def test_status_request_issues_at_most_one_config_query(self):
+        response, queries = self._config_queries(lambda: self.client.get('/api/v1/points/my/status/'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'Bueno')
+        self.assertLessEqual(len(queries), 1)
+
+        # Con la caché caliente solo se comprueba la versión (sin cargar la fila)
+        response, queries = self._config_queries(lambda: self.client.get('/api/v1/points/my/status/'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('initial_points', queries[0]['sql'])
+
+    def test_save_invalidates_cached_config_on_commit(self):
+        PointsConfig.get_active_config()
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.config.good_threshold = 90
+            self.config.save()
+            # Hasta confirmar la transacción el proceso conserva su copia
+            self.assertEqual(PointsConfig.get_active_config().good_threshold, 80)
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(PointsConfig.get_active_config().good_threshold, 90)
+
+    def test_change_from_another_worker_is_seen_by_next_request(self):
+        PointsConfig.get_active_config()
+
+        # Otro proceso modificó la configuración: en este no se invalidó nada
+        PointsConfig.objects.filter(pk=self.config.pk).update(
+            excellent_threshold=150, updated_at=timezone.now()
+        )
+
+        config_cache.start_request()
+        config, queries = self._config_queries(PointsConfig.get_active_config)
+        self.assertEqual(config.excellent_threshold, 150)
+        self.assertEqual(len(queries), 2)
+
+        config, queries = self._config_queries(PointsConfig.get_active_config)
+        self.assertEqual(queries, [])
+
+
+class PaymentPointsIdempotencyTests(TestCase):
+    """Un pago verificado otorga puntos una sola vez"""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.admin = User.objects.create_user(username='admin', password='secreto', is_staff=True)
+        cls.user = User.objects.create_user(username='cliente', password='secreto')
+        cls.config = PointsConfig.objects.create(is_active=True, initial_points=100)
+
+        category = Category.objects.create(name='Motos', slug='motos')
+        brand = Brand.objects.create(name='Marca', slug='marca')
+        product = Product.objects.create(
+            name='Moto 150', slug='moto-150', category=category, brand=brand,
+            model='150', year=2024, description='Moto', price=Decimal('2500.00'), color='Rojo',
+        )
+        plan = FinancingPlan.objects.create(
+            name='Inmediato', plan_type='immediate', description='Inmediato',
+            min_term=1, max_term=60, interest_rate=Decimal('12.00'),
+            down_payment_percentage=Decimal('30.00'),
+        )
+        cls.application = CreditApplication.objects.create(
+            user=cls.user, product=product, financing_plan=plan,
+            amount=Decimal('2500.00'), term_months=12, monthly_payment=Decimal('150.00'),
+        )
+        cls.method = PaymentMethod.objects.create(name='Transferencia')
+
+    def setUp(self):
+        config_cache.invalidate()
+        self.payment = Payment.objects.create(
+            application=self.application, user=self.user, payment_method=self.method,
+            amount=Decimal('150.00'), payment_date=date(2026, 1, 5), due_date=date(2026, 1, 5),
+        )
+
+    def test_verification_awards_points_once(self):
+        self.payment.verify_payment(verified_by=self.admin)
+
+        # Guardados posteriores del pago verificado no vuelven a otorgar puntos
+        self.payment.notes = 'Revisado'
+        self.payment.save()
+        Payment.objects.get(pk=self.payment.pk).save()
+
+        transactions = PointTransaction.objects.filter(payment=self.payment)
+        self.assertEqual(transactions.count(), 1)
+        self.assertEqual(transactions.get().created_by, self.admin)
+        self.assertTrue(Payment.objects.get(pk=self.payment.pk).points_processed)
+
+        summary = UserPointsSummary.objects.get(user=self.user)
+        self.assertEqual(summary.current_points, 100 + self.config.on_time_payment_points)
+
+    def test_reprocessing_stale_instance_is_a_noop(self):
+        self.payment.verify_payment(verified_by=self.admin)
+
+        stale = Payment.objects.get(pk=self.payment.pk)
+        stale.points_processed = False
+        with self.assertNumQueries(1):
+            self.assertIsNone(process_payment_points(stale))
+        self.assertEqual(PointTransaction.objects.filter(payment=self.payment).count(), 1)
+
+    def test_duplicate_payment_transaction_is_rejected(self):
+        self.payment.verify_payment(verified_by=self.admin)
+        existing = PointTransaction.objects.get(payment=self.payment)
+
+        with self.assertRaises(IntegrityError):
+            PointTransaction.objects.create(
+                user=self.user, payment=self.payment, points_amount=existing.points_amount,
+                transaction_type=existing.transaction_type,
+            )
+
+
+class PointsSummaryRebuildTests(TestCase):
+    """Recalcular los resúmenes desde el historial conserva el saldo inicial"""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create_user(username='cliente', password='secreto')
+        cls.other = User.objects.create_user(username='otro', password='secreto')
+        PointsConfig.objects.create(is_active=True, initial_points=100)
+
+    def setUp(self):
+        config_cache.invalidate()
+
+    def _recalculate(self, *args):
+        out = StringIO()
+        call_command('recalculate_points_summaries', *args, stdout=out)
+        return out.getvalue()
+
+    def test_new_summary_records_initial_transaction(self):
+        record_points_transaction(self.user, 10, 'manual_adjustment', 'x', initial_points=100)
+
+        self.assertEqual(UserPointsSummary.objects.get(user=self.user).current_points, 110)
+        self.assertEqual(
+            list(PointTransaction.objects.filter(user=self.user).order_by('pk')
+                 .values_list('transaction_type', 'points_amount')),
+            [('initial', 100), ('manual_adjustment', 10)]
+        )
+        self.assertEqual(rebuild_summaries(self.user.pk, self.user.pk), [])
+        self.assertEqual(UserPointsSummary.objects.get(user=self.user).current_points, 110)
+
+    def test_command_dry_run_reports_without_saving(self):
+        record_points_transaction(self.user, 10, 'manual_adjustment', 'x', initial_points=100)
+        record_points_transaction(self.other, 200, 'manual_adjustment', 'x', initial_points=100)
+        UserPointsSummary.objects.filter(user=self.user).update(current_points=5)
+
+        output = self._recalculate('--dry-run', '--chunk-size', '1')
+        self.assertIn(f'usuario {self.user.pk}: puntos 5 -> 110', output)
+        self.assertIn('1 resúmenes cambiarían', output)
+        self.assertEqual(UserPointsSummary.objects.get(user=self.user).current_points, 5)
+
+        output = self._recalculate('--chunk-size', '1')
+        self.assertIn('Recalculados 1 resúmenes', output)
+        summary = UserPointsSummary.objects.get(user=self.user)
+        self.assertEqual((summary.current_points, summary.lifetime_points), (110, 110))
+        self.assertEqual(summary.tier, PointsConfig.get_active_config().get_tier(110)['key'])
+        self.assertEqual(UserPointsSummary.objects.get(user=self.other).current_points, 300)
+
+    def test_backfill_migration_adds_missing_initial_transactions(self):
+        # Resumen creado antes de registrar el saldo inicial en el historial
+        UserPointsSummary.objects.create(user=self.user, current_points=110, lifetime_points=110)
+        PointTransaction.objects.create(user=self.user, points_amount=10, transaction_type='manual_adjustment')
+        # Usuario que ya tiene su transacción inicial: no se toca
+        record_points_transaction(self.other, 5, 'manual_adjustment', 'x', initial_points=100)
+
+        # Descuadre que no corresponde al saldo inicial: no se registra como tal
+        drifted = get_user_model().objects.create_user(username='descuadrado', password='secreto')
+        UserPointsSummary.objects.create(user=drifted, current_points=70, lifetime_points=100)
+        PointTransaction.objects.create(user=drifted, points_amount=100, transaction_type='manual_adjustment')
+
+        migration = import_module('points_system.migrations.0006_backfill_initial_transactions')
+        out = StringIO()
+        with redirect_stdout(out):
+            migration.backfill_initial_transactions(apps, None)
+
+        initial = PointTransaction.objects.get(user=self.user, transaction_type='initial')
+        self.assertEqual(initial.points_amount, 100)
+        self.assertEqual(initial.created_at, self.user.date_joined)
+        self.assertEqual(PointTransaction.objects.filter(user=self.other, transaction_type='initial').count(), 1)
+        self.assertEqual(rebuild_summaries(self.user.pk, self.other.pk), [])
+        self.assertFalse(PointTransaction.objects.filter(user=drifted, transaction_type='initial').exists())
+        self.assertIn('1 resúmenes difieren de su historial', out.getvalue())
+
+
+@skipIf(
+    connection.vendor == 'sqlite' and connection.is_in_memory_db(),
+    'SQLite en memoria no admite escrituras desde varios hilos'
+)
+class PointsLedgerConcurrencyTests(TransactionTestCase):
+    """Las actualizaciones concurrentes del saldo no se pierden"""
+
+    THREADS = 8
+    OPERATIONS = 25
+
+    def setUp(self):
+        config_cache.invalidate()
+        self.user = get_user_model().objects.create_user(username='cliente', password='secreto')
+        self.admin = get_user_model().objects.create_user(username='admin', password='secreto', is_staff=True)
+        PointsConfig.objects.create(is_active=True, initial_points=100)
+
+    def _hammer(self, operation):
+        def worker(index):
+            try:
+                for _ in range(self.OPERATIONS):
+                    operation(index)
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=self.THREADS) as executor:
+            list(executor.map(worker, range(self.THREADS)))
+
+    def test_parallel_add_points_keeps_every_increment(self):
+        # El primer hilo en escribir crea el resumen; los demás solo incrementan
+        self._hammer(lambda index: add_points(self.user, 2, 'on_time_payment'))
+
+        summary = UserPointsSummary.objects.get(user=self.user)
+        expected = 2 * self.THREADS * self.OPERATIONS
+        self.assertEqual(summary.current_points, expected)
+        self.assertEqual(summary.lifetime_points, expected)
+        self.assertEqual(PointTransaction.objects.filter(user=self.user).count(), self.THREADS * self.OPERATIONS)
+
+    def test_parallel_mixed_adjustments(self):
+        UserPointsSummary.objects.create(user=self.user, current_points=100, lifetime_points=100)
+
+        # Hilos pares suman 3 puntos, impares restan 1
+        self._hammer(lambda index: add_manual_adjustment(
+            self.user, 3 if index % 2 == 0 else -1, 'Ajuste', self.admin
+        ))
+
+        summary = UserPointsSummary.objects.get(user=self.user)
+        per_parity = self.THREADS // 2 * self.OPERATIONS
+        self.assertEqual(summary.current_points, 100 + 3 * per_parity - per_parity)
+        self.assertEqual(summary.lifetime_points, 100 + 3 * per_parity)
+
+
+class PointTransactionHistoryTests(TestCase):
+    """Paginación por cursor del listado de transacciones y archivo mensual"""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.admin = User.objects.create_user(username='admin', password='x', is_staff=True)
+        cls.user = User.objects.create_user(username='cliente', password='secreto')
+        cls.other = User.objects.create_user(username='otro', password='secreto')
+
+    def add_transactions(self, user, *moments):
+        """Crea una transacción de 10 puntos por cada instante indicado"""
+        created = PointTransaction.objects.bulk_create([
+            PointTransaction(user=user, points_amount=10, transaction_type='manual_adjustment')
+            for _ in moments
+        ])
+        for transaction, moment in zip(created, moments):
+            PointTransaction.objects.filter(pk=transaction.pk).update(created_at=moment)
+        return [transaction.pk for transaction in created]
+
+    def test_admin_history_walks_every_page_with_a_cursor(self):
+        now = timezone.now()
+        # Dos transacciones por instante: el desempate por id mantiene el orden estable
+        for hours in range(8):
+            moment = now - timedelta(hours=hours)
+            self.add_transactions(self.user, moment, moment)
+            self.add_transactions(self.other, moment)
+        expected = list(
+            PointTransaction.objects.filter(user=self.user)
+            .order_by('-created_at', '-id').values_list('pk', flat=True)
+        )
+
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        url = f'/api/v1/points/admin/users/{self.user.pk}/transactions/?page_size=5'
+        seen = []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            self.assertFalse(any('COUNT(' in query['sql'] for query in queries.captured_queries))
+            seen.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+
+        self.assertEqual(seen, expected)
+
+    def test_archive_month_compacts_and_keeps_dashboard_rollups(self):
+        month = date(2023, 3, 1)
+        inside = timezone.make_aware(datetime(2023, 3, 10, 12))
+        outside = timezone.make_aware(datetime(2023, 4, 2, 12))
+        # Meses intercalados para que los rangos de ID mezclen filas de ambos
+        for _ in range(3):
+            self.add_transactions(self.user, inside, outside)
+        self.add_transactions(self.other, inside)
+        DailyRollup.objects.create(date=date(2023, 3, 10))
+        DailyMetric.objects.create(
+            date=date(2023, 3, 10), metric='points', kind='manual_adjustment', count=4, amount=40
+        )
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.assertEqual(archive_month(month), 4)
+        self.assertEqual(callbacks, [])
+
+        self.assertFalse(month_transactions(month).exists())
+        self.assertEqual(month_transactions(date(2023, 4, 1)).count(), 3)
+        self.assertEqual(
+            list(MonthlyPointsSummary.objects.filter(month=month).order_by('user_id').values_list(
+                'user_id', 'transaction_count', 'points_amount', 'earned_points'
+            )),
+            [(self.user.pk, 3, 30, 30), (self.other.pk, 1, 10, 10)]
+        )
+        # El receptor del dashboard ignora el borrado: la métrica consolidada del día no cambia
+        self.assertEqual(DailyMetric.objects.get(metric='points').count, 4)
+
+        # Archivar de nuevo el mismo mes suma sobre las filas existentes
+        self.add_transactions(self.user, inside)
+        self.assertEqual(archive_month(month), 1)
+        self.assertEqual(
+            MonthlyPointsSummary.objects.get(user=self.user, month=month).transaction_count, 4
+        )
+
+    def test_rollup_refresh_freezes_points_of_archived_days(self):
+        inside = timezone.make_aware(datetime(2023, 3, 10, 12))
+        outside = timezone.make_aware(datetime(2023, 4, 2, 12))
+        self.add_transactions(self.user, inside, inside, outside)
+        call_command('rollup_dashboard_metrics', '--since', '2023-03-01', '--metrics', 'points', stdout=StringIO())
+        archive_month(date(2023, 3, 1))
+
+        # Reconsolidar sobre el mes archivado no deja en cero sus días
+        call_command('rollup_dashboard_metrics', '--since', '2023-03-01', stdout=StringIO())
+        self.assertEqual(
+            list(DailyMetric.objects.filter(metric='points').order_by('date').values_list('date', 'count')),
+            [(date(2023, 3, 10), 2), (date(2023, 4, 2), 1)]
+        )
+
+    def test_statement_running_balance_starts_from_archived_months(self):
+        def at(day, month=4):
+            return timezone.make_aware(datetime(2023, month, day, 12))
+
+        # Marzo: 100 + 10 = 110, que pasa al archivo
+        march = self.add_transactions(self.user, at(5, 3), at(20, 3))
+        PointTransaction.objects.filter(pk=march[0]).update(transaction_type='initial', points_amount=100)
+        april = self.add_transactions(self.user, at(2), at(15), at(15))
+        PointTransaction.objects.filter(pk=april[0]).update(points_amount=-10)
+        self.add_transactions(self.other, at(3))
+        archive_month(date(2023, 3, 1))
+
+        with self.assertNumQueries(2):
+            rows = list(iter_statement_rows(self.user.pk))
+        self.assertEqual(
+            [(row['transaction_id'], row['points_amount'], row['balance']) for row in rows],
+            [(april[0], -10, 100), (april[1], 10, 110), (april[2], 10, 120)]
+        )
+
+        # La exportación de todos los usuarios reinicia el saldo en cada usuario
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.get('/api/v1/points/admin/statements/', {'file_format': 'jsonl'})
+        self.assertEqual(response.status_code, 200)
+        exported = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(
+            [(row['user_id'], row['balance']) for row in exported],
+            [(self.user.pk, 100), (self.user.pk, 110), (self.user.pk, 120), (self.other.pk, 10)]
+        )
+
+    def test_bounded_delete_only_removes_the_filtered_rows(self):
+        inside = timezone.make_aware(datetime(2023, 3, 10, 12))
+        outside = timezone.make_aware(datetime(2023, 4, 2, 12))
+        kept = []
+        for _ in range(5):
+            self.add_transactions(self.user, inside)
+            kept += self.add_transactions(self.user, outside)
+
+        with CaptureQueriesContext(connection) as queries:
+            deleted = _delete_in_batches(month_transactions(date(2023, 3, 1)), batch_size=2)
+
+        self.assertEqual(deleted, 5)
+        self.assertEqual(sorted(PointTransaction.objects.values_list('pk', flat=True)), kept)
+        # Cinco filas en lotes de dos: tres sentencias DELETE
+        self.assertEqual(sum('DELETE' in query['sql'] for query in queries.captured_queries), 3)
+
+
+class PointsDistributionTests(TestCase):
+    """El histograma de niveles usa los umbrales de la configuración activa"""
+
+    def test_distribution_uses_configured_tier_boundaries(self):
+        PointsConfig.objects.create(
+            is_active=True, excellent_threshold=500, good_threshold=300,
+            average_threshold=200, poor_threshold=50,
+        )
+        config_cache.invalidate()
+        balances = [500, 499, 300, 299, 200, 199, 50, 49, -10]
+        User = get_user_model()
+        users = User.objects.bulk_create([User(username=f'u{index}') for index in range(len(balances))])
+        UserPointsSummary.objects.bulk_create([
+            UserPointsSummary(user=user, current_points=points)
+            for user, points in zip(users, balances)
+        ])
+
+        with self.assertNumQueries(2):
+            distribution = get_points_distribution()
+
+        self.assertEqual(distribution['total'], 9)
+        self.assertEqual(distribution['average_points'], sum(balances) / 9)
+        self.assertEqual(
+            [(b['key'], b['min_points'], b['max_points'], b['count']) for b in distribution['buckets']],
+            [
+                ('excellent', 500, None, 1),
+                ('good', 300, 499, 2),
+                ('average', 200, 299, 2),
+                ('poor', 50, 199, 2),
+                ('bad', None, 49, 2),
+            ]
+        )
+        self.assertAlmostEqual(distribution['buckets'][1]['percentage'], 2 / 9)
+
+
+class PointsRetierTests(TestCase):
+    """El nivel guardado sigue a los umbrales de la configuración activa"""
+
+    BALANCES = [150, 100, 99, 80, 79, 60, 40, 39, -20]
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        users = User.objects.bulk_create([User(username=f'u{index}') for index in range(len(cls.BALANCES))])
+        # bulk_create no calcula el nivel: todas las filas quedan con el valor por defecto
+        UserPointsSummary.objects.bulk_create([
+            UserPointsSummary(user=user, current_points=points)
+            for user, points in zip(users, cls.BALANCES)
+        ])
+
+    def setUp(self):
+        config_cache.invalidate()
+
+    def stored_tiers(self):
+        return list(
+            UserPointsSummary.objects.order_by('-current_points').values_list('tier', 'waiting_days')
+        )
+
+    def expected_tiers(self, config):
+        return [
+            (config.get_tier(points)['key'], config.get_tier(points)['waiting_days'])
+            for points in sorted(self.BALANCES, reverse=True)
+        ]
+
+    def test_saving_active_config_retiers_on_commit(self):
+        config = PointsConfig.objects.create(is_active=True)
+        config.excellent_threshold = 150
+        config.good_threshold = 90
+        config.poor_threshold = 0
+        config.good_waiting_days = 3
+
+        with self.captureOnCommitCallbacks(execute=True):
+            config.save()
+            # Hasta confirmar la transacción los niveles guardados no cambian
+            self.assertEqual({tier for tier, _ in self.stored_tiers()}, {'bad'})
+
+        self.assertEqual(self.stored_tiers(), self.expected_tiers(config))
+        self.assertEqual(self.stored_tiers()[1:3], [('good', 3), ('good', 3)])
+
+    def test_non_tier_changes_do_not_retier(self):
+        config = PointsConfig.objects.create(is_active=True)
+        call_command('retier_points_summaries', stdout=StringIO())
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            config.on_time_payment_points = 8
+            config.save()
+        self.assertNotIn(retier_or_defer, callbacks)
+
+        # Activar otra configuración sí reclasifica aunque sus valores no cambien
+        other = PointsConfig.objects.create(is_active=False)
+        with self.captureOnCommitCallbacks() as callbacks:
+            other.is_active = True
+            other.save()
+        self.assertIn(retier_or_defer, callbacks)
+
+    @override_settings(POINTS_RETIER_INLINE_LIMIT=3)
+    def test_large_tables_are_left_to_the_command(self):
+        config = PointsConfig.objects.create(is_active=True)
+        config.good_threshold = 90
+
+        with self.assertLogs('points_system.signals', 'WARNING') as logs:
+            with self.captureOnCommitCallbacks(execute=True):
+                config.save()
+
+        self.assertIn('retier_points_summaries', logs.output[0])
+        self.assertEqual({tier for tier, _ in self.stored_tiers()}, {'bad'})
+
+    def test_command_only_rewrites_changed_rows(self):
+        # Sin confirmar la transacción la señal no reclasifica: los niveles siguen desactualizados
+        config = PointsConfig.objects.create(is_active=True)
+
+        out = StringIO()
+        call_command('retier_points_summaries', '--chunk-size', '2', stdout=out)
+        self.assertIn(f'Actualizados {len(self.BALANCES)} resúmenes', out.getvalue())
+        self.assertEqual(self.stored_tiers(), self.expected_tiers(config))
+
+        out = StringIO()
+        call_command('retier_points_summaries', stdout=out)
+        self.assertIn('Actualizados 0 resúmenes', out.getvalue())
+
+    def test_admin_listing_filters_by_stored_tier(self):
+        config = PointsConfig.objects.create(is_active=True)
+        call_command('retier_points_summaries', stdout=StringIO())
+        admin = get_user_model().objects.create_user(username='admin', password='x', is_staff=True)
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        response = client.get('/api/v1/points/admin/users/', {'tier': 'good', 'page_size': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('count', response.data)
+        self.assertEqual([item['current_points'] for item in response.data['results']], [99])
+
+        # La segunda página continúa desde el cursor y sigue filtrada por nivel
+        response = client.get(response.data['next'])
+        self.assertEqual([item['current_points'] for item in response.data['results']], [80])
+        self.assertIsNone(response.data['next'])
+
+        response = client.get('/api/v1/points/admin/users/', {'waiting_days': config.good_waiting_days})
+        self.assertEqual([item['current_points'] for item in response.data['results']], [99, 80])
+
+    def test_populate_tiers_migration(self):
+        config = PointsConfig.objects.create(
+            is_active=True, excellent_threshold=140, average_threshold=50, bad_waiting_days=60,
+        )
+
+        migration = import_module('points_system.migrations.0003_userpointssummary_tier')
+        migration.populate_tiers(apps, None)
+
+        self.assertEqual(self.stored_tiers(), self.expected_tiers(config))
+        self.assertEqual(self.stored_tiers()[-1], ('bad', 60))
+
+
+class PointsLeaderboardTests(TestCase):
+    """Clasificación paginada por cursor con empates en la misma posición"""
+
+    BALANCES = [100, 90, 90, 90, 80, 70, 70, 60]
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.admin = User.objects.create_user(username='admin', password='x', is_staff=True)
+        cls.users = User.objects.bulk_create([User(username=f'u{index}') for index in range(len(cls.BALANCES))])
+        UserPointsSummary.objects.bulk_create([
+            UserPointsSummary(user=user, current_points=points)
+            for user, points in zip(cls.users, cls.BALANCES)
+        ])
+
+    def walk(self, limit, between_pages=None):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        entries = []
+        params = {'limit': limit}
+        while True:
+            response = client.get('/api/v1/points/admin/leaderboard/', params)
+            self.assertEqual(response.status_code, 200)
+            entries += [(item['user']['username'], item['rank']) for item in response.data['results']]
+            if not response.data['next_cursor']:
+                return entries
+            params['cursor'] = response.data['next_cursor']
+            if between_pages:
+                between_pages()
+                between_pages = None
+
+    def test_pages_continue_across_ties(self):
+        # Páginas de tres: el empate en 90 queda partido entre la primera y la segunda
+        self.assertEqual(self.walk(3), [
+            ('u0', 1), ('u1', 2), ('u2', 2), ('u3', 2), ('u4', 5), ('u5', 6), ('u6', 6), ('u7', 8),
+        ])
+        self.assertEqual(self.walk(3), self.walk(50))
+
+    def test_new_entries_between_pages_do_not_repeat_or_skip(self):
+        def insert_leader():
+            user = get_user_model().objects.create(username='nuevo')
+            UserPointsSummary.objects.create(user=user, current_points=95)
+
+        entries = self.walk(3, between_pages=insert_leader)
+
+        # El nuevo saldo queda antes del cursor: las páginas siguientes continúan la
+        # numeración ya mostrada, sin repetir ni saltar entradas
+        self.assertEqual(entries, [
+            ('u0', 1), ('u1', 2), ('u2', 2), ('u3', 2), ('u4', 5), ('u5', 6), ('u6', 6), ('u7', 8),
+        ])
+
+    def test_pages_do_not_count_rows(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        params = {'limit': 2}
+        while True:
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get('/api/v1/points/admin/leaderboard/', params)
+            self.assertFalse(any('COUNT(' in query['sql'] for query in queries.captured_queries))
+            if not response.data['next_cursor']:
+                break
+            params['cursor'] = response.data['next_cursor']
+
+    def test_invalid_cursor_is_rejected(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.get('/api/v1/points/admin/leaderboard/', {'cursor': 'no-es-un-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_user_rank_shares_position_with_ties(self):
+        with self.assertNumQueries(2):
+            rank = get_user_rank(self.users[3])
+        self.assertEqual((rank['rank'], rank['current_points']), (2, 90))
+        self.assertEqual(get_user_rank(self.users[7])['rank'], 8)
+        self.assertIsNone(get_user_rank(self.admin))
+
+
+class PointsWhatIfTests(TestCase):
+    """La simulación reprocesa un historial conocido con la configuración candidata"""
+
+    CANDIDATE = {
+        'initial_points': 50, 'on_time_payment_points': 10, 'very_late_payment_points': -20,
+        'advance_payment_points': 5, 'double_payment_points': 9,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.admin = User.objects.create_user(username='admin', password='x', is_staff=True)
+        cls.first, cls.second, cls.third = User.objects.bulk_create(
+            [User(username=name) for name in ('primero', 'segundo', 'tercero')]
+        )
+        cls.active = PointsConfig.objects.create(is_active=True)
+
+        ledger = {
+            # 100 + 5 + 5 + 20 + (5 de puntualidad + 7 de bono doble) = 142
+            cls.first: [('initial', 100), ('on_time_payment', 5), ('on_time_payment', 5),
+                        ('manual_adjustment', 20), ('double_payment', 12)],
+            # 100 - 10 + 10 = 100, más 28 de meses archivados
+            cls.second: [('initial', 100), ('very_late_payment', -10), ('educational_course', 10)],
+            cls.third: [('initial', 100)],
+        }
+        PointTransaction.objects.bulk_create([
+            PointTransaction(user=user, transaction_type=kind, points_amount=amount)
+            for user, rows in ledger.items() for kind, amount in rows
+        ])
+        MonthlyPointsSummary.objects.bulk_create([
+            MonthlyPointsSummary(user=cls.second, month=date(2023, 1, 1), transaction_type='on_time_payment',
+                                 transaction_count=4, points_amount=20, earned_points=20),
+            MonthlyPointsSummary(user=cls.second, month=date(2023, 1, 1), transaction_type='advance_payment',
+                                 transaction_count=1, points_amount=8, earned_points=8),
+        ])
+        UserPointsSummary.objects.bulk_create([
+            UserPointsSummary(user=user, current_points=points, tier='excellent', waiting_days=0)
+            for user, points in ((cls.first, 142), (cls.second, 128), (cls.third, 100))
+        ])
+
+    def setUp(self):
+        config_cache.invalidate()
+
+    def test_replayed_deltas_per_user(self):
+        candidate = PointsConfig(**self.CANDIDATE)
+
+        with self.assertNumQueries(2):
+            deltas = get_replayed_deltas(candidate, self.active)
+
+        self.assertEqual(deltas, {
+            # -50 inicial, +5 por cada pago puntual, +2 de bono doble; el ajuste manual se conserva
+            self.first.pk: -50 + 10 + 2,
+            # -50 inicial, -10 por el pago muy tardío, archivo: 4 × 10 - 20 y 1 × 15 - 8
+            self.second.pk: -50 - 10 + 20 + 7,
+            self.third.pk: -50,
+        })
+
+    def test_simulation_endpoint_reports_tier_changes_without_saving(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+
+        response = client.post('/api/v1/points/admin/config/simulate/', self.CANDIDATE, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        result = response.data
+        self.assertEqual((result['users'], result['points_changed'], result['tier_changed']), (3, 3, 2))
+        # Saldos simulados: 104 (excelente), 95 (bueno) y 50 (bajo)
+        self.assertEqual(
+            {(item['from'], item['to'], item['count']) for item in result['migrations']},
+            {('excellent', 'good', 1), ('excellent', 'poor', 1)}
+        )
+        self.assertEqual(
+            {item['key']: (item['before'], item['after']) for item in result['tiers']},
+            {'excellent': (3, 1), 'good': (0, 1), 'average': (0, 0), 'poor': (0, 1), 'bad': (0, 0)}
+        )
+        self.assertEqual(result['waiting_days']['increased'], 2)
+        self.assertAlmostEqual(result['waiting_days']['average_after'], (0 + 7 + 30) / 3)
+
+        self.active.refresh_from_db()
+        self.assertEqual(self.active.initial_points, 100)
+        self.assertEqual(PointsConfig.objects.count(), 1)
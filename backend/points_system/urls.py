@@ -7,7 +7,13 @@ from .views import (
     AdminUserPointsView,
     PointsStatisticsView,
     UserPointsBalanceView,
-    UserWaitingDaysView
+    UserWaitingDaysView,
+    PointsLeaderboardView,
+    UserPointsRankView,
+    UserPointsHistoryView,
+    UserPointsArchiveView,
+    AdminPointsStatementExportView,
+    UserPointsStatementView
 )
 
 # Router for viewsets
@@ -20,6 +26,10 @@ urlpatterns = [
     # User endpoints
     path('my/status/', UserPointsView.as_view(), name='user-points-status'),
     path('my/transactions/', UserPointsTransactionsView.as_view(), name='user-points-transactions'),
+    path('my/rank/', UserPointsRankView.as_view(), name='user-points-rank'),
+    path('my/history/', UserPointsHistoryView.as_view(), name='user-points-history'),
+    path('my/history/archive/', UserPointsArchiveView.as_view(), name='user-points-archive'),
+    path('my/statement/', UserPointsStatementView.as_view(), name='user-points-statement'),
     
     # Admin endpoints
     path('admin/users/', AdminUserPointsView.as_view({'get': 'list'}), name='admin-users-points'),
@@ -39,6 +49,8 @@ urlpatterns = [
     
     # Statistics
     path('admin/statistics/', PointsStatisticsView.as_view(), name='points-statistics'),
+    path('admin/leaderboard/', PointsLeaderboardView.as_view(), name='points-leaderboard'),
+    path('admin/statements/', AdminPointsStatementExportView.as_view(), name='points-statements-export'),
     
     # New endpoints
     path('balance/', UserPointsBalanceView.as_view(), name='points_balance'),
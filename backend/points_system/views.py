@@ -1,3 +1,7 @@
+import base64
+import binascii
+
+from django.http import StreamingHttpResponse
 from django.shortcuts import render
 from rest_framework import viewsets, generics, status, filters
 from rest_framework.decorators import action, api_view, permission_classes
@@ -6,21 +10,36 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
-from django.db.models import Sum, Count
 from rest_framework.generics import ListAPIView, RetrieveAPIView
 from rest_framework.pagination import PageNumberPagination
 
-from .models import PointsConfig, PointTransaction, UserPointsSummary
+from common.pagination import CreatedAtCursorPagination, PointsSummaryCursorPagination
+from .models import MonthlyPointsSummary, PointsConfig, PointTransaction, UserPointsSummary
 from .serializers import (
     PointsConfigSerializer, UserPointsSummarySerializer,
     PointTransactionSerializer, ManualPointsAdjustmentSerializer,
     EducationalCoursePointsSerializer,
-    PointsStatusSerializer
+    PointsStatusSerializer, UserMinimalSerializer,
+    PointTransactionHistorySerializer, MonthlyPointsSummarySerializer
 )
-from .services import PointsCalculator, get_user_points_summary, calculate_user_points, get_waiting_days_for_user, add_educational_course_points, add_manual_adjustment, get_user_waiting_days
+from .services import PointsCalculator, get_user_points_summary, calculate_user_points, get_waiting_days_for_user, add_educational_course_points, add_manual_adjustment, get_user_waiting_days, get_points_distribution, get_leaderboard, get_user_rank
+from .statements import STATEMENT_FORMATS, iter_statement_rows
+from .whatif import simulate_config
 
 User = get_user_model()
 
+
+def _filter_points_summaries(queryset, query_params):
+    """Apply the ?tier= and ?waiting_days= filters (both on indexed, stored columns)"""
+    tier = query_params.get('tier')
+    if tier:
+        queryset = queryset.filter(tier=tier)
+    waiting_days = query_params.get('waiting_days')
+    if waiting_days and waiting_days.isdigit():
+        queryset = queryset.filter(waiting_days=int(waiting_days))
+    return queryset
+
+
 class PointsConfigurationViewSet(viewsets.ModelViewSet):
     """ViewSet for managing points system configuration"""
     queryset = PointsConfig.objects.all()
@@ -47,13 +66,13 @@ class UserPointsSummaryViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['user__username', 'user__first_name', 'user__last_name', 'user__email']
-    ordering_fields = ['current_points', 'created_at', 'updated_at']
+    ordering_fields = ['current_points', 'waiting_days', 'last_updated']
     
     def get_queryset(self):
         """Get points profiles based on user role"""
         if self.request.user.is_staff:
-            # Admins can see all points profiles
-            return UserPointsSummary.objects.all()
+            # Admins can see all points profiles, filtered by stored tier or waiting days
+            return _filter_points_summaries(UserPointsSummary.objects.all(), self.request.query_params)
         else:
             # Regular users can only see their own points
             return UserPointsSummary.objects.filter(user=self.request.user)
@@ -94,9 +113,15 @@ class UserPointsSummaryViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 class PointsTransactionViewSet(viewsets.ReadOnlyModelViewSet):
-    """ViewSet for viewing points transactions"""
+    """
+    ViewSet for viewing points transactions (not routed; the admin history is
+    served by AdminUserPointsView.transactions).
+    
+    Pages use a cursor over -created_at instead of OFFSET + COUNT(*).
+    """
     serializer_class = PointTransactionSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
     
     def get_queryset(self):
         """Get transactions based on user role and request parameters"""
@@ -153,7 +178,12 @@ class UserPointsView(APIView):
 
 class UserPointsTransactionsView(ListAPIView):
     """
-    Lista todas las transacciones de puntos del usuario autenticado
+    Lista todas las transacciones de puntos del usuario autenticado.
+    
+    Conserva la paginación por número de página porque el frontend
+    (PointsHistory) navega con ?page= y calcula el total de páginas con count.
+    El costo está acotado a un usuario: COUNT y OFFSET recorren el índice
+    (user, -created_at). Para historiales largos está my/history/ con cursor.
     """
     permission_classes = [IsAuthenticated]
     serializer_class = PointTransactionSerializer
@@ -163,6 +193,33 @@ class UserPointsTransactionsView(ListAPIView):
         return PointTransaction.objects.filter(user=self.request.user).order_by('-created_at')
 
 
+class UserPointsHistoryView(ListAPIView):
+    """
+    Historial de transacciones de puntos con paginación por cursor (sin COUNT).
+    Los administradores pueden consultar otro usuario con ?user_id=
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = PointTransactionHistorySerializer
+    pagination_class = CreatedAtCursorPagination
+    
+    def get_queryset(self):
+        user_id = self.request.query_params.get('user_id')
+        if self.request.user.is_staff and user_id and user_id.isdigit():
+            return PointTransaction.objects.filter(user_id=int(user_id))
+        return PointTransaction.objects.filter(user=self.request.user)
+
+
+class UserPointsArchiveView(ListAPIView):
+    """
+    Resumen mensual de las transacciones de puntos ya archivadas del usuario
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = MonthlyPointsSummarySerializer
+    
+    def get_queryset(self):
+        return MonthlyPointsSummary.objects.filter(user=self.request.user)
+
+
 class AdminPointsConfigView(viewsets.ModelViewSet):
     """ViewSet for managing points system configuration"""
     serializer_class = PointsConfigSerializer
@@ -176,6 +233,24 @@ class AdminPointsConfigView(viewsets.ModelViewSet):
         serializer = self.get_serializer(config)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['post'])
+    def simulate(self, request):
+        """
+        What-if: report tier and waiting-day changes if the active configuration
+        were replaced by it with the given field overrides (nothing is saved)
+        """
+        active = PointsConfig.get_active_config()
+        serializer = self.get_serializer(active, data=request.data, partial=True)
+        serializer.is_valid(raise_exception=True)
+        
+        candidate = PointsConfig(**{
+            field.attname: getattr(active, field.attname) for field in PointsConfig._meta.concrete_fields
+        })
+        for field, value in serializer.validated_data.items():
+            setattr(candidate, field, value)
+        
+        return Response(simulate_config(candidate, active))
+    
     @action(detail=True, methods=['post'])
     def set_active(self, request, pk=None):
         """Set this configuration as active"""
@@ -197,10 +272,19 @@ class AdminUserPointsView(viewsets.ViewSet):
     permission_classes = [IsAdminUser]
     
     def list(self, request):
-        """List all users with their points summary"""
-        summaries = UserPointsSummary.objects.all()
-        serializer = UserPointsSummarySerializer(summaries, many=True)
-        return Response(serializer.data)
+        """
+        List users with their points summary, highest balance first.
+        
+        ?tier= and ?waiting_days= filter on the stored columns, and pages use a
+        cursor instead of OFFSET + COUNT(*).
+        """
+        summaries = _filter_points_summaries(
+            UserPointsSummary.objects.select_related('user'), request.query_params
+        )
+        paginator = PointsSummaryCursorPagination()
+        page = paginator.paginate_queryset(summaries, request, view=self)
+        serializer = UserPointsSummarySerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
     
     def retrieve(self, request, pk=None):
         """Get points info for a specific user"""
@@ -220,15 +304,17 @@ class AdminUserPointsView(viewsets.ViewSet):
     
     @action(detail=True, methods=['get'])
     def transactions(self, request, pk=None):
-        """Get all transactions for a specific user"""
+        """Get a specific user's transactions, newest first, paginated with a cursor"""
         from django.contrib.auth import get_user_model
         User = get_user_model()
         
         try:
             user = User.objects.get(pk=pk)
             transactions = PointTransaction.objects.filter(user=user)
-            serializer = PointTransactionSerializer(transactions, many=True)
-            return Response(serializer.data)
+            paginator = CreatedAtCursorPagination()
+            page = paginator.paginate_queryset(transactions, request, view=self)
+            serializer = PointTransactionSerializer(page, many=True)
+            return paginator.get_paginated_response(serializer.data)
         except User.DoesNotExist:
             return Response(
                 {'error': 'User not found'}, 
@@ -333,52 +419,19 @@ class PointsStatisticsView(APIView):
     
     def get(self, request):
         """Get statistics about points"""
-        # Total users with points
-        total_users = UserPointsSummary.objects.count()
-        
-        # Average points
-        avg_points = UserPointsSummary.objects.aggregate(
-            avg_points=Sum('current_points') / Count('id')
-        )['avg_points'] or 0
-        
-        # Points distribution
-        config = PointsConfig.get_active_config()
-        excellent_users = UserPointsSummary.objects.filter(
-            current_points__gte=config.excellent_threshold
-        ).count()
-        
-        good_users = UserPointsSummary.objects.filter(
-            current_points__gte=config.good_threshold,
-            current_points__lt=config.excellent_threshold
-        ).count()
-        
-        average_users = UserPointsSummary.objects.filter(
-            current_points__gte=config.average_threshold,
-            current_points__lt=config.good_threshold
-        ).count()
-        
-        poor_users = UserPointsSummary.objects.filter(
-            current_points__gte=config.poor_threshold,
-            current_points__lt=config.average_threshold
-        ).count()
-        
-        bad_users = UserPointsSummary.objects.filter(
-            current_points__lt=config.poor_threshold
-        ).count()
+        # Total users, average points and distribution in a single query
+        distribution = get_points_distribution()
         
         # Recent transactions
         recent_transactions = PointTransaction.objects.all()[:10]
         recent_transactions_serializer = PointTransactionSerializer(recent_transactions, many=True)
         
         return Response({
-            'total_users': total_users,
-            'average_points': round(avg_points, 2),
+            'total_users': distribution['total'],
+            'average_points': round(distribution['average_points'], 2),
             'distribution': {
-                'excellent': excellent_users,
-                'good': good_users,
-                'average': average_users,
-                'poor': poor_users,
-                'bad': bad_users
+                bucket['key']: bucket['count']
+                for bucket in distribution['buckets']
             },
             'recent_transactions': recent_transactions_serializer.data
         })
@@ -444,3 +497,108 @@ class PointTransactionListView(generics.ListAPIView):
     serializer_class = PointTransactionSerializer
     permission_classes = [IsAuthenticated]
     pagination_class = PageNumberPagination
+
+
+def _encode_leaderboard_cursor(position):
+    """Opaque cursor for the (current_points, id, rank, position) of the last entry of a page"""
+    return base64.urlsafe_b64encode(':'.join(map(str, position)).encode()).decode()
+
+
+def _decode_leaderboard_cursor(cursor):
+    """Inverse of _encode_leaderboard_cursor; raises ValueError for invalid cursors"""
+    try:
+        points, summary_id, rank, position = base64.urlsafe_b64decode(cursor.encode()).decode().split(':')
+        return int(points), int(summary_id), int(rank), int(position)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError('Invalid cursor')
+
+
+class PointsLeaderboardView(APIView):
+    """Points leaderboard with keyset (cursor) pagination"""
+    permission_classes = [IsAdminUser]
+    
+    DEFAULT_LIMIT = 50
+    MAX_LIMIT = 200
+    
+    def get(self, request):
+        limit = request.query_params.get('limit', '')
+        limit = min(int(limit), self.MAX_LIMIT) if limit.isdigit() and int(limit) > 0 else self.DEFAULT_LIMIT
+        
+        after = None
+        cursor = request.query_params.get('cursor')
+        if cursor:
+            try:
+                after = _decode_leaderboard_cursor(cursor)
+            except ValueError:
+                return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        page = get_leaderboard(limit=limit, after=after)
+        
+        return Response({
+            'results': [
+                {
+                    'rank': rank,
+                    'user': UserMinimalSerializer(summary.user).data,
+                    'current_points': summary.current_points,
+                    'tier': summary.tier,
+                    'status': summary.get_status_label(),
+                }
+                for rank, summary in page['entries']
+            ],
+            'next_cursor': _encode_leaderboard_cursor(page['next']) if page['next'] else None,
+        })
+
+
+class UserPointsRankView(APIView):
+    """
+    Obtiene la posición del usuario autenticado en la clasificación de puntos
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        rank = get_user_rank(request.user)
+        if rank is None:
+            return Response({'error': 'User has no points summary'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(rank)
+
+
+def _statement_response(request, user_id, filename):
+    """Streaming statement response in the requested file_format (csv or jsonl)"""
+    file_format = request.query_params.get('file_format', 'csv')
+    if file_format not in STATEMENT_FORMATS:
+        return Response(
+            {'error': f"file_format must be one of: {', '.join(STATEMENT_FORMATS)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    stream, content_type = STATEMENT_FORMATS[file_format]
+    response = StreamingHttpResponse(stream(iter_statement_rows(user_id)), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{file_format}"'
+    return response
+
+
+class AdminPointsStatementExportView(APIView):
+    """
+    Exporta el estado de cuenta de puntos de todos los usuarios (o de ?user_id=)
+    en CSV o JSON Lines, sin cargar el historial en memoria
+    """
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request):
+        user_id = request.query_params.get('user_id')
+        if user_id is not None and not user_id.isdigit():
+            return Response({'error': 'Invalid user_id'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if user_id:
+            return _statement_response(request, int(user_id), f'points-statement-{user_id}')
+        return _statement_response(request, None, 'points-statements')
+
+
+class UserPointsStatementView(APIView):
+    """
+    Exporta el estado de cuenta de puntos del usuario autenticado
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        return _statement_response(request, request.user.pk, 'points-statement')
@@ -0,0 +1,147 @@
+from collections import Counter
+
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+
+from .models import MonthlyPointsSummary, PointsConfig, PointTransaction, UserPointsSummary
+
+# Tipos de transacción cuyo monto sale directamente de la configuración
+# (campos que se suman para obtenerlo). Los ajustes manuales se conservan.
+REPLAYED_TYPES = {
+    'initial': ('initial_points',),
+    'on_time_payment': ('on_time_payment_points',),
+    'late_payment': ('late_payment_points',),
+    'very_late_payment': ('very_late_payment_points',),
+    'advance_payment': ('on_time_payment_points', 'advance_payment_points'),
+    'educational_course': ('educational_course_points',),
+}
+
+
+def _replayed_amount(candidate, active, count):
+    """
+    Expresión con los puntos que habría otorgado la configuración candidata.
+
+    El pago doble incluye un monto base que depende de la puntualidad y no se
+    guarda por separado, así que solo se ajusta la diferencia del bono.
+    """
+    double_bonus_delta = candidate.double_payment_points - active.double_payment_points
+    return Case(
+        *[
+            When(transaction_type=transaction_type,
+                 then=count * Value(sum(getattr(candidate, field) for field in fields)))
+            for transaction_type, fields in REPLAYED_TYPES.items()
+        ],
+        When(transaction_type='double_payment',
+             then=F('points_amount') + count * Value(double_bonus_delta)),
+        default=F('points_amount'),
+        output_field=IntegerField(),
+    )
+
+
+def get_replayed_deltas(candidate, active=None):
+    """
+    Diferencia de puntos por usuario si el historial se hubiera otorgado con la
+    configuración candidata.
+
+    Todo el historial se procesa en la base de datos con una consulta agrupada
+    para las transacciones y otra para los meses archivados.
+
+    Returns:
+        dict: user_id -> diferencia de puntos (solo usuarios con diferencia)
+    """
+    active = active or PointsConfig.get_active_config()
+    deltas = Counter()
+
+    sources = (
+        (PointTransaction.objects.all(), Value(1)),
+        (MonthlyPointsSummary.objects.all(), F('transaction_count')),
+    )
+    for queryset, count in sources:
+        grouped = queryset.values('user_id').annotate(
+            delta=Sum(_replayed_amount(candidate, active, count) - F('points_amount'))
+        ).exclude(delta=0).order_by()
+        for item in grouped:
+            deltas[item['user_id']] += item['delta']
+    return deltas
+
+
+def simulate_config(candidate, active=None):
+    """
+    Simula el efecto de una configuración sobre los niveles de todos los usuarios.
+
+    El saldo simulado es el saldo actual más la diferencia del historial
+    reprocesado; el nivel y los días de espera se calculan con los umbrales de la
+    candidata. Los resúmenes se recorren en bloques sin cargar modelos.
+
+    Args:
+        candidate: PointsConfig (puede no estar guardada)
+        active: Configuración de referencia (por defecto la activa)
+
+    Returns:
+        dict: users, points_changed, tier_changed, tiers (antes/después por nivel),
+              migrations (de/a/cantidad) y waiting_days (promedios y cambios)
+    """
+    active = active or PointsConfig.get_active_config()
+    deltas = get_replayed_deltas(candidate, active)
+    tiers = candidate.get_tiers()
+
+    def tier_for(points):
+        for tier in tiers:
+            if tier['min_points'] is None or points >= tier['min_points']:
+                return tier
+
+    users = 0
+    points_changed = 0
+    before_tiers = Counter()
+    after_tiers = Counter()
+    migrations = Counter()
+    waiting_changes = Counter()
+    waiting_before = 0
+    waiting_after = 0
+
+    summaries = UserPointsSummary.objects.values_list(
+        'user_id', 'current_points', 'tier', 'waiting_days'
+    ).order_by()
+    for user_id, points, tier, waiting_days in summaries.iterator(chunk_size=10000):
+        delta = deltas.get(user_id, 0)
+        new_tier = tier_for(points + delta)
+
+        users += 1
+        points_changed += delta != 0
+        before_tiers[tier] += 1
+        after_tiers[new_tier['key']] += 1
+        waiting_before += waiting_days
+        waiting_after += new_tier['waiting_days']
+        if new_tier['key'] != tier:
+            migrations[tier, new_tier['key']] += 1
+        if new_tier['waiting_days'] != waiting_days:
+            waiting_changes[waiting_days, new_tier['waiting_days']] += 1
+
+    return {
+        'users': users,
+        'points_changed': points_changed,
+        'tier_changed': sum(migrations.values()),
+        'tiers': [
+            {
+                'key': tier['key'],
+                'label': tier['label'],
+                'min_points': tier['min_points'],
+                'before': before_tiers[tier['key']],
+                'after': after_tiers[tier['key']],
+            }
+            for tier in tiers
+        ],
+        'migrations': [
+            {'from': old, 'to': new, 'count': count}
+            for (old, new), count in migrations.most_common()
+        ],
+        'waiting_days': {
+            'average_before': waiting_before / users if users else 0,
+            'average_after': waiting_after / users if users else 0,
+            'increased': sum(count for (old, new), count in waiting_changes.items() if new > old),
+            'decreased': sum(count for (old, new), count in waiting_changes.items() if new < old),
+            'changes': [
+                {'from_days': old, 'to_days': new, 'count': count}
+                for (old, new), count in sorted(waiting_changes.items())
+            ],
+        },
+    }
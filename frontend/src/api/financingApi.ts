@@ -55,6 +55,48 @@ export interface CalculatorResult {
   financed_amount_raw?: number;
 }
 
+export interface FinancingMatrixParams {
+  product_id?: number;
+  product_ids?: number[];
+  plan_ids?: number[];
+  term_min?: number;
+  term_max?: number;
+  term_step?: number;
+  down_payment_min?: number;
+  down_payment_max?: number;
+  down_payment_step?: number;
+}
+
+export interface FinancingMatrixOption {
+  term_months: number;
+  monthly_payment: number;
+  total_interest: number;
+  total_amount: number;
+
+  // Para compra programada
+  adjudication_month?: number;
+  adjudication_payment?: number;
+
+  // Para adjudicación inmediata
+  down_payment_percentage?: number;
+  down_payment?: number;
+  financed_amount?: number;
+}
+
+export interface FinancingMatrixResult {
+  products: {
+    id: number;
+    name: string;
+    price: number;
+    plans: {
+      id: number;
+      name: string;
+      type: 'programmed' | 'immediate';
+      options: FinancingMatrixOption[];
+    }[];
+  }[];
+}
+
 // RTK Query endpoints
 export const financingApiSlice = apiSlice.injectEndpoints({
   endpoints: (builder) => ({
@@ -68,6 +110,13 @@ export const financingApiSlice = apiSlice.injectEndpoints({
         body: params,
       }),
     }),
+    getFinancingMatrix: builder.query<FinancingMatrixResult, FinancingMatrixParams>({
+      query: (params) => ({
+        url: '/financing/calculator/matrix/',
+        method: 'POST',
+        body: params,
+      }),
+    }),
     saveSimulation: builder.mutation({
       query: (simulationData) => ({
         url: '/financing/simulations/',
@@ -81,6 +130,7 @@ export const financingApiSlice = apiSlice.injectEndpoints({
 export const {
   useGetFinancingPlansQuery,
   useCalculateFinancingMutation,
+  useGetFinancingMatrixQuery,
   useSaveSimulationMutation,
 } = financingApiSlice;
 